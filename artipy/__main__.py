@@ -0,0 +1,5 @@
+"""Allow running the command line interface with ``python -m artipy``."""
+
+from artipy.cli import main
+
+main()
@@ -0,0 +1,252 @@
+"""Simulation that runs until its estimates are precise enough.
+
+A fixed amount of iterations is either too few for a stable estimate or wastes time
+on one that settled long ago. :func:`simulate_adaptive` instead generates, upgrades
+and measures artifacts chunk by chunk, merges the histograms of the metrics and
+recomputes the confidence interval of every requested statistic after each chunk.
+It stops as soon as every interval is narrow enough, the time budget is spent or
+the maximum amount of samples is reached.
+
+Statistics are either ``"mean"``, with a normal interval from the sample variance,
+or a quantile given as a float in ``(0, 1)``, with a distribution-free interval
+from the order statistics. Both are computed from the histograms, so values are
+rounded to the resolution of the run. The histograms themselves are part of the
+result and can be turned into a distribution with
+:func:`artipy.distributions.pmf_from_counts`.
+
+Chunks are seeded like every other simulation of the package, so a run that stops
+on precision is reproducible with its seed, no matter how many workers it uses.
+"""
+
+from __future__ import annotations
+
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, replace
+from functools import partial
+from statistics import NormalDist
+from typing import TYPE_CHECKING, Literal, NamedTuple
+
+import numpy as np
+
+from artipy.analysis import ROUND_TO
+from artipy.simulation import Job, SimulationSpec, imap_bounded, iter_chunks, run_chunk
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Mapping, Sequence
+    from concurrent.futures import Executor
+    from decimal import Decimal
+
+    from artipy.simulation import Backend
+
+__all__ = ("AdaptiveResult", "Estimate", "simulate_adaptive")
+
+type Statistic = Literal["mean"] | float
+type StopReason = Literal["precision", "time", "samples"]
+
+
+class Estimate(NamedTuple):
+    """The current estimate of a statistic of a metric.
+
+    Attributes:
+        metric: The name of the metric.
+        statistic: ``"mean"`` or the quantile.
+        value: The estimate.
+        low: The lower bound of the confidence interval.
+        high: The upper bound of the confidence interval.
+    """
+
+    metric: str
+    statistic: Statistic
+    value: float
+    low: float
+    high: float
+
+    @property
+    def half_width(self) -> float:
+        """Half the width of the confidence interval."""
+        return (self.high - self.low) / 2
+
+
+@dataclass(frozen=True, slots=True)
+class AdaptiveResult:
+    """The state of an adaptive simulation.
+
+    Attributes:
+        samples: The amount of artifacts simulated.
+        elapsed: The seconds since the simulation started.
+        estimates: The estimate of every statistic of every metric.
+        counts: The histogram of every metric. The histograms passed to a progress
+            callback keep growing until the simulation ends.
+        stopped: Why the simulation stopped, or None while it runs.
+    """
+
+    samples: int
+    elapsed: float
+    estimates: tuple[Estimate, ...]
+    counts: Mapping[str, Counter[Decimal]]
+    stopped: StopReason | None = None
+
+    def estimate(self, metric: str, statistic: Statistic = "mean") -> Estimate:
+        """Look up the estimate of a statistic of a metric.
+
+        Args:
+            metric (str): The name of the metric.
+            statistic (Statistic, optional): The statistic. Defaults to the mean.
+
+        Raises:
+            KeyError: If the statistic of the metric was not requested.
+
+        Returns:
+            Estimate: The estimate.
+        """
+        for estimate in self.estimates:
+            if estimate.metric == metric and estimate.statistic == statistic:
+                return estimate
+        raise KeyError((metric, statistic))
+
+
+def _mean(metric: str, counts: Counter[Decimal], z: float) -> Estimate:
+    n = counts.total()
+    total = sum(float(value) * amount for value, amount in counts.items())
+    mean = total / n
+    squares = sum((float(value) - mean) ** 2 * amount for value, amount in counts.items())
+    error = z * (squares / max(n - 1, 1) / n) ** 0.5
+    return Estimate(metric, "mean", mean, mean - error, mean + error)
+
+
+def _quantile(metric: str, counts: Counter[Decimal], q: float, z: float) -> Estimate:
+    values = sorted(counts)
+    cumulative = np.cumsum([counts[value] for value in values])
+    n = int(cumulative[-1])
+    spread = z * (n * q * (1 - q)) ** 0.5
+    # The 1-based ranks of the estimate and of the bounds of its interval.
+    ranks = np.clip(np.ceil([n * q, n * q - spread, n * q + spread]), 1, n)
+    value, low, high = (float(values[i]) for i in np.searchsorted(cumulative, ranks))
+    return Estimate(metric, q, value, low, high)
+
+
+def _estimates(
+    counts: Mapping[str, Counter[Decimal]],
+    statistics: Sequence[Statistic],
+    z: float,
+) -> tuple[Estimate, ...]:
+    return tuple(
+        _mean(metric, histogram, z)
+        if statistic == "mean"
+        else _quantile(metric, histogram, float(statistic), z)
+        for metric, histogram in counts.items()
+        for statistic in statistics
+    )
+
+
+def _precise(estimate: Estimate, rel_tol: float | None, abs_tol: float | None) -> bool:
+    tolerance = max(abs_tol or 0.0, (rel_tol or 0.0) * abs(estimate.value))
+    return estimate.half_width <= tolerance
+
+
+def simulate_adaptive(  # noqa: PLR0913
+    metrics: Sequence[str] = ("crit_value",),
+    spec: SimulationSpec | None = None,
+    *,
+    statistics: Sequence[Statistic] = ("mean",),
+    rel_tol: float | None = 0.01,
+    abs_tol: float | None = None,
+    confidence: float = 0.95,
+    time_budget: float | None = None,
+    min_samples: int = 2_000,
+    max_samples: int = 10_000_000,
+    chunk_size: int = 1_000,
+    resolution: Decimal = ROUND_TO,
+    seed: int | None = None,
+    workers: int | None = None,
+    executor: Executor | None = None,
+    backend: Backend = "process",
+    progress: Callable[[AdaptiveResult], None] | None = None,
+) -> AdaptiveResult:
+    """Simulate artifacts until the requested statistics are precise enough.
+
+    An interval is precise enough once its half width is at most ``abs_tol`` or
+    ``rel_tol`` times the estimate, whichever is larger.
+
+    Args:
+        metrics (Sequence[str], optional): Names of
+            :data:`artipy.analysis.ARTIFACT_ATTRIBUTES`. Defaults to the crit value.
+        spec (SimulationSpec, optional): What to generate. Defaults to random
+            artifacts at their maximum level.
+        statistics (Sequence[Statistic], optional): ``"mean"`` and quantiles to
+            track for every metric. Defaults to the mean.
+        rel_tol (float, optional): The relative half width to reach. Defaults to
+            0.01.
+        abs_tol (float, optional): The absolute half width to reach.
+        confidence (float, optional): The confidence of the intervals. Defaults to
+            0.95.
+        time_budget (float, optional): Stop after this many seconds, checked after
+            every chunk. Defaults to no limit.
+        min_samples (int, optional): Never stop on precision before this many
+            samples. Defaults to 2,000.
+        max_samples (int, optional): Never simulate more than this many samples.
+            Defaults to 10,000,000.
+        chunk_size (int, optional): The amount of artifacts between checks.
+            Defaults to 1,000.
+        resolution (Decimal, optional): The grid metrics are rounded to. Defaults to
+            ROUND_TO.
+        seed (int, optional): The seed of the run. Defaults to a random seed.
+        workers (int, optional): The amount of workers, see
+            :func:`artipy.simulation.imap_bounded`.
+        executor (Executor, optional): Run on this executor instead of creating a
+            pool.
+        backend (Backend, optional): The kind of pool to create. Defaults to
+            ``process``.
+        progress (Callable[[AdaptiveResult], None], optional): Called with the
+            current estimates after every chunk.
+
+    Raises:
+        ValueError: If there are no metrics, or a metric, statistic or tolerance is
+            invalid.
+
+    Returns:
+        AdaptiveResult: The final estimates.
+    """
+    if not metrics:
+        msg = "At least one metric is required"
+        raise ValueError(msg)
+    for statistic in statistics:
+        if statistic != "mean" and not 0 < float(statistic) < 1:
+            msg = f"Invalid statistic: {statistic!r} (expected 'mean' or a quantile)"
+            raise ValueError(msg)
+    if (rel_tol is None or rel_tol < 0) and (abs_tol is None or abs_tol < 0):
+        msg = "A non-negative rel_tol or abs_tol is required"
+        raise ValueError(msg)
+    job = Job(spec or SimulationSpec(), tuple(metrics), resolution)
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    seed = random.getrandbits(64) if seed is None else seed
+    counts: dict[str, Counter[Decimal]] = {metric: Counter() for metric in metrics}
+    start = time.perf_counter()
+    result = AdaptiveResult(0, 0.0, (), counts)
+    for chunk_counts in imap_bounded(
+        partial(run_chunk, job=job),
+        iter_chunks(max_samples, seed, chunk_size),
+        workers=workers,
+        executor=executor,
+        backend=backend,
+    ):
+        for metric, histogram in chunk_counts.items():
+            counts[metric].update(histogram)
+        samples = counts[metrics[0]].total()
+        result = AdaptiveResult(
+            samples,
+            time.perf_counter() - start,
+            _estimates(counts, statistics, z),
+            counts,
+        )
+        if progress is not None:
+            progress(result)
+        if samples >= min_samples and all(
+            _precise(e, rel_tol, abs_tol) for e in result.estimates
+        ):
+            return replace(result, stopped="precision")
+        if time_budget is not None and result.elapsed >= time_budget:
+            return replace(result, stopped="time")
+    return replace(result, stopped="samples")
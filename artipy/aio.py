@@ -0,0 +1,170 @@
+"""Asynchronous generation and scoring for asyncio applications.
+
+Generating or scoring many artifacts blocks for a long time, so calling the sync API
+from a coroutine stalls every other task of the event loop. The functions here split
+the work into chunks and run them in an executor, the default one of the loop unless
+another is given. At most ``window`` chunks are in flight, and new chunks are only
+started as results are consumed, so a slow consumer holds back generation instead of
+piling up results. Cancelling the consumer, or closing the generator early, drops
+every chunk that has not started yet; chunks already running finish in the
+background and are discarded. Wrap a generator that may be left early in
+:func:`contextlib.aclosing` so this happens right away rather than once it is
+garbage collected.
+
+Every chunk reseeds the generator of the thread it runs on, see
+:func:`artipy.simulation.generate_chunk`, so seeded results are the same as those of
+the sync API no matter which executor runs them.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+from collections import deque
+from contextlib import aclosing
+from functools import partial
+from itertools import batched
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from artipy.analysis import METRICS
+from artipy.batch import ArtifactBatch
+from artipy.simulation import SimulationSpec, generate_chunk, iter_chunks
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Callable, Iterable, Sequence
+    from concurrent.futures import Executor
+
+    from artipy.artifacts import Artifact
+
+__all__ = ("DEFAULT_ASYNC_CHUNK_SIZE", "agenerate_artifacts", "amap_bounded", "ascore")
+
+# Small enough that a chunk only takes a fraction of a second.
+DEFAULT_ASYNC_CHUNK_SIZE = 1_000
+
+
+async def amap_bounded[T, R](
+    fn: Callable[[T], R],
+    items: Iterable[T],
+    *,
+    executor: Executor | None = None,
+    window: int = 2,
+) -> AsyncIterator[R]:
+    """Lazily map a function over items in an executor, yielding results in order.
+
+    The asynchronous counterpart of :func:`artipy.simulation.imap_bounded`.
+
+    Args:
+        fn (Callable[[T], R]): The function to apply.
+        items (Iterable[T]): The items to map over.
+        executor (Executor, optional): The executor to run on. Defaults to the
+            default executor of the running loop.
+        window (int, optional): The maximum amount of items in flight. Defaults to 2.
+
+    Raises:
+        ValueError: If the window is not positive.
+
+    Yields:
+        R: The results in the order of the items.
+    """
+    if window < 1:
+        msg = f"Invalid window of {window} items"
+        raise ValueError(msg)
+    loop = asyncio.get_running_loop()
+    pending: deque[asyncio.Future[R]] = deque()
+    try:
+        for item in items:
+            pending.append(loop.run_in_executor(executor, fn, item))
+            if len(pending) >= window:
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+async def agenerate_artifacts(  # noqa: PLR0913
+    n: int,
+    spec: SimulationSpec | None = None,
+    *,
+    seed: int | None = None,
+    chunk_size: int = DEFAULT_ASYNC_CHUNK_SIZE,
+    executor: Executor | None = None,
+    window: int = 2,
+) -> AsyncIterator[list[Artifact]]:
+    """Generate artifacts without blocking the event loop.
+
+    Use it as ``async for batch in agenerate_artifacts(n): ...``. The artifacts are
+    those of :func:`artipy.simulation.generate_chunk` over
+    :func:`artipy.simulation.iter_chunks` with the same seed and chunk size.
+
+    Args:
+        n (int): The amount of artifacts.
+        spec (SimulationSpec, optional): What to generate. Defaults to random
+            artifacts at level 0, like
+            :func:`artipy.analysis.create_multiple_random_artifacts`.
+        seed (int, optional): The seed of the run. Defaults to a random seed.
+        chunk_size (int, optional): The size of every batch. Defaults to
+            DEFAULT_ASYNC_CHUNK_SIZE.
+        executor (Executor, optional): The executor to run on. Defaults to the
+            default executor of the running loop.
+        window (int, optional): The maximum amount of chunks in flight. Defaults
+            to 2.
+
+    Yields:
+        list[artipy.artifacts.Artifact]: The artifacts of every chunk, in order.
+    """
+    seed = random.getrandbits(64) if seed is None else seed
+    produce = partial(generate_chunk, spec=spec or SimulationSpec(level=0))
+    chunks = iter_chunks(n, seed, chunk_size)
+    async with aclosing(
+        amap_bounded(produce, chunks, executor=executor, window=window),
+    ) as batches:
+        async for batch in batches:
+            yield batch
+
+
+async def ascore(
+    artifacts: ArtifactBatch | Sequence[Artifact],
+    metrics: Sequence[str] = ("roll_value", "crit_value"),
+    *,
+    chunk_size: int = DEFAULT_ASYNC_CHUNK_SIZE,
+    executor: Executor | None = None,
+    window: int = 2,
+) -> np.ndarray:
+    """Evaluate metrics for many artifacts without blocking the event loop.
+
+    Args:
+        artifacts (ArtifactBatch | Sequence[artipy.artifacts.Artifact]): The
+            artifacts, or a batch of them.
+        metrics (Sequence[str], optional): The names of the metrics. Defaults to
+            the roll value and crit value.
+        chunk_size (int, optional): The amount of artifacts, or rows of a batch,
+            scored at once. Defaults to DEFAULT_ASYNC_CHUNK_SIZE.
+        executor (Executor, optional): The executor to run on. Defaults to the
+            default executor of the running loop.
+        window (int, optional): The maximum amount of chunks in flight. Defaults
+            to 2.
+
+    Returns:
+        np.ndarray: The same structured array as
+        :meth:`artipy.metrics.MetricRegistry.calculate_batch`.
+    """
+    score = partial(METRICS.calculate_batch, names=metrics)
+    if not len(artifacts):
+        return score(artifacts)
+    chunks: Iterable[ArtifactBatch | Sequence[Artifact]]
+    if isinstance(artifacts, ArtifactBatch):
+        # Row ranges are views, so slicing a batch copies nothing.
+        chunks = (
+            artifacts.rows(start, start + chunk_size)
+            for start in range(0, len(artifacts), chunk_size)
+        )
+    else:
+        chunks = batched(artifacts, chunk_size, strict=False)
+    async with aclosing(
+        amap_bounded(score, chunks, executor=executor, window=window),
+    ) as parts:
+        return np.concatenate([part async for part in parts])
@@ -2,12 +2,8 @@
 # No typestubs for plotly.
 # pyright: reportMissingTypeStubs=false, reportUnknownMemberType=false, reportUnknownVariableType=false, reportUnknownArgumentType=false
 
-import itertools
-import math
-import random
 from collections.abc import Callable, Mapping
 from decimal import Decimal
-from typing import Any
 
 import pandas as pd
 import plotly.express as px
@@ -15,7 +11,16 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
 from artipy import UPGRADE_STEP
-from artipy.artifacts import Artifact, ArtifactBuilder
+from artipy.artifacts import Artifact, ArtifactBuilder, ArtifactSnapshot, StatSnapshot
+from artipy.batch import (
+    crit_values,
+    maximum_roll_values,
+    roll_values,
+    substat_roll_values,
+    substat_rolls,
+)
+from artipy.metrics import Metric, MetricRegistry
+from artipy.rolls import decode_substat, reconstruct_inventory
 from artipy.stats import SubStat
 from artipy.types import (
     STAT_NAMES,
@@ -24,31 +29,52 @@ from artipy.types import (
     RollMagnitude,
     StatType,
 )
-from artipy.utils import choose, possible_substat_values
+from artipy.utils import choose, possible_substat_values, rng
 
 ROUND_TO = Decimal("1E-2")
 
+# Chance for a freshly dropped artifact to start with the maximum amount of substats.
+FOUR_SUBSTAT_CHANCE = 0.2
+
 type SubstatMethod[R] = Callable[[SubStat], R]
 type ArtifactMethod[R] = Callable[[Artifact], R]
 
 
-def create_random_artifact(slot: ArtifactSlot, rarity: int = 5) -> Artifact:
+def create_random_artifact(
+    slot: ArtifactSlot,
+    rarity: int = 5,
+    *,
+    mainstat: StatType | None = None,
+) -> Artifact:
     """Create a random artifact.
 
     Args:
         slot (artipy.types.ArtifactSlot): The slot of the artifact.
         rarity (int, optional): The rarity of the artifact. Defaults to 5.
+        mainstat (artipy.types.StatType, optional): Force the mainstat of the
+            artifact. Defaults to a weighted random mainstat for the slot.
+
+    Raises:
+        ValueError: If the mainstat is not valid for the slot.
 
     Returns:
         artipy.artifacts.Artifact: The random artifact.
     """
+    if mainstat is None:
+        mainstats, mainstat_weights = zip(*VALID_MAINSTATS[slot].items(), strict=False)
+        mainstat = choose(mainstats, mainstat_weights)
+    elif mainstat not in VALID_MAINSTATS[slot]:
+        msg = f"Invalid mainstat '{mainstat.name}' for slot '{slot}'"
+        raise ValueError(msg)
 
     max_substats = rarity - 1
-    substat_count = max(0, max_substats if random.random() < 0.2 else max_substats - 1)  # noqa: PLR2004
-    mainstats, mainstat_weights = zip(*VALID_MAINSTATS[slot].items(), strict=False)
+    substat_count = max(
+        0,
+        max_substats if rng().random() < FOUR_SUBSTAT_CHANCE else max_substats - 1,
+    )
     return (
         ArtifactBuilder()
-        .with_mainstat(choose(mainstats, mainstat_weights))
+        .with_mainstat(mainstat)
         .with_rarity(rarity)
         .with_substats(amount=substat_count)
         .with_slot(slot)
@@ -81,7 +107,7 @@ def create_multiple_random_artifacts(amount: int = 1) -> list[Artifact]:
     """
     result: list[Artifact] = []
     for _ in range(amount):
-        slot: ArtifactSlot = ArtifactSlot(random.choice(list(ArtifactSlot)))
+        slot: ArtifactSlot = ArtifactSlot(rng().choice(list(ArtifactSlot)))
         result.append(create_random_artifact(slot))
     return result
 
@@ -95,7 +121,7 @@ ROLL_MULTIPLIERS: dict[int, tuple[float, ...]] = {
 }
 
 
-def calculate_substat_roll_value(substat: SubStat) -> Decimal:
+def calculate_substat_roll_value(substat: SubStat | StatSnapshot) -> Decimal:
     """Calculate the substat roll value. This is the value of the substat divided by the
     highest possible value of the substat.
 
@@ -115,9 +141,14 @@ def calculate_substat_roll_value(substat: SubStat) -> Decimal:
     return stat_value / highest_value
 
 
-def calculate_substat_rolls(substat: SubStat) -> int:
-    """Calculate the number of rolls of a substat. This is the difference between the
-    actual roll value and the average roll value divided by the average roll value.
+def calculate_substat_rolls(substat: SubStat | StatSnapshot) -> int:
+    """Calculate the number of rolls of a substat, including the initial roll. The
+    rolls are decoded exactly from the substat value with
+    :func:`artipy.rolls.decode_substat`.
+
+    Some values can be rolled in different amounts of rolls, in which case the
+    fewest are counted. :func:`artipy.rolls.reconstruct_inventory` settles those
+    with the level of the artifact.
 
     Args:
         substat (artipy.stats.SubStat): The substat to calculate the rolls for.
@@ -125,14 +156,14 @@ def calculate_substat_rolls(substat: SubStat) -> int:
     Returns:
         int: The number of rolls of the substat.
     """
-    possible_rolls = possible_substat_values(substat.name, substat.rarity)
-    average_roll = Decimal(sum(possible_rolls) / len(possible_rolls))
-    return math.ceil((substat.value - average_roll) / average_roll)
+    return decode_substat(substat).rolls
 
 
-def calculate_substat_roll_magnitudes(substat: SubStat) -> tuple[RollMagnitude, ...]:
-    """Calculate the roll magnitudes of a substat. This is the closest roll magnitude
-    to the actual roll value for each roll.
+def calculate_substat_roll_magnitudes(
+    substat: SubStat | StatSnapshot,
+) -> tuple[RollMagnitude, ...]:
+    """Calculate the roll magnitudes of a substat. This is the magnitude of the value
+    tier of each decoded roll, lowest first.
 
     Args:
         substat (artipy.stats.SubStat): The substat to calculate the roll magnitudes
@@ -141,25 +172,15 @@ def calculate_substat_roll_magnitudes(substat: SubStat) -> tuple[RollMagnitude,
     Returns:
         tuple[RollMagnitude, ...]: The roll magnitudes of the substat.
     """
-
-    def get_magnitude(
-        values: tuple[Decimal, ...],
-        value_to_index: Decimal,
-    ) -> RollMagnitude:
-        index = values.index(value_to_index)
-        return RollMagnitude.closest(ROLL_MULTIPLIERS[substat.rarity][index])
-
-    possible_rolls = possible_substat_values(substat.name, substat.rarity)
-    rolls_actual = calculate_substat_rolls(substat)
-
-    combinations = list(
-        itertools.combinations_with_replacement(possible_rolls, rolls_actual),
+    multipliers = ROLL_MULTIPLIERS[substat.rarity]
+    return tuple(
+        RollMagnitude.closest(multipliers[tier])
+        for tier, count in enumerate(decode_substat(substat).tiers)
+        for _ in range(count)
     )
-    combination = min(combinations, key=lambda x: abs(sum(x) - substat.value))
-    return tuple(get_magnitude(possible_rolls, value) for value in combination)
 
 
-def calculate_artifact_roll_value(artifact: Artifact) -> Decimal:
+def calculate_artifact_roll_value(artifact: Artifact | ArtifactSnapshot) -> Decimal:
     """Calculate the roll value of an artifact. This is the sum of the roll values of
     all substats.
 
@@ -174,7 +195,9 @@ def calculate_artifact_roll_value(artifact: Artifact) -> Decimal:
     )
 
 
-def calculate_artifact_maximum_roll_value(artifact: Artifact) -> Decimal:
+def calculate_artifact_maximum_roll_value(
+    artifact: Artifact | ArtifactSnapshot,
+) -> Decimal:
     """Calculate the maximum roll value of an artifact. This is the roll value of the
     artifact with all remaining rolls being maximum rolls.
 
@@ -184,12 +207,11 @@ def calculate_artifact_maximum_roll_value(artifact: Artifact) -> Decimal:
     Returns:
         Decimal: The maximum roll value of the artifact.
     """
-    artifact_max_level = artifact.rarity * 4
-    remaining_rolls = (artifact_max_level - artifact.level) // UPGRADE_STEP
+    remaining_rolls = (artifact.max_level - artifact.level) // UPGRADE_STEP
     return Decimal(calculate_artifact_roll_value(artifact) + remaining_rolls)
 
 
-def calculate_artifact_crit_value(artifact: Artifact) -> Decimal:
+def calculate_artifact_crit_value(artifact: Artifact | ArtifactSnapshot) -> Decimal:
     """Calculate the crit value of an artifact. This is the sum of the crit damage and
     the crit rate times two.
 
@@ -218,14 +240,46 @@ def calculate_artifact_crit_value(artifact: Artifact) -> Decimal:
     return Decimal(crit_dmg + crit_rate * 2)
 
 
-ARTIFACT_ATTRIBUTES: Mapping[str, ArtifactMethod[Decimal]] = {
-    "roll_value": calculate_artifact_roll_value,
-    "crit_value": calculate_artifact_crit_value,
-}
+METRICS = MetricRegistry()
+METRICS.register(
+    Metric("roll_value", calculate_artifact_roll_value, kernel=roll_values),
+)
+METRICS.register(
+    Metric(
+        "maximum_roll_value",
+        calculate_artifact_maximum_roll_value,
+        kernel=maximum_roll_values,
+    ),
+)
+METRICS.register(
+    Metric(
+        "crit_value",
+        calculate_artifact_crit_value,
+        kernel=crit_values,
+        depends_on=frozenset({StatType.CRIT_RATE, StatType.CRIT_DMG}),
+    ),
+)
+METRICS.register(
+    Metric(
+        "rolls",
+        calculate_substat_rolls,
+        kernel=substat_rolls,
+        dtype="u1",
+        per_substat=True,
+    ),
+)
+METRICS.register(
+    Metric(
+        "substat_roll_value",
+        calculate_substat_roll_value,
+        kernel=substat_roll_values,
+        per_substat=True,
+    ),
+)
 
-SUBSTAT_ATTRIBUTES: Mapping[str, SubstatMethod[int]] = {
-    "rolls": calculate_substat_rolls,
-}
+ARTIFACT_ATTRIBUTES: Mapping[str, ArtifactMethod[Decimal]] = METRICS.artifact_metrics()
+
+SUBSTAT_ATTRIBUTES: Mapping[str, SubstatMethod[int | Decimal]] = METRICS.substat_metrics()
 
 
 def plot_artifact_substat_rolls(artifact: Artifact) -> None:
@@ -234,9 +288,10 @@ def plot_artifact_substat_rolls(artifact: Artifact) -> None:
     Args:
         artifact (artipy.artifacts.Artifact): The artifact to plot the substat rolls for.
     """
+    (histories,) = reconstruct_inventory([artifact])
     substat_rolls = {
-        STAT_NAMES[substat.name]: calculate_substat_rolls(substat)
-        for substat in artifact.substats
+        STAT_NAMES[substat.name]: history.rolls
+        for substat, history in zip(artifact.substats, histories, strict=True)
     }
     stat_rolls_df = pd.DataFrame(substat_rolls.items(), columns=["stat", "rolls"])
 
@@ -249,9 +304,14 @@ def plot_artifact_substat_rolls(artifact: Artifact) -> None:
         color_discrete_sequence=colors,
     )
 
+    multipliers = ROLL_MULTIPLIERS[artifact.rarity]
     magnitudes_flat = [
-        tuple(i.value for i in calculate_substat_roll_magnitudes(substat))
-        for substat in artifact.substats
+        tuple(
+            RollMagnitude.closest(multipliers[tier]).value
+            for tier, count in enumerate(history.tiers)
+            for _ in range(count)
+        )
+        for history in histories
     ]
     magnitudes_to_dict = {
         STAT_NAMES[substat.name]: {
@@ -425,25 +485,20 @@ def plot_multi_value_distribution(
     Raises:
         ValueError: If an invalid attribute is passed.
     """
-    all_attributes: Mapping[str, Callable[..., Any]] = {
-        **ARTIFACT_ATTRIBUTES,
-        **SUBSTAT_ATTRIBUTES,
-    }
     for attr in attributes:
-        if attr not in all_attributes:
-            msg = f"Invalid attribute: {attr}\nValid attributes: {all_attributes}"
+        if attr not in METRICS:
+            msg = f"Invalid attribute: {attr}\nValid attributes: {list(METRICS)}"
             raise ValueError(msg)
 
     for a in (artifacts := create_multiple_random_artifacts(iterations)):
         upgrade_artifact_to_max(a)
 
-    concatted_df = pd.DataFrame()
+    results = METRICS.calculate_batch(artifacts, attributes)
+    columns: dict[str, pd.Series] = {}
     for attr in attributes:
-        values = [
-            all_attributes[attr](a) for a in artifacts if all_attributes[attr](a) > 0
-        ]
-        attr_df = pd.DataFrame(values, columns=[attr])
-        concatted_df = pd.concat([concatted_df, attr_df])
+        values = results[attr].ravel()
+        columns[attr] = pd.Series(values[values > 0])
+    concatted_df = pd.DataFrame(columns)
 
     fig = px.histogram(
         concatted_df,
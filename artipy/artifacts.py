@@ -2,16 +2,21 @@
 
 from __future__ import annotations
 
-import random
 from collections.abc import Callable
 from copy import deepcopy
+from dataclasses import dataclass
+from functools import lru_cache
 from itertools import starmap
+from typing import TYPE_CHECKING, NamedTuple
 
-from artipy import MAX_RARITY, UPGRADE_STEP
+from artipy import MAX_RARITY, UPGRADE_STEP, leveling
 from artipy.stats import MainStat, SubStat, create_substat
 from artipy.types import VALID_ARTIFACT_SETS, ArtifactSet, ArtifactSlot, StatType
 
-from .utils import choose
+from .utils import AliasSampler, rng
+
+if TYPE_CHECKING:
+    from decimal import Decimal
 
 substat_weights: dict[StatType, float] = {
     StatType.HP: 6,
@@ -35,20 +40,38 @@ def _level_up_artifact(artifact: Artifact) -> None:
     artifact.mainstat.set_value_by_level(new_level)
 
 
-def pick_stat(artifact: Artifact) -> SubStat:
-    if not artifact.rarity:
-        msg = "Artifact must have a rarity set"
-        raise ValueError(msg)
+@lru_cache(maxsize=1024)
+def substat_sampler(excluded: frozenset[StatType]) -> AliasSampler[StatType]:
+    """The sampler of new substats for an artifact that already has some stats.
+
+    Args:
+        excluded (frozenset[StatType]): The mainstat and substats of the artifact.
 
-    stats = frozenset(s.name for s in (artifact.mainstat, *artifact.substats))
-    pool = {s: w for s, w in substat_weights.items() if s not in stats}
+    Raises:
+        ValueError: If every substat is excluded.
 
+    Returns:
+        artipy.utils.AliasSampler[StatType]: The sampler over the remaining substats.
+    """
+    pool = {s: w for s, w in substat_weights.items() if s not in excluded}
     if not pool:
         msg = "No valid stats available to pick from"
         raise ValueError(msg)
+    return AliasSampler(tuple(pool), tuple(pool.values()))
+
+
+def pick_stat(artifact: Artifact) -> SubStat:
+    if not artifact.rarity:
+        msg = "Artifact must have a rarity set"
+        raise ValueError(msg)
 
-    population, weights = map(tuple, zip(*pool.items(), strict=False))
-    new_stat_name = choose(population, weights)
+    # Only substats change the pool, which keeps the amount of samplers small.
+    stats = frozenset(
+        s.name
+        for s in (artifact.mainstat, *artifact.substats)
+        if s.name in substat_weights
+    )
+    new_stat_name = substat_sampler(stats).draw()
     return create_substat(name=new_stat_name, rarity=artifact.rarity)
 
 
@@ -63,7 +86,7 @@ def upgrade_artifact_new_stat(artifact: Artifact) -> None:
 def upgrade_artifact_upgrade_stat(artifact: Artifact) -> None:
     """Upgrade the artifact's level and upgrade a random substat if the level is divisible by the upgrade step."""
     if artifact.level % UPGRADE_STEP == 0 and artifact.substats:
-        random.choice(artifact.substats).upgrade()
+        rng().choice(artifact.substats).upgrade()
     _level_up_artifact(artifact)
 
 
@@ -208,13 +231,63 @@ class Artifact:
 
     @property
     def max_level(self) -> int:
-        return self.rarity * UPGRADE_STEP if self.rarity > 2 else UPGRADE_STEP  # noqa: PLR2004
+        return leveling.max_level(self.rarity)
 
     def upgrade(self) -> None:
         """Upgrade the artifact."""
         if self.level < self.max_level:
             self.upgrade_method(self)
 
+    def exp_to_level(self, level: int | None = None) -> int:
+        """The EXP needed to level the artifact up.
+
+        Args:
+            level (int, optional): The target level. Defaults to the maximum level.
+
+        Returns:
+            int: The EXP.
+        """
+        target = self.max_level if level is None else level
+        return leveling.exp_to_level(self.rarity, self.level, target)
+
+    def mora_to_level(self, level: int | None = None) -> int:
+        """The mora needed to level the artifact up.
+
+        Args:
+            level (int, optional): The target level. Defaults to the maximum level.
+
+        Returns:
+            int: The mora.
+        """
+        target = self.max_level if level is None else level
+        return leveling.mora_to_level(self.rarity, self.level, target)
+
+    @property
+    def fodder_exp(self) -> int:
+        """The EXP yielded by consuming the artifact."""
+        return leveling.fodder_exp(self.rarity, self.level)
+
+    def freeze(self) -> ArtifactSnapshot:
+        """Take an immutable, hashable snapshot of the artifact's current state.
+
+        Returns:
+            ArtifactSnapshot: The snapshot.
+        """
+        return ArtifactSnapshot(
+            artifact_slot=self.artifact_slot,
+            artifact_set=self.artifact_set,
+            rarity=self.rarity,
+            level=self.level,
+            mainstat=StatSnapshot(
+                self.mainstat.name,
+                self.mainstat.value,
+                self.mainstat.rarity,
+            ),
+            substats=tuple(
+                StatSnapshot(s.name, s.value, s.rarity) for s in self.substats
+            ),
+        )
+
     def __str__(self) -> str:
         set_name = VALID_ARTIFACT_SETS[self.artifact_set].set_name
         return (
@@ -224,6 +297,50 @@ class Artifact:
         )
 
 
+class StatSnapshot(NamedTuple):
+    """An immutable stat of an :class:`ArtifactSnapshot`."""
+
+    name: StatType
+    value: Decimal
+    rarity: int
+
+
+@dataclass(frozen=True, slots=True)
+class ArtifactSnapshot:
+    """An immutable, hashable snapshot of an artifact, see :meth:`Artifact.freeze`.
+
+    Snapshots with the same state are equal and hash the same, so they can be used as
+    cache keys. They have the same attributes as an :class:`Artifact` and can be
+    passed to the analysis functions in place of one.
+    """
+
+    artifact_slot: ArtifactSlot
+    artifact_set: ArtifactSet
+    rarity: int
+    level: int
+    mainstat: StatSnapshot
+    substats: tuple[StatSnapshot, ...]
+
+    @property
+    def max_level(self) -> int:
+        return leveling.max_level(self.rarity)
+
+    def thaw(self) -> Artifact:
+        """Create a mutable artifact with the state of the snapshot.
+
+        Returns:
+            Artifact: A new artifact.
+        """
+        artifact = Artifact()
+        artifact.rarity = self.rarity
+        artifact.level = self.level
+        artifact.artifact_slot = self.artifact_slot
+        artifact.artifact_set = self.artifact_set
+        artifact.mainstat = MainStat(*self.mainstat)
+        artifact.substats = list(starmap(SubStat, self.substats))
+        return artifact
+
+
 class ArtifactBuilder:
     """Builder class for creating an Artifact object.
 
@@ -369,8 +486,7 @@ class ArtifactBuilder:
             ArtifactBuilder: The artifact builder object
         """
         if (level := self._artifact.level) > 0:
-            max_level = rarity * UPGRADE_STEP if rarity > 2 else UPGRADE_STEP  # noqa: PLR2004
-            expected_range = range(max_level + 1)
+            expected_range = range(leveling.max_level(rarity) + 1)
             if level not in expected_range:
                 msg = (
                     f"Invalid rarity '{rarity}' for current level '{level}'. "
@@ -0,0 +1,247 @@
+"""Columnar artifact batches and vectorized metric kernels.
+
+An :class:`ArtifactBatch` stores a sequence of artifacts as NumPy columns, using the
+same enumeration codes as the binary record format of :mod:`artipy.records`. The
+kernels compute a metric for every artifact of a batch at once and agree with the
+scalar ``calculate_*`` functions of :mod:`artipy.analysis` up to float precision.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, fields
+from functools import cache
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from artipy import MAX_RARITY, UPGRADE_STEP
+from artipy.leveling import max_level
+from artipy.records import MAX_SUBSTATS, SET_CODES, SLOT_CODES, STAT_CODES
+from artipy.rolls import decode_values
+from artipy.types import StatType
+from artipy.utils import possible_substat_values
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from artipy.artifacts import Artifact
+
+__all__ = (
+    "ArtifactBatch",
+    "crit_values",
+    "maximum_roll_values",
+    "roll_values",
+    "substat_roll_values",
+    "substat_rolls",
+)
+
+EMPTY = -1
+
+
+@dataclass(frozen=True, slots=True)
+class ArtifactBatch:
+    """A columnar batch of artifacts.
+
+    Attributes:
+        slot: The index of each slot in :class:`artipy.types.ArtifactSlot`.
+        set: The index of each set in :class:`artipy.types.ArtifactSet`.
+        rarity: The rarity of each artifact.
+        level: The level of each artifact.
+        mainstat: The index of each mainstat in :class:`artipy.types.StatType`.
+        mainstat_value: The value of each mainstat.
+        substats: The stat index of each substat, ``-1`` for an empty substat, with
+            shape ``(n, MAX_SUBSTATS)``.
+        substat_values: The value of each substat, 0 for an empty substat.
+    """
+
+    slot: np.ndarray
+    set: np.ndarray
+    rarity: np.ndarray
+    level: np.ndarray
+    mainstat: np.ndarray
+    mainstat_value: np.ndarray
+    substats: np.ndarray
+    substat_values: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.rarity)
+
+    def rows(self, start: int, stop: int) -> ArtifactBatch:
+        """A view of a range of rows of the batch.
+
+        Args:
+            start (int): The first row.
+            stop (int): The row after the last one.
+
+        Returns:
+            ArtifactBatch: The rows, sharing memory with this batch.
+        """
+        return ArtifactBatch(
+            **{f.name: getattr(self, f.name)[start:stop] for f in fields(ArtifactBatch)},
+        )
+
+    @classmethod
+    def from_artifacts(cls, artifacts: Iterable[Artifact]) -> ArtifactBatch:
+        """Convert artifacts into a batch.
+
+        Args:
+            artifacts (Iterable[artipy.artifacts.Artifact]): The artifacts.
+
+        Returns:
+            ArtifactBatch: The batch, in the order of the artifacts.
+        """
+        artifacts = list(artifacts)
+        n = len(artifacts)
+        substats = np.full((n, MAX_SUBSTATS), EMPTY, dtype=np.int8)
+        substat_values = np.zeros((n, MAX_SUBSTATS))
+        stat_index = {stat: i for i, stat in enumerate(STAT_CODES)}
+        for i, artifact in enumerate(artifacts):
+            for j, substat in enumerate(artifact.substats):
+                substats[i, j] = stat_index[substat.name]
+                substat_values[i, j] = substat.value
+        return cls(
+            slot=np.array(
+                [SLOT_CODES.index(a.artifact_slot) for a in artifacts],
+                dtype=np.uint8,
+            ),
+            set=np.array(
+                [SET_CODES.index(a.artifact_set) for a in artifacts],
+                dtype=np.uint8,
+            ),
+            rarity=np.array([a.rarity for a in artifacts], dtype=np.uint8),
+            level=np.array([a.level for a in artifacts], dtype=np.uint8),
+            mainstat=np.array(
+                [stat_index[a.mainstat.name] for a in artifacts],
+                dtype=np.int8,
+            ),
+            mainstat_value=np.array([float(a.mainstat.value) for a in artifacts]),
+            substats=substats,
+            substat_values=substat_values,
+        )
+
+    @classmethod
+    def from_records(cls, records: np.ndarray) -> ArtifactBatch:
+        """Convert records of :func:`artipy.records.record_dtype` into a batch.
+
+        Args:
+            records (np.ndarray): Records holding every artifact field.
+
+        Returns:
+            ArtifactBatch: The batch.
+        """
+        columns = range(1, MAX_SUBSTATS + 1)
+        return cls(
+            slot=records["slot"].astype(np.uint8),
+            set=records["set"].astype(np.uint8),
+            rarity=records["rarity"].astype(np.uint8),
+            level=records["level"].astype(np.uint8),
+            mainstat=records["mainstat"].astype(np.int8),
+            mainstat_value=records["mainstat_value"].astype(np.float64),
+            substats=np.stack(
+                [records[f"substat_{i}"] for i in columns],
+                axis=1,
+            ).astype(np.int8),
+            substat_values=np.stack(
+                [records[f"substat_{i}_value"] for i in columns],
+                axis=1,
+            ).astype(np.float64),
+        )
+
+
+@cache
+def _max_tier_table() -> np.ndarray:
+    table = np.full((MAX_RARITY + 1, len(STAT_CODES)), np.nan)
+    for rarity in range(1, MAX_RARITY + 1):
+        for code, stat in enumerate(STAT_CODES):
+            if values := possible_substat_values(stat, rarity):
+                table[rarity, code] = float(max(values))
+    return table
+
+
+def substat_roll_values(batch: ArtifactBatch) -> np.ndarray:
+    """The roll value of every substat, see
+    :func:`artipy.analysis.calculate_substat_roll_value`.
+
+    Args:
+        batch (ArtifactBatch): The batch.
+
+    Returns:
+        np.ndarray: The roll values with shape ``(n, MAX_SUBSTATS)``, 0 for empty
+        substats.
+    """
+    present = batch.substats != EMPTY
+    highest = _max_tier_table()[batch.rarity[:, None], batch.substats.clip(0)]
+    return np.where(present, batch.substat_values / np.where(present, highest, 1), 0.0)
+
+
+def substat_rolls(batch: ArtifactBatch) -> np.ndarray:
+    """The amount of rolls of every substat, see
+    :func:`artipy.analysis.calculate_substat_rolls`.
+
+    Args:
+        batch (ArtifactBatch): The batch.
+
+    Returns:
+        np.ndarray: The rolls with shape ``(n, MAX_SUBSTATS)``, 0 for empty substats.
+    """
+    result = np.zeros(batch.substats.shape, dtype=np.uint8)
+    rarity = np.broadcast_to(batch.rarity[:, None], batch.substats.shape)
+    present = batch.substats != EMPTY
+    keys = np.unique(
+        np.stack([batch.substats[present], rarity[present]], axis=1),
+        axis=0,
+    )
+    for code, r in keys:
+        mask = (batch.substats == code) & (rarity == r)
+        result[mask], _ = decode_values(
+            STAT_CODES[code],
+            int(r),
+            batch.substat_values[mask],
+        )
+    return result
+
+
+def roll_values(batch: ArtifactBatch) -> np.ndarray:
+    """The roll value of every artifact, see
+    :func:`artipy.analysis.calculate_artifact_roll_value`.
+
+    Args:
+        batch (ArtifactBatch): The batch.
+
+    Returns:
+        np.ndarray: The roll values.
+    """
+    return substat_roll_values(batch).sum(axis=1)
+
+
+def maximum_roll_values(batch: ArtifactBatch) -> np.ndarray:
+    """The maximum roll value of every artifact, see
+    :func:`artipy.analysis.calculate_artifact_maximum_roll_value`.
+
+    Args:
+        batch (ArtifactBatch): The batch.
+
+    Returns:
+        np.ndarray: The maximum roll values.
+    """
+    levels = np.array([0, *(max_level(r) for r in range(1, MAX_RARITY + 1))])
+    remaining = (levels[batch.rarity] - batch.level.astype(np.int64)) // UPGRADE_STEP
+    return roll_values(batch) + remaining
+
+
+def crit_values(batch: ArtifactBatch) -> np.ndarray:
+    """The crit value of every artifact, see
+    :func:`artipy.analysis.calculate_artifact_crit_value`.
+
+    Args:
+        batch (ArtifactBatch): The batch.
+
+    Returns:
+        np.ndarray: The crit values.
+    """
+    rate = STAT_CODES.index(StatType.CRIT_RATE)
+    dmg = STAT_CODES.index(StatType.CRIT_DMG)
+    values = batch.substat_values
+    crit_rate = np.where(batch.substats == rate, values, 0.0).sum(axis=1)
+    crit_dmg = np.where(batch.substats == dmg, values, 0.0).sum(axis=1)
+    return (crit_dmg + crit_rate * 2) * 100
@@ -0,0 +1,224 @@
+"""Checkpoint and resume long-running simulations.
+
+A run is reduced chunk by chunk, in chunk id order, into an accumulator. Every chunk
+reseeds its own random stream from the run seed and its id, see
+:func:`artipy.simulation.chunk_seed`, so the position of every stream is fully
+described by the ids of the completed chunks. A checkpoint therefore only stores the
+run it belongs to, how many chunks were reduced and the partial accumulator. A run
+resumed from a checkpoint reduces the remaining chunks into the saved accumulator and
+produces the same result as an uninterrupted run with the same seed.
+
+Checkpoints are pickled, so only load checkpoints written by a trusted process.
+"""
+
+from __future__ import annotations
+
+import os
+import pickle  # noqa: S403
+import random
+import time
+from dataclasses import dataclass, replace
+from itertools import islice
+from typing import TYPE_CHECKING, Any
+
+from artipy.simulation import DEFAULT_CHUNK_SIZE, imap_bounded, iter_chunks
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from concurrent.futures import Executor
+    from pathlib import Path
+
+    from artipy.simulation import Backend, Chunk
+
+__all__ = (
+    "CHECKPOINT_VERSION",
+    "Checkpoint",
+    "load_checkpoint",
+    "reduce_chunks",
+    "save_checkpoint",
+)
+
+# Bumped whenever the layout of a checkpoint changes.
+CHECKPOINT_VERSION = 1
+
+
+@dataclass(frozen=True, slots=True)
+class Checkpoint[A]:
+    """The state of a run after reducing a prefix of its chunks.
+
+    Attributes:
+        n: The total amount of samples of the run.
+        seed: The seed of the run.
+        chunk_size: The maximum size of a chunk.
+        key: Anything else the result depends on, e.g. the simulation spec and the
+            metric. Compared by equality when resuming.
+        completed: The amount of reduced chunks, which are the chunks with an id
+            below it.
+        accumulator: The partial result.
+    """
+
+    n: int
+    seed: int
+    chunk_size: int
+    key: Any
+    completed: int
+    accumulator: A
+
+    @property
+    def total(self) -> int:
+        """The amount of chunks of the run."""
+        return -(-self.n // self.chunk_size)
+
+    @property
+    def done(self) -> bool:
+        """Whether every chunk of the run was reduced."""
+        return self.completed >= self.total
+
+
+def save_checkpoint(path: Path, checkpoint: Checkpoint[Any]) -> None:
+    """Atomically write a checkpoint.
+
+    The checkpoint is written to a temporary file next to ``path`` and moved over
+    it, so a run killed while saving leaves the previous checkpoint intact.
+
+    Args:
+        path (Path): The file to write.
+        checkpoint (Checkpoint): The checkpoint.
+    """
+    temporary = path.with_name(f".{path.name}.tmp")
+    with temporary.open("wb") as file:
+        pickle.dump((CHECKPOINT_VERSION, checkpoint), file)
+        file.flush()
+        os.fsync(file.fileno())
+    temporary.replace(path)
+
+
+def load_checkpoint(path: Path) -> Checkpoint[Any] | None:
+    """Read a checkpoint written with :func:`save_checkpoint`.
+
+    Args:
+        path (Path): The file to read.
+
+    Raises:
+        ValueError: If the file was written by another version of the package.
+
+    Returns:
+        Checkpoint | None: The checkpoint, None if the file does not exist.
+    """
+    if not path.exists():
+        return None
+    with path.open("rb") as file:
+        version, checkpoint = pickle.load(file)  # noqa: S301
+    if version != CHECKPOINT_VERSION:
+        msg = f"Checkpoint '{path}' was written by an incompatible version"
+        raise ValueError(msg)
+    return checkpoint
+
+
+def _resume[A](
+    path: Path | None,
+    fresh: Checkpoint[A],
+    *,
+    seeded: bool,
+) -> Checkpoint[A]:
+    saved = load_checkpoint(path) if path is not None else None
+    if saved is None:
+        return fresh
+    if (saved.n, saved.chunk_size, saved.key) != (fresh.n, fresh.chunk_size, fresh.key):
+        msg = f"Checkpoint '{path}' belongs to another run"
+        raise ValueError(msg)
+    if seeded and saved.seed != fresh.seed:
+        msg = f"Checkpoint '{path}' was written with seed {saved.seed}"
+        raise ValueError(msg)
+    return saved
+
+
+def reduce_chunks[A, R](  # noqa: PLR0913
+    fn: Callable[[Chunk], R],
+    reduce: Callable[[A, R], A],
+    initial: A,
+    *,
+    n: int,
+    seed: int | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    key: Any = None,
+    path: Path | None = None,
+    interval: float = 60.0,
+    workers: int | None = None,
+    executor: Executor | None = None,
+    backend: Backend = "process",
+) -> A:
+    """Map a function over the chunks of a run and reduce the results in order,
+    checkpointing the progress to a file.
+
+    If ``path`` holds a checkpoint of the same run, the run resumes after its last
+    reduced chunk. The checkpoint is kept once the run is done, so running it again
+    returns the result without generating anything.
+
+    Args:
+        fn (Callable[[Chunk], R]): The function to apply to every chunk. Must be
+            picklable when run in a process pool.
+        reduce (Callable[[A, R], A]): Combines the accumulator with the result of
+            the next chunk. Must not modify the accumulator that was saved last,
+            which is simplest by returning a new accumulator.
+        initial (A): The accumulator before the first chunk. Must be picklable.
+        n (int): The total amount of samples.
+        seed (int, optional): The seed of the run. Defaults to the seed of the
+            checkpoint, or a random seed for a new run.
+        chunk_size (int, optional): The maximum size of a chunk. Defaults to
+            DEFAULT_CHUNK_SIZE.
+        key (Any, optional): Anything else the result depends on. A checkpoint
+            with another key is rejected. Defaults to None.
+        path (Path, optional): The checkpoint file. Defaults to no checkpointing.
+        interval (float, optional): The minimum amount of seconds between two
+            checkpoints. Defaults to 60.
+        workers (int, optional): The amount of worker processes, see
+            :func:`artipy.simulation.imap_bounded`.
+        executor (Executor, optional): Run on this executor instead of creating a
+            pool.
+        backend (artipy.simulation.Backend, optional): Whether the created pool
+            runs processes or threads. Defaults to ``process``.
+
+    Raises:
+        ValueError: If the checkpoint belongs to another run.
+
+    Returns:
+        A: The accumulator after every chunk.
+    """
+    state = _resume(
+        path,
+        Checkpoint(
+            n=n,
+            seed=random.getrandbits(64) if seed is None else seed,
+            chunk_size=chunk_size,
+            key=key,
+            completed=0,
+            accumulator=initial,
+        ),
+        seeded=seed is not None,
+    )
+    chunks = islice(iter_chunks(n, state.seed, chunk_size), state.completed, None)
+    accumulator, completed = state.accumulator, state.completed
+    saved_at = time.monotonic()
+    results = imap_bounded(
+        fn,
+        chunks,
+        workers=workers,
+        executor=executor,
+        backend=backend,
+    )
+    for result in results:
+        accumulator = reduce(accumulator, result)
+        completed += 1
+        if path is not None and time.monotonic() - saved_at >= interval:
+            save_checkpoint(
+                path,
+                replace(state, completed=completed, accumulator=accumulator),
+            )
+            saved_at = time.monotonic()
+    if path is not None and completed > state.completed:
+        save_checkpoint(
+            path,
+            replace(state, completed=completed, accumulator=accumulator),
+        )
+    return accumulator
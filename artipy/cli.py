@@ -0,0 +1,364 @@
+"""The ``artipy`` command line interface.
+
+Subcommands:
+    - simulate: Generate and upgrade random artifacts and stream them with metrics.
+    - score: Stream the metrics of every artifact in an inventory file.
+    - distribution: Output the exact or sampled distribution of a metric.
+    - serve: Run the local JSON lines scoring service.
+    - coordinate: Hand out the chunks of a simulation to workers and merge their
+      histograms.
+    - work: Compute chunks for a coordinator.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import os
+import random
+import sys
+from collections import Counter
+from contextlib import contextmanager
+from decimal import Decimal
+from functools import partial
+from itertools import batched
+from pathlib import Path
+from typing import IO, TYPE_CHECKING
+
+from artipy import __version__
+from artipy.analysis import ARTIFACT_ATTRIBUTES, ROUND_TO
+from artipy.checkpoint import reduce_chunks
+from artipy.distributions import exact_pmf, pmf_from_counts
+from artipy.records import ARTIFACT_FIELDS, open_writer, parse_stat, read_rows
+from artipy.simulation import (
+    DEFAULT_CHUNK_SIZE,
+    Job,
+    SimulationSpec,
+    imap_bounded,
+    iter_chunks,
+    run_chunk,
+    score_rows,
+    simulate_rows,
+)
+from artipy.types import ArtifactSlot
+
+if TYPE_CHECKING:
+    from collections.abc import Generator, Sequence
+
+    from artipy.records import Row
+
+__all__ = ("main",)
+
+
+@contextmanager
+def _open_output(path: str) -> Generator[IO[bytes]]:
+    if path == "-":
+        yield sys.stdout.buffer
+        return
+    with Path(path).open("wb") as f:
+        yield f
+
+
+@contextmanager
+def _open_input(path: str) -> Generator[IO[bytes]]:
+    if path == "-":
+        yield sys.stdin.buffer
+        return
+    with Path(path).open("rb") as f:
+        yield f
+
+
+def _spec(args: argparse.Namespace) -> SimulationSpec:
+    return SimulationSpec(
+        slot=args.slot,
+        mainstat=args.mainstat,
+        rarity=args.rarity,
+        level=args.level,
+    )
+
+
+def _seed(args: argparse.Namespace) -> int:
+    return args.seed if args.seed is not None else random.getrandbits(64)
+
+
+def _simulate(args: argparse.Namespace) -> None:
+    chunks = iter_chunks(args.n, _seed(args), args.chunk_size)
+    produce = partial(simulate_rows, spec=_spec(args), metrics=args.metrics)
+    with _open_output(args.output) as stream:
+        writer = open_writer(stream, args.format, (*ARTIFACT_FIELDS, *args.metrics))
+        for rows in imap_bounded(
+            produce,
+            chunks,
+            workers=args.workers,
+            backend=args.backend,
+        ):
+            writer.write_rows(rows)
+        writer.close()
+
+
+def _score(args: argparse.Namespace) -> None:
+    fmt = args.input_format or ("csv" if args.inventory.endswith(".csv") else "jsonl")
+    produce = partial(score_rows, metrics=args.metrics)
+    with _open_input(args.inventory) as source, _open_output(args.output) as stream:
+        writer = open_writer(stream, args.format, (*ARTIFACT_FIELDS, *args.metrics))
+        batches = batched(read_rows(source, fmt), args.chunk_size, strict=False)
+        for rows in imap_bounded(
+            produce,
+            batches,
+            workers=args.workers,
+            backend=args.backend,
+        ):
+            writer.write_rows(rows)
+        writer.close()
+
+
+def _distribution(args: argparse.Namespace) -> None:
+    spec = _spec(args)
+    if args.exact:
+        if spec.slot is None:
+            msg = "--exact requires --slot"
+            raise ValueError(msg)
+        pmf = exact_pmf(
+            ARTIFACT_ATTRIBUTES[args.metric],
+            spec.slot,
+            mainstat=spec.mainstat,
+            rarity=spec.rarity,
+            level=spec.level,
+            resolution=args.resolution,
+        )
+    else:
+        job = Job(spec, (args.metric,), args.resolution)
+        counts: Counter[Decimal] = reduce_chunks(
+            partial(run_chunk, job=job),
+            lambda total, chunk_counts: total + chunk_counts[args.metric],
+            Counter(),
+            n=args.n,
+            seed=args.seed,
+            chunk_size=args.chunk_size,
+            key=(spec, args.metric, args.resolution),
+            path=args.checkpoint and Path(args.checkpoint),
+            interval=args.checkpoint_interval,
+            workers=args.workers,
+            backend=args.backend,
+        )
+        pmf = pmf_from_counts(counts)
+
+    rows: list[Row] = [
+        {"value": float(value), "probability": probability}
+        for value, probability in pmf.items()
+    ]
+    with _open_output(args.output) as stream:
+        writer = open_writer(stream, args.format, ("value", "probability"))
+        writer.write_rows(rows)
+        writer.close()
+
+
+def _serve(args: argparse.Namespace) -> None:
+    from artipy.server import serve
+
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(
+            serve(
+                host=args.host,
+                port=args.port,
+                socket=args.socket,
+                batch_window=args.batch_window_ms / 1000,
+                max_batch=args.max_batch,
+                threads=args.threads,
+            ),
+        )
+
+
+def _coordinate(args: argparse.Namespace) -> None:
+    from artipy.cluster import coordinate
+
+    job = Job(_spec(args), tuple(args.metrics), args.resolution)
+    counts = asyncio.run(
+        coordinate(
+            job,
+            n=args.n,
+            seed=args.seed,
+            chunk_size=args.chunk_size,
+            host=args.host,
+            port=args.port,
+            timeout=args.timeout,
+            max_attempts=args.max_attempts,
+        ),
+    )
+    rows: list[Row] = [
+        {"metric": metric, "value": float(value), "probability": probability}
+        for metric, histogram in counts.items()
+        for value, probability in pmf_from_counts(histogram).items()
+    ]
+    with _open_output(args.output) as stream:
+        writer = open_writer(stream, args.format, ("metric", "value", "probability"))
+        writer.write_rows(rows)
+        writer.close()
+
+
+def _work(args: argparse.Namespace) -> None:
+    from artipy.cluster import work
+
+    work(args.host, args.port, processes=args.processes)
+
+
+def _add_output_arguments(
+    parser: argparse.ArgumentParser,
+    formats: tuple[str, ...] = ("csv", "jsonl", "binary"),
+) -> None:
+    parser.add_argument(
+        "-o",
+        "--output",
+        default="-",
+        help="File to write to, '-' for stdout (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-f",
+        "--format",
+        choices=formats,
+        default="csv",
+        help="Output format (default: %(default)s)",
+    )
+
+
+def _add_parallel_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Workers, 1 to run in-process (default: all CPUs)",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=("process", "thread"),
+        default="process",
+        help="Run workers as processes or threads (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help="Artifacts per unit of work (default: %(default)s)",
+    )
+
+
+def _add_generation_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--n", type=int, default=1000, help="Artifacts to generate")
+    parser.add_argument("--slot", type=ArtifactSlot, choices=list(ArtifactSlot))
+    parser.add_argument(
+        "--mainstat",
+        type=parse_stat,
+        help="Mainstat, e.g. CRIT_RATE (requires --slot)",
+    )
+    parser.add_argument("--rarity", type=int, default=5)
+    parser.add_argument("--level", type=int, help="Upgrade to this level (default: max)")
+    parser.add_argument("--seed", type=int, help="Seed for reproducible output")
+    _add_parallel_arguments(parser)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    metrics = list(ARTIFACT_ATTRIBUTES)
+    defaults = ["roll_value", "crit_value"]
+    parser = argparse.ArgumentParser(prog="artipy", description=__doc__.splitlines()[0])
+    parser.add_argument("--version", action="version", version=f"%(prog)s {__version__}")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    simulate = subparsers.add_parser("simulate", help="Stream random artifacts")
+    _add_generation_arguments(simulate)
+    simulate.add_argument("--metrics", nargs="*", choices=metrics, default=defaults)
+    _add_output_arguments(simulate)
+    simulate.set_defaults(handler=_simulate)
+
+    score = subparsers.add_parser("score", help="Stream the metrics of an inventory")
+    score.add_argument("inventory", help="CSV or JSON lines file, '-' for stdin")
+    score.add_argument("--input-format", choices=("csv", "jsonl"))
+    score.add_argument("--metrics", nargs="*", choices=metrics, default=defaults)
+    _add_parallel_arguments(score)
+    _add_output_arguments(score)
+    score.set_defaults(handler=_score)
+
+    distribution = subparsers.add_parser("distribution", help="Distribution of a metric")
+    distribution.add_argument("metric", choices=metrics)
+    distribution.add_argument(
+        "--exact",
+        action="store_true",
+        help="Compute the exact distribution instead of sampling",
+    )
+    distribution.add_argument("--resolution", type=Decimal, default=ROUND_TO)
+    distribution.add_argument(
+        "--checkpoint",
+        help="Save progress to this file and resume from it when it exists",
+    )
+    distribution.add_argument(
+        "--checkpoint-interval",
+        type=float,
+        default=60.0,
+        help="Seconds between checkpoints (default: %(default)s)",
+    )
+    _add_generation_arguments(distribution)
+    _add_output_arguments(distribution)
+    distribution.set_defaults(handler=_distribution)
+
+    serve = subparsers.add_parser("serve", help="Run the JSON lines scoring service")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--socket", help="Listen on this Unix socket instead of TCP")
+    serve.add_argument("--batch-window-ms", type=float, default=5.0)
+    serve.add_argument("--max-batch", type=int, default=512)
+    serve.add_argument("--threads", type=int, default=1, help="Batch evaluation threads")
+    serve.set_defaults(handler=_serve)
+
+    coordinator = subparsers.add_parser(
+        "coordinate",
+        help="Distribute a sampled distribution over workers",
+    )
+    coordinator.add_argument("--metrics", nargs="+", choices=metrics, default=defaults)
+    coordinator.add_argument("--resolution", type=Decimal, default=ROUND_TO)
+    coordinator.add_argument("--host", default="127.0.0.1")
+    coordinator.add_argument("--port", type=int, default=8766)
+    coordinator.add_argument(
+        "--timeout",
+        type=float,
+        default=600.0,
+        help="Seconds before a chunk is handed out again (default: %(default)s)",
+    )
+    coordinator.add_argument(
+        "--max-attempts",
+        type=int,
+        default=3,
+        help="Times a chunk is handed out before the run fails (default: %(default)s)",
+    )
+    _add_generation_arguments(coordinator)
+    # The metric column is text, which the binary records cannot hold.
+    _add_output_arguments(coordinator, formats=("csv", "jsonl"))
+    coordinator.set_defaults(handler=_coordinate)
+
+    worker = subparsers.add_parser("work", help="Compute chunks for a coordinator")
+    worker.add_argument("--host", default="127.0.0.1")
+    worker.add_argument("--port", type=int, default=8766)
+    worker.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    worker.set_defaults(handler=_work)
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Run the command line interface.
+
+    Args:
+        argv (Sequence[str], optional): The arguments. Defaults to ``sys.argv``.
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        args.handler(args)
+    except ValueError as e:
+        parser.error(str(e))
+    except BrokenPipeError:
+        # The reader went away (e.g. piped into ``head``), stop quietly.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,417 @@
+"""Map-reduce simulation across machines over TCP.
+
+A coordinator splits a run into chunks with :func:`artipy.simulation.iter_chunks` and
+hands them out to any amount of workers. Each worker generates its chunk, histograms
+the requested metrics and sends the counts back, which the coordinator merges. Every
+chunk draws from its own seed, so the result only depends on the seed and chunk size
+of the run, never on which workers took part or how often a chunk was retried.
+
+Coordinator and workers speak JSON lines, in the style of :mod:`artipy.server`:
+
+    - worker: ``{"op": "ready"}``
+    - coordinator: ``{"op": "task", "job": {...}, "chunk": {...}}``
+    - worker: ``{"op": "result", "chunk_id": 0, "counts": {"crit_value": [...]}}``,
+      or ``{"op": "error", "chunk_id": 0, "error": "..."}`` if the chunk failed.
+    - coordinator: the next ``task``, or ``{"op": "done"}`` once every chunk is in.
+
+Chunks that fail, that are held by a worker that disconnects, or that are not
+returned within the timeout, are handed out again. A chunk that was handed out the
+maximum amount of attempts without result fails the whole run, so a chunk that
+always fails does not keep the run going forever. Late results of a chunk that is
+already merged are ignored.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import multiprocessing
+import random
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from typing import TYPE_CHECKING, Any, Self
+
+import orjson
+
+from artipy.simulation import DEFAULT_CHUNK_SIZE, Chunk, Job, iter_chunks, run_chunk
+
+if TYPE_CHECKING:
+    from types import TracebackType
+
+    from artipy.simulation import Counts
+
+__all__ = (
+    "DEFAULT_MAX_ATTEMPTS",
+    "DEFAULT_TASK_TIMEOUT",
+    "Coordinator",
+    "coordinate",
+    "run_worker",
+    "work",
+)
+
+# Seconds a worker may hold a chunk before it is handed out again.
+DEFAULT_TASK_TIMEOUT = 600.0
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+def _encode_counts(counts: Counts) -> dict[str, list[tuple[str, int]]]:
+    return {
+        metric: [(str(value), amount) for value, amount in histogram.items()]
+        for metric, histogram in counts.items()
+    }
+
+
+def _decode_counts(data: dict[str, list[list[Any]]]) -> Counts:
+    return {
+        metric: Counter({Decimal(value): amount for value, amount in histogram})
+        for metric, histogram in data.items()
+    }
+
+
+def _send(writer: asyncio.StreamWriter, message: dict[str, Any]) -> None:
+    writer.write(orjson.dumps(message, option=orjson.OPT_APPEND_NEWLINE))
+
+
+class Coordinator:
+    """Hands out the chunks of a run to workers and merges their histograms.
+
+    Use it as an async context manager, serve it with :meth:`serve_tcp` and wait
+    for the merged histograms with :meth:`result`.
+
+    Args:
+        job (artipy.simulation.Job): What every worker computes.
+        n (int): The total amount of artifacts.
+        seed (int, optional): The seed of the run. Defaults to a random seed.
+        chunk_size (int, optional): The maximum size of a chunk. Defaults to
+            DEFAULT_CHUNK_SIZE.
+        timeout (float, optional): Seconds a worker may hold a chunk before it is
+            handed out again. Defaults to DEFAULT_TASK_TIMEOUT.
+        max_attempts (int, optional): How many times a chunk is handed out before
+            the run fails. Defaults to DEFAULT_MAX_ATTEMPTS.
+
+    Attributes:
+        retries (int): The amount of chunks that were handed out again.
+        workers (int): The amount of workers that connected so far.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        job: Job,
+        *,
+        n: int,
+        seed: int | None = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        timeout: float = DEFAULT_TASK_TIMEOUT,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    ) -> None:
+        self.job = job
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self._timeout = timeout
+        self._max_attempts = max_attempts
+        self._attempts: Counter[int] = Counter()
+        # The last error reported for every chunk, and the error that failed the run.
+        self._errors: dict[int, str] = {}
+        self._error: RuntimeError | None = None
+        self._pending: deque[Chunk] = deque(iter_chunks(n, self.seed, chunk_size))
+        self._total = len(self._pending)
+        # The chunk, deadline and holder of every chunk handed out.
+        self._leases: dict[int, tuple[Chunk, float, object]] = {}
+        self._completed: set[int] = set()
+        self._counts: Counts = {metric: Counter() for metric in job.metrics}
+        self._changed = asyncio.Condition()
+        self._done = asyncio.Event()
+        self._servers: list[asyncio.Server] = []
+        self.retries = 0
+        self.workers = 0
+        if not self._total:
+            self._done.set()
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+
+    @property
+    def progress(self) -> tuple[int, int]:
+        """The amount of merged chunks and the total amount of chunks."""
+        return len(self._completed), self._total
+
+    async def result(self) -> Counts:
+        """Wait for every chunk to be merged.
+
+        Raises:
+            RuntimeError: If a chunk ran out of attempts.
+
+        Returns:
+            Counts: The histogram of each metric over the whole run.
+        """
+        await self._done.wait()
+        if self._error is not None:
+            raise self._error
+        return self._counts
+
+    async def serve_tcp(self, host: str = "127.0.0.1", port: int = 0) -> asyncio.Server:
+        """Start accepting workers on a TCP port. Use port 0 to pick a free port."""
+        server = await asyncio.start_server(
+            self.handle_worker,
+            host,
+            port,
+            limit=2**24,
+        )
+        self._servers.append(server)
+        return server
+
+    def _lease(self, owner: object) -> Chunk | None:
+        if self._pending:
+            chunk = self._pending.popleft()
+        else:
+            now = time.monotonic()
+            expired = [c for c, deadline, _ in self._leases.values() if deadline <= now]
+            if not expired:
+                return None
+            chunk = expired[0]
+            self.retries += 1
+        if self._attempts[chunk.chunk_id] >= self._max_attempts:
+            reason = self._errors.get(chunk.chunk_id, "no result")
+            msg = (
+                f"Chunk {chunk.chunk_id} failed after {self._max_attempts} attempts: "
+                f"{reason}"
+            )
+            self._error = RuntimeError(msg)
+            self._done.set()
+            # Called with the condition held, so waiting workers can be woken.
+            self._changed.notify_all()
+            return None
+        self._attempts[chunk.chunk_id] += 1
+        self._leases[chunk.chunk_id] = (chunk, time.monotonic() + self._timeout, owner)
+        return chunk
+
+    async def _next_chunk(self, owner: object) -> Chunk | None:
+        async with self._changed:
+            while not self._done.is_set():
+                if (chunk := self._lease(owner)) is not None:
+                    return chunk
+                # Wake up in time to hand out chunks whose lease ran out.
+                deadline = min(d for _, d, _ in self._leases.values())
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(
+                        self._changed.wait(),
+                        max(deadline - time.monotonic(), 0),
+                    )
+            return None
+
+    async def _merge(self, chunk_id: int, counts: Counts) -> None:
+        async with self._changed:
+            self._leases.pop(chunk_id, None)
+            if chunk_id not in self._completed:
+                self._completed.add(chunk_id)
+                for metric, histogram in counts.items():
+                    self._counts[metric].update(histogram)
+            if len(self._completed) == self._total:
+                self._done.set()
+            self._changed.notify_all()
+
+    async def _reject(self, chunk: Chunk, error: str) -> None:
+        async with self._changed:
+            if self._leases.pop(chunk.chunk_id, None) is not None:
+                self._pending.appendleft(chunk)
+                self.retries += 1
+            self._errors[chunk.chunk_id] = error
+            self._changed.notify_all()
+
+    async def _release(self, owner: object) -> None:
+        async with self._changed:
+            # Chunks handed out again after their lease ran out belong to the new
+            # holder.
+            held = [c for c, _, holder in self._leases.values() if holder is owner]
+            for chunk in held:
+                del self._leases[chunk.chunk_id]
+                self._pending.appendleft(chunk)
+            self.retries += len(held)
+            self._changed.notify_all()
+
+    async def _serve_worker(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        owner: object,
+    ) -> None:
+        held: Chunk | None = None
+        while line := await reader.readline():
+            message = orjson.loads(line)
+            if held is not None:
+                op = message.get("op")
+                if op not in {"result", "error"} or message["chunk_id"] != held.chunk_id:
+                    return
+                if op == "error":
+                    await self._reject(held, str(message.get("error")))
+                else:
+                    await self._merge(held.chunk_id, _decode_counts(message["counts"]))
+            held = await self._next_chunk(owner)
+            if held is None:
+                _send(writer, {"op": "done"})
+                await writer.drain()
+                return
+            chunk = {"chunk_id": held.chunk_id, "size": held.size, "seed": held.seed}
+            _send(writer, {"op": "task", "job": self.job.to_json(), "chunk": chunk})
+            await writer.drain()
+
+    async def handle_worker(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        """Serve a single worker until it disconnects or the run is done."""
+        self.workers += 1
+        owner = object()
+        try:
+            await self._serve_worker(reader, writer, owner)
+        except (ConnectionError, orjson.JSONDecodeError, KeyError):
+            pass
+        finally:
+            await self._release(owner)
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+
+async def coordinate(  # noqa: PLR0913
+    job: Job,
+    *,
+    n: int,
+    seed: int | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    host: str = "127.0.0.1",
+    port: int = 8766,
+    timeout: float = DEFAULT_TASK_TIMEOUT,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+) -> Counts:
+    """Serve the chunks of a run to workers until every chunk is merged.
+
+    Args:
+        job (artipy.simulation.Job): What every worker computes.
+        n (int): The total amount of artifacts.
+        seed (int, optional): The seed of the run. Defaults to a random seed.
+        chunk_size (int, optional): The maximum size of a chunk. Defaults to
+            DEFAULT_CHUNK_SIZE.
+        host (str, optional): The host to listen on. Defaults to localhost.
+        port (int, optional): The TCP port to listen on. Defaults to 8766.
+        timeout (float, optional): Seconds a worker may hold a chunk before it is
+            handed out again. Defaults to DEFAULT_TASK_TIMEOUT.
+        max_attempts (int, optional): How many times a chunk is handed out before
+            the run fails. Defaults to DEFAULT_MAX_ATTEMPTS.
+
+    Raises:
+        RuntimeError: If a chunk ran out of attempts.
+
+    Returns:
+        Counts: The histogram of each metric over the whole run.
+    """
+    coordinator = Coordinator(
+        job,
+        n=n,
+        seed=seed,
+        chunk_size=chunk_size,
+        timeout=timeout,
+        max_attempts=max_attempts,
+    )
+    async with coordinator:
+        await coordinator.serve_tcp(host, port)
+        return await coordinator.result()
+
+
+async def _work(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    max_chunks: int | None,
+) -> int:
+    computed = 0
+    _send(writer, {"op": "ready"})
+    await writer.drain()
+    while max_chunks is None or computed < max_chunks:
+        line = await reader.readline()
+        if not line or (message := orjson.loads(line))["op"] != "task":
+            break
+        chunk = Chunk(**message["chunk"])
+        try:
+            job = Job.from_json(message["job"])
+            counts = await asyncio.to_thread(run_chunk, chunk, job)
+        except Exception as e:  # noqa: BLE001
+            # Let the coordinator decide whether to retry the chunk or give up.
+            _send(writer, {"op": "error", "chunk_id": chunk.chunk_id, "error": repr(e)})
+            await writer.drain()
+            continue
+        computed += 1
+        _send(
+            writer,
+            {
+                "op": "result",
+                "chunk_id": chunk.chunk_id,
+                "counts": _encode_counts(counts),
+            },
+        )
+        await writer.drain()
+    return computed
+
+
+async def run_worker(
+    host: str = "127.0.0.1",
+    port: int = 8766,
+    *,
+    max_chunks: int | None = None,
+) -> int:
+    """Work on chunks of a coordinator until the run is done.
+
+    Chunks are computed in a thread, so the connection stays responsive. A chunk
+    that raises is reported to the coordinator, which decides whether to retry it.
+
+    Args:
+        host (str, optional): The host of the coordinator. Defaults to localhost.
+        port (int, optional): The port of the coordinator. Defaults to 8766.
+        max_chunks (int, optional): Stop after this many chunks. Defaults to
+            working until the run is done.
+
+    Returns:
+        int: The amount of chunks computed.
+    """
+    reader, writer = await asyncio.open_connection(host, port, limit=2**24)
+    try:
+        return await _work(reader, writer, max_chunks)
+    finally:
+        writer.close()
+        with contextlib.suppress(ConnectionError):
+            await writer.wait_closed()
+
+
+def _work_process(address: tuple[str, int]) -> int:
+    return asyncio.run(run_worker(*address))
+
+
+def work(host: str = "127.0.0.1", port: int = 8766, *, processes: int = 1) -> int:
+    """Work on chunks of a coordinator from several processes of this machine.
+
+    Args:
+        host (str, optional): The host of the coordinator. Defaults to localhost.
+        port (int, optional): The port of the coordinator. Defaults to 8766.
+        processes (int, optional): The amount of worker processes, each with its
+            own connection. Defaults to 1, which works in the current process.
+
+    Returns:
+        int: The amount of chunks computed.
+    """
+    if processes == 1:
+        return _work_process((host, port))
+    # Spawned processes do not inherit the threads of the event loop.
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context) as pool:
+        return sum(pool.map(_work_process, [(host, port)] * processes))
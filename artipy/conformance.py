@@ -0,0 +1,433 @@
+"""Goodness-of-fit checks of artifact generation against the game's probabilities.
+
+Each aspect of generation has a pair of functions: ``expected_*`` returns the exact
+probability of every outcome, and ``sample_*`` counts the outcomes of an engine with a
+fixed seed. The counts are compared with :func:`chi_square_test` or :func:`g_test`,
+so any faster generation path can be checked against the reference
+:func:`artipy.analysis.create_random_artifact` and :meth:`artipy.artifacts.Artifact.upgrade`.
+
+Outcomes are counted on an :class:`artipy.batch.ArtifactBatch` with ``count_*``, so
+vectorized engines such as :func:`artipy.farming.generate_drops` are checked on their
+batches directly, without building an artifact per sample. The ``sample_*``
+functions drive engines that generate one artifact at a time and count their
+outcomes the same way.
+"""
+
+from __future__ import annotations
+
+import math
+from collections import Counter
+from copy import deepcopy
+from typing import TYPE_CHECKING, Any, NamedTuple, Protocol
+
+import numpy as np
+
+from artipy.analysis import FOUR_SUBSTAT_CHANCE, create_random_artifact
+from artipy.artifacts import Artifact
+from artipy.batch import EMPTY, ArtifactBatch
+from artipy.distributions import initial_substat_sets
+from artipy.records import STAT_CODES
+from artipy.types import VALID_MAINSTATS, ArtifactSlot, StatType
+from artipy.utils import possible_substat_values, seed_rng
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Hashable, Mapping
+
+__all__ = (
+    "ArtifactFactory",
+    "FitResult",
+    "chi2_sf",
+    "chi_square_test",
+    "count_initial_substats",
+    "count_mainstats",
+    "count_substat_counts",
+    "expected_initial_substats",
+    "expected_mainstats",
+    "expected_substat_counts",
+    "expected_upgrade_outcomes",
+    "g_test",
+    "sample_initial_substats",
+    "sample_mainstats",
+    "sample_substat_counts",
+    "sample_upgrade_outcomes",
+)
+
+_MAX_ITERATIONS = 10_000
+_TOLERANCE = 1e-15
+
+
+class ArtifactFactory(Protocol):
+    """A generation engine with the signature of
+    :func:`artipy.analysis.create_random_artifact`."""
+
+    def __call__(
+        self,
+        slot: ArtifactSlot,
+        rarity: int = 5,
+        *,
+        mainstat: StatType | None = None,
+    ) -> Artifact: ...
+
+
+class FitResult(NamedTuple):
+    """The outcome of a goodness-of-fit test.
+
+    Attributes:
+        statistic: The test statistic.
+        dof: The degrees of freedom.
+        p_value: The probability of a statistic at least this large if the observed
+            counts follow the expected distribution.
+    """
+
+    statistic: float
+    dof: int
+    p_value: float
+
+
+def _lower_gamma_series(a: float, x: float) -> float:
+    term = total = 1 / a
+    for n in range(1, _MAX_ITERATIONS):
+        term *= x / (a + n)
+        total += term
+        if abs(term) < abs(total) * _TOLERANCE:
+            break
+    return total * math.exp(-x + a * math.log(x) - math.lgamma(a))
+
+
+def _upper_gamma_fraction(a: float, x: float) -> float:
+    # Modified Lentz's method for the continued fraction of the upper gamma function.
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    h = d
+    for n in range(1, _MAX_ITERATIONS):
+        an = -n * (n - a)
+        b += 2
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1 / d
+        h *= d * c
+        if abs(d * c - 1) < _TOLERANCE:
+            break
+    return h * math.exp(-x + a * math.log(x) - math.lgamma(a))
+
+
+def chi2_sf(statistic: float, dof: int) -> float:
+    """The survival function of the chi-square distribution.
+
+    Args:
+        statistic (float): The value of the statistic.
+        dof (int): The degrees of freedom.
+
+    Returns:
+        float: The probability of a value at least as large as ``statistic``.
+    """
+    if math.isinf(statistic):
+        return 0.0
+    if statistic <= 0 or dof <= 0:
+        return 1.0
+    a, x = dof / 2, statistic / 2
+    if x < a + 1:
+        return max(0.0, 1 - _lower_gamma_series(a, x))
+    return _upper_gamma_fraction(a, x)
+
+
+def _align[K: Hashable](
+    observed: Mapping[K, int],
+    expected: Mapping[K, float],
+) -> tuple[np.ndarray, np.ndarray]:
+    keys = list(expected.keys() | observed.keys())
+    counts = np.array([observed.get(k, 0) for k in keys], dtype=np.float64)
+    probabilities = np.array([expected.get(k, 0.0) for k in keys])
+    return counts, probabilities / probabilities.sum() * counts.sum()
+
+
+def chi_square_test[K: Hashable](
+    observed: Mapping[K, int],
+    expected: Mapping[K, float],
+) -> FitResult:
+    """Pearson's chi-square test of observed counts against expected probabilities.
+
+    Args:
+        observed (Mapping[K, int]): The amount of samples of each outcome.
+        expected (Mapping[K, float]): The probability of each outcome.
+
+    Returns:
+        FitResult: The statistic, degrees of freedom and p-value. An observed outcome
+        with an expected probability of zero gives an infinite statistic.
+    """
+    counts, frequencies = _align(observed, expected)
+    if (counts[frequencies == 0] > 0).any():
+        return FitResult(math.inf, 0, 0.0)
+    possible = frequencies > 0
+    statistic = float(
+        ((counts[possible] - frequencies[possible]) ** 2 / frequencies[possible]).sum(),
+    )
+    dof = int(possible.sum()) - 1
+    return FitResult(statistic, dof, chi2_sf(statistic, dof))
+
+
+def g_test[K: Hashable](
+    observed: Mapping[K, int],
+    expected: Mapping[K, float],
+) -> FitResult:
+    """The likelihood-ratio G-test of observed counts against expected probabilities.
+
+    Args:
+        observed (Mapping[K, int]): The amount of samples of each outcome.
+        expected (Mapping[K, float]): The probability of each outcome.
+
+    Returns:
+        FitResult: The statistic, degrees of freedom and p-value. An observed outcome
+        with an expected probability of zero gives an infinite statistic.
+    """
+    counts, frequencies = _align(observed, expected)
+    if (counts[frequencies == 0] > 0).any():
+        return FitResult(math.inf, 0, 0.0)
+    seen = counts > 0
+    statistic = float(
+        2 * (counts[seen] * np.log(counts[seen] / frequencies[seen])).sum(),
+    )
+    dof = int((frequencies > 0).sum()) - 1
+    return FitResult(statistic, dof, chi2_sf(statistic, dof))
+
+
+def expected_mainstats(slot: ArtifactSlot) -> dict[StatType, float]:
+    """The probability of each mainstat of a slot.
+
+    Args:
+        slot (artipy.types.ArtifactSlot): The slot.
+
+    Returns:
+        dict[StatType, float]: The probability of each mainstat.
+    """
+    weights = VALID_MAINSTATS[slot]
+    total = sum(weights.values())
+    return {stat: weight / total for stat, weight in weights.items()}
+
+
+def expected_substat_counts(rarity: int) -> dict[int, float]:
+    """The probability of each amount of initial substats.
+
+    Args:
+        rarity (int): The rarity of the artifact.
+
+    Returns:
+        dict[int, float]: The probability of each amount of substats.
+    """
+    max_substats = rarity - 1
+    counts: Counter[int] = Counter()
+    counts[max_substats] += FOUR_SUBSTAT_CHANCE
+    counts[max(0, max_substats - 1)] += 1 - FOUR_SUBSTAT_CHANCE
+    return dict(counts)
+
+
+def expected_initial_substats(
+    mainstat: StatType,
+    rarity: int = 5,
+) -> dict[frozenset[StatType], float]:
+    """The probability of each unordered set of initial substats.
+
+    Args:
+        mainstat (artipy.types.StatType): The mainstat of the artifact.
+        rarity (int, optional): The rarity of the artifact. Defaults to 5.
+
+    Returns:
+        dict[frozenset[StatType], float]: The probability of each set.
+    """
+    return dict(initial_substat_sets(mainstat, rarity))
+
+
+def expected_upgrade_outcomes(artifact: Artifact) -> dict[tuple[StatType, int], float]:
+    """The probability of each substat and value tier an upgrade of a full artifact
+    lands on.
+
+    Args:
+        artifact (artipy.artifacts.Artifact): An artifact with all of its substats.
+
+    Returns:
+        dict[tuple[StatType, int], float]: The probability of each substat and tier
+        index, lowest tier first.
+    """
+    result: dict[tuple[StatType, int], float] = {}
+    for substat in artifact.substats:
+        tiers = len(possible_substat_values(substat.name, artifact.rarity))
+        for tier in range(tiers):
+            result[substat.name, tier] = 1 / len(artifact.substats) / tiers
+    return result
+
+
+def _count[K: Hashable](
+    values: np.ndarray,
+    key: Callable[[Any], K],
+) -> Counter[K]:
+    """Count the unique values, or rows of a 2-D array, keyed by ``key``."""
+    unique, counts = np.unique(values, axis=0, return_counts=True)
+    return Counter({key(u): int(c) for u, c in zip(unique, counts, strict=True)})
+
+
+def count_mainstats(batch: ArtifactBatch) -> Counter[StatType]:
+    """Count the mainstats of a batch.
+
+    Args:
+        batch (artipy.batch.ArtifactBatch): The artifacts.
+
+    Returns:
+        Counter[StatType]: The amount of artifacts with each mainstat.
+    """
+    return _count(batch.mainstat, lambda code: STAT_CODES[code])
+
+
+def count_substat_counts(batch: ArtifactBatch) -> Counter[int]:
+    """Count the amount of substats of the artifacts of a batch.
+
+    Args:
+        batch (artipy.batch.ArtifactBatch): The artifacts.
+
+    Returns:
+        Counter[int]: The amount of artifacts with each amount of substats.
+    """
+    return _count((batch.substats != EMPTY).sum(axis=1), int)
+
+
+def count_initial_substats(batch: ArtifactBatch) -> Counter[frozenset[StatType]]:
+    """Count the sets of substats of the artifacts of a batch.
+
+    Args:
+        batch (artipy.batch.ArtifactBatch): The artifacts.
+
+    Returns:
+        Counter[frozenset[StatType]]: The amount of artifacts with each set.
+    """
+    # Sets are unordered, so rows are sorted before they are compared.
+    return _count(
+        np.sort(batch.substats, axis=1),
+        lambda row: frozenset(STAT_CODES[code] for code in row if code != EMPTY),
+    )
+
+
+def sample_mainstats(
+    slot: ArtifactSlot,
+    n: int,
+    *,
+    seed: int,
+    generate: ArtifactFactory = create_random_artifact,
+) -> Counter[StatType]:
+    """Count the mainstats of ``n`` generated artifacts.
+
+    Args:
+        slot (artipy.types.ArtifactSlot): The slot to generate.
+        n (int): The amount of artifacts.
+        seed (int): The seed of the random number generator.
+        generate (ArtifactFactory, optional): The engine to sample. Defaults to
+            :func:`artipy.analysis.create_random_artifact`.
+
+    Returns:
+        Counter[StatType]: The amount of artifacts with each mainstat.
+    """
+    seed_rng(seed)
+    return count_mainstats(
+        ArtifactBatch.from_artifacts(generate(slot) for _ in range(n)),
+    )
+
+
+def sample_substat_counts(
+    rarity: int,
+    n: int,
+    *,
+    seed: int,
+    generate: ArtifactFactory = create_random_artifact,
+) -> Counter[int]:
+    """Count the amount of initial substats of ``n`` generated artifacts.
+
+    Args:
+        rarity (int): The rarity to generate.
+        n (int): The amount of artifacts.
+        seed (int): The seed of the random number generator.
+        generate (ArtifactFactory, optional): The engine to sample.
+
+    Returns:
+        Counter[int]: The amount of artifacts with each amount of substats.
+    """
+    seed_rng(seed)
+    return count_substat_counts(
+        ArtifactBatch.from_artifacts(
+            generate(ArtifactSlot.FLOWER, rarity) for _ in range(n)
+        ),
+    )
+
+
+def sample_initial_substats(  # noqa: PLR0913
+    slot: ArtifactSlot,
+    mainstat: StatType,
+    n: int,
+    *,
+    seed: int,
+    rarity: int = 5,
+    generate: ArtifactFactory = create_random_artifact,
+) -> Counter[frozenset[StatType]]:
+    """Count the sets of initial substats of ``n`` generated artifacts.
+
+    Args:
+        slot (artipy.types.ArtifactSlot): The slot to generate.
+        mainstat (artipy.types.StatType): The mainstat to generate.
+        n (int): The amount of artifacts.
+        seed (int): The seed of the random number generator.
+        rarity (int, optional): The rarity to generate. Defaults to 5.
+        generate (ArtifactFactory, optional): The engine to sample.
+
+    Returns:
+        Counter[frozenset[StatType]]: The amount of artifacts with each set.
+    """
+    seed_rng(seed)
+    return count_initial_substats(
+        ArtifactBatch.from_artifacts(
+            generate(slot, rarity, mainstat=mainstat) for _ in range(n)
+        ),
+    )
+
+
+def sample_upgrade_outcomes(
+    artifact: Artifact,
+    n: int,
+    *,
+    seed: int,
+    upgrade: Callable[[Artifact], None] = Artifact.upgrade,
+) -> Counter[tuple[StatType, int]]:
+    """Count the substat and value tier that ``n`` independent upgrades of an artifact
+    land on.
+
+    Args:
+        artifact (artipy.artifacts.Artifact): An artifact with all of its substats,
+            at a level that triggers a substat upgrade.
+        n (int): The amount of upgrades.
+        seed (int): The seed of the random number generator.
+        upgrade (Callable[[Artifact], None], optional): The engine to sample.
+            Defaults to :meth:`artipy.artifacts.Artifact.upgrade`.
+
+    Returns:
+        Counter[tuple[StatType, int]]: The amount of upgrades landing on each
+        substat and tier index.
+    """
+    seed_rng(seed)
+    upgrades = []
+    for _ in range(n):
+        upgraded = deepcopy(artifact)
+        upgrade(upgraded)
+        upgrades.append(upgraded)
+    batch = ArtifactBatch.from_artifacts(upgrades)
+    count = len(artifact.substats)
+    deltas = batch.substat_values[:, :count] - [float(s.value) for s in artifact.substats]
+    tiers = np.array([
+        [float(v) for v in possible_substat_values(s.name, artifact.rarity)]
+        for s in artifact.substats
+    ])
+    rows, positions = np.nonzero(deltas > 0)
+    nearest = np.abs(deltas[rows, positions, None] - tiers[positions]).argmin(axis=1)
+    return _count(
+        np.stack([positions, nearest], axis=1),
+        lambda outcome: (artifact.substats[outcome[0]].name, int(outcome[1])),
+    )
@@ -1,6 +1,7 @@
 """Module that handles JSON data for the stats module."""
 
 import re
+import threading
 from collections.abc import Iterator, Mapping, MutableMapping, Sequence
 from types import SimpleNamespace
 from typing import Any, ClassVar, cast
@@ -55,12 +56,17 @@ class DataGen:
     the instance is created. The data is stored as a list of SimpleNamespace objects,
     which allows for easy attribute-style access.
 
+    Instances are only published once their data is loaded, under a lock, so every
+    thread gets the same fully loaded instance.
+
     Attributes:
         _instances (MutableMapping[str, DataGen]): A dictionary that maps file names to DataGen instances.
+        _lock (threading.Lock): Guards the creation of instances.
         _data (Sequence[SimpleNamespace]): The data loaded from the JSON file.
     """
 
     _instances: ClassVar[MutableMapping[str, "DataGen"]] = {}
+    _lock: ClassVar[threading.Lock] = threading.Lock()
 
     def __new__(cls, file_name: str) -> "DataGen":
         """Create a new instance of the class if an instance with the same file name
@@ -72,11 +78,14 @@ class DataGen:
         Returns:
             DataGen: The instance of the DataGen class.
         """
-        if file_name not in cls._instances:
-            instance = super().__new__(cls)
-            cls._instances[file_name] = instance
-            instance._load_data(file_name)
-        return cls._instances[file_name]
+        if (instance := cls._instances.get(file_name)) is not None:
+            return instance
+        with cls._lock:
+            if (instance := cls._instances.get(file_name)) is None:
+                instance = super().__new__(cls)
+                instance._load_data(file_name)
+                cls._instances[file_name] = instance
+        return instance
 
     def _load_data(self, file_name: str) -> None:
         """Load data from a JSON file.
@@ -0,0 +1,541 @@
+"""Exact and sampled probability mass functions of artifact metrics.
+
+The exact distributions are derived from the same rules the generator follows: the
+weighted mainstat draw, the chance of starting with the maximum amount of substats,
+the weighted draw of substats without replacement and uniformly random upgrade
+targets and value tiers. They are exact for metrics that are a sum of per-roll
+contributions, such as the roll value and the crit value.
+"""
+
+from __future__ import annotations
+
+import math
+from collections import Counter, defaultdict
+from decimal import Decimal
+from functools import cache
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from artipy import UPGRADE_STEP
+from artipy.analysis import FOUR_SUBSTAT_CHANCE, ROUND_TO, ArtifactMethod
+from artipy.artifacts import Artifact, substat_weights
+from artipy.leveling import max_level
+from artipy.stats import SubStat
+from artipy.types import VALID_MAINSTATS, ArtifactSlot, StatType
+from artipy.utils import AliasSampler, possible_substat_values
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping
+
+__all__ = (
+    "exact_pmf",
+    "final_pmf",
+    "initial_probability",
+    "initial_state_table",
+    "initial_substat_orders",
+    "initial_substat_sampler",
+    "initial_substat_sets",
+    "initial_tier_probabilities",
+    "pmf_from_counts",
+    "pmf_mean",
+    "pmf_quantile",
+    "roll_contributions",
+    "sampled_counts",
+    "substat_order_probabilities",
+    "substat_set_probabilities",
+)
+
+type PMF = dict[Decimal, float]
+
+# Probabilities below this are floating point noise from the Fourier transform.
+_EPSILON = 1e-13
+
+
+def roll_contributions(
+    metric: ArtifactMethod[Decimal],
+    stat: StatType,
+    rarity: int,
+) -> tuple[Decimal, ...]:
+    """The contribution of a single roll of each value tier of a substat to a metric.
+
+    Args:
+        metric (ArtifactMethod[Decimal]): The metric.
+        stat (artipy.types.StatType): The substat.
+        rarity (int): The rarity of the artifact.
+
+    Returns:
+        tuple[Decimal, ...]: The contribution of each tier, lowest tier first.
+    """
+    contributions: list[Decimal] = []
+    for value in possible_substat_values(stat, rarity):
+        artifact = Artifact()
+        artifact.rarity = rarity
+        artifact.level = artifact.max_level
+        artifact.substats = [SubStat(stat, value, rarity)]
+        contributions.append(metric(artifact))
+    return tuple(contributions)
+
+
+@cache
+def _draw_orders(
+    excluded: frozenset[StatType],
+    count: int,
+) -> Mapping[tuple[StatType, ...], float]:
+    pool = {s: w for s, w in substat_weights.items() if s not in excluded}
+    result: dict[tuple[StatType, ...], float] = {}
+
+    def walk(chosen: tuple[StatType, ...], remaining: float, probability: float) -> None:
+        if len(chosen) == count:
+            result[chosen] = probability
+            return
+        for stat, weight in pool.items():
+            if stat not in chosen:
+                walk(
+                    (*chosen, stat),
+                    remaining - weight,
+                    probability * weight / remaining,
+                )
+
+    walk((), sum(pool.values()), 1.0)
+    return result
+
+
+@cache
+def _draw_probabilities(
+    excluded: frozenset[StatType],
+    count: int,
+) -> Mapping[frozenset[StatType], float]:
+    result: defaultdict[frozenset[StatType], float] = defaultdict(float)
+    for order, probability in _draw_orders(excluded, count).items():
+        result[frozenset(order)] += probability
+    return dict(result)
+
+
+def substat_set_probabilities(
+    mainstat: StatType,
+    count: int,
+) -> Mapping[frozenset[StatType], float]:
+    """The probability of every set of substats an artifact can end up with.
+
+    Substats are drawn one at a time by weight without replacement, and the mainstat
+    is never drawn as a substat.
+
+    Args:
+        mainstat (artipy.types.StatType): The mainstat of the artifact.
+        count (int): The amount of substats drawn.
+
+    Returns:
+        Mapping[frozenset[StatType], float]: The probability of each unordered set.
+    """
+    return _draw_probabilities(frozenset({mainstat}), count)
+
+
+def substat_order_probabilities(
+    mainstat: StatType,
+    count: int,
+) -> Mapping[tuple[StatType, ...], float]:
+    """The probability of every sequence of substats, in the order they are drawn.
+
+    Args:
+        mainstat (artipy.types.StatType): The mainstat of the artifact.
+        count (int): The amount of substats drawn.
+
+    Returns:
+        Mapping[tuple[StatType, ...], float]: The probability of each sequence.
+    """
+    return _draw_orders(frozenset({mainstat}), count)
+
+
+def _initial_counts(rarity: int) -> dict[int, float]:
+    max_substats = rarity - 1
+    counts: defaultdict[int, float] = defaultdict(float)
+    counts[max_substats] += FOUR_SUBSTAT_CHANCE
+    counts[max(0, max_substats - 1)] += 1 - FOUR_SUBSTAT_CHANCE
+    return dict(counts)
+
+
+@cache
+def initial_substat_orders(
+    mainstat: StatType,
+    rarity: int = 5,
+) -> Mapping[tuple[StatType, ...], float]:
+    """The probability of every sequence of initial substats of a new artifact.
+
+    Args:
+        mainstat (artipy.types.StatType): The mainstat of the artifact.
+        rarity (int, optional): The rarity of the artifact. Defaults to 5.
+
+    Returns:
+        Mapping[tuple[StatType, ...], float]: The probability of each sequence, in
+        the order the substats are drawn.
+    """
+    result: dict[tuple[StatType, ...], float] = {}
+    for count, p_count in _initial_counts(rarity).items():
+        for order, p_order in substat_order_probabilities(mainstat, count).items():
+            result[order] = p_count * p_order
+    return result
+
+
+@cache
+def initial_substat_sets(
+    mainstat: StatType,
+    rarity: int = 5,
+) -> Mapping[frozenset[StatType], float]:
+    """The probability of every set of initial substats of a new artifact.
+
+    Args:
+        mainstat (artipy.types.StatType): The mainstat of the artifact.
+        rarity (int, optional): The rarity of the artifact. Defaults to 5.
+
+    Returns:
+        Mapping[frozenset[StatType], float]: The probability of each set.
+    """
+    result: defaultdict[frozenset[StatType], float] = defaultdict(float)
+    for order, probability in initial_substat_orders(mainstat, rarity).items():
+        result[frozenset(order)] += probability
+    return dict(result)
+
+
+@cache
+def initial_state_table(
+    slot: ArtifactSlot,
+    rarity: int = 5,
+) -> Mapping[tuple[StatType, tuple[StatType, ...]], float]:
+    """The joint probability of the mainstat and initial substats of a new artifact.
+
+    Args:
+        slot (artipy.types.ArtifactSlot): The slot of the artifact.
+        rarity (int, optional): The rarity of the artifact. Defaults to 5.
+
+    Returns:
+        Mapping[tuple[StatType, tuple[StatType, ...]], float]: The probability of
+        each mainstat and sequence of substats.
+    """
+    return {
+        (mainstat, order): p_mainstat * p_order
+        for mainstat, p_mainstat in _mainstat_probabilities(slot, None).items()
+        for order, p_order in initial_substat_orders(mainstat, rarity).items()
+    }
+
+
+@cache
+def initial_substat_sampler(
+    mainstat: StatType,
+    rarity: int = 5,
+) -> AliasSampler[tuple[StatType, ...]]:
+    """A sampler drawing all initial substats of a new artifact in a single step.
+
+    Args:
+        mainstat (artipy.types.StatType): The mainstat of the artifact.
+        rarity (int, optional): The rarity of the artifact. Defaults to 5.
+
+    Returns:
+        artipy.utils.AliasSampler[tuple[StatType, ...]]: The sampler over
+        :func:`initial_substat_orders`.
+    """
+    orders = initial_substat_orders(mainstat, rarity)
+    return AliasSampler(tuple(orders), tuple(orders.values()))
+
+
+def initial_tier_probabilities(stat: StatType, rarity: int = 5) -> dict[Decimal, float]:
+    """The probability of each value a substat starts with.
+
+    Args:
+        stat (artipy.types.StatType): The substat.
+        rarity (int, optional): The rarity of the artifact. Defaults to 5.
+
+    Returns:
+        dict[Decimal, float]: The probability of each value tier.
+    """
+    values = possible_substat_values(stat, rarity)
+    return {value: 1 / len(values) for value in values}
+
+
+def initial_probability(artifact: Artifact) -> float:
+    """The probability of generating an artifact of its slot and rarity.
+
+    Args:
+        artifact (artipy.artifacts.Artifact): A new artifact at level 0.
+
+    Raises:
+        ValueError: If the artifact has been upgraded.
+
+    Returns:
+        float: The probability of its mainstat, its substats in their order and
+        their values. 0 if generation cannot produce the artifact.
+    """
+    if artifact.level:
+        msg = "Only artifacts at level 0 have an initial probability"
+        raise ValueError(msg)
+    order = tuple(s.name for s in artifact.substats)
+    probability = initial_state_table(artifact.artifact_slot, artifact.rarity).get(
+        (artifact.mainstat.name, order),
+        0.0,
+    )
+    for substat in artifact.substats:
+        tiers = initial_tier_probabilities(substat.name, artifact.rarity)
+        probability *= tiers.get(substat.value, 0.0)
+    return probability
+
+
+def _mainstat_probabilities(
+    slot: ArtifactSlot,
+    mainstat: StatType | None,
+) -> dict[StatType, float]:
+    weights = VALID_MAINSTATS[slot]
+    if mainstat is None:
+        total = sum(weights.values())
+        return {stat: weight / total for stat, weight in weights.items()}
+    if mainstat not in weights:
+        msg = f"Invalid mainstat '{mainstat.name}' for slot '{slot}'"
+        raise ValueError(msg)
+    return {mainstat: 1.0}
+
+
+def _baseline(metric: ArtifactMethod[Decimal], rarity: int, level: int) -> Decimal:
+    # The metric without any substats, e.g. the rolls still to come at a lower level.
+    artifact = Artifact()
+    artifact.rarity = rarity
+    artifact.level = level
+    return metric(artifact)
+
+
+def _roll_events(rarity: int, level: int) -> int:
+    # Every level up from a multiple of the upgrade step adds or upgrades a substat.
+    return math.ceil(level / UPGRADE_STEP) if rarity > 1 else 0
+
+
+@cache
+def _roll_units(
+    metric: ArtifactMethod[Decimal],
+    rarity: int,
+    resolution: Decimal,
+) -> Mapping[StatType, tuple[int, ...]]:
+    units: dict[StatType, tuple[int, ...]] = {}
+    for stat in substat_weights:
+        contributions = roll_contributions(metric, stat, rarity)
+        if any(c < 0 for c in contributions):
+            msg = f"Metric has negative contributions for '{stat.name}'"
+            raise ValueError(msg)
+        units[stat] = tuple(
+            int((c / resolution).to_integral_value()) for c in contributions
+        )
+    return units
+
+
+@cache
+def _roll_spectra(
+    metric: ArtifactMethod[Decimal],
+    rarity: int,
+    resolution: Decimal,
+    size: int,
+) -> Mapping[StatType, np.ndarray]:
+    spectra: dict[StatType, np.ndarray] = {}
+    for stat, units in _roll_units(metric, rarity, resolution).items():
+        single_roll = np.zeros(size)
+        np.add.at(single_roll, list(units), 1 / len(units))
+        spectra[stat] = np.fft.rfft(single_roll)
+    return spectra
+
+
+def _grid_size(
+    metric: ArtifactMethod[Decimal],
+    rarity: int,
+    resolution: Decimal,
+    rolls: int,
+) -> int:
+    units = _roll_units(metric, rarity, resolution)
+    return 1 << (max(max(u) for u in units.values()) * rolls + 1).bit_length()
+
+
+def _outcome_spectrum(
+    spectra: Mapping[StatType, np.ndarray],
+    *,
+    excluded: frozenset[StatType],
+    existing: frozenset[StatType],
+    draws: int,
+    upgrades: int,
+) -> np.ndarray:
+    """The spectrum of the metric added by drawing new substats with one roll each,
+    followed by upgrading uniformly random substats."""
+    total = np.zeros_like(next(iter(spectra.values())))
+    for new, probability in _draw_probabilities(excluded | existing, draws).items():
+        spectrum = np.ones_like(total)
+        for substat in new:
+            spectrum *= spectra[substat]
+        if upgrades:
+            final = existing | new
+            spectrum *= (sum(spectra[s] for s in final) / len(final)) ** upgrades
+        total += probability * spectrum
+    return total
+
+
+def _to_pmf(spectrum: np.ndarray, size: int, resolution: Decimal, offset: Decimal) -> PMF:
+    pmf = np.fft.irfft(spectrum, size)
+    return {
+        (offset + index * resolution).quantize(resolution): float(probability)
+        for index, probability in enumerate(pmf)
+        if probability > _EPSILON
+    }
+
+
+def exact_pmf(  # noqa: PLR0913
+    metric: ArtifactMethod[Decimal],
+    slot: ArtifactSlot,
+    *,
+    mainstat: StatType | None = None,
+    rarity: int = 5,
+    level: int | None = None,
+    resolution: Decimal = ROUND_TO,
+) -> PMF:
+    """The exact distribution of a metric over freshly generated artifacts upgraded to
+    a level.
+
+    Every roll contributes independently to an additive metric, so the distribution
+    for a fixed set of substats is the convolution of the initial rolls with the
+    upgrade rolls. These convolutions are evaluated on a grid of ``resolution``
+    with Fourier transforms and mixed over every reachable set of substats. Metrics
+    that depend on the level, such as the maximum roll value, are shifted by their
+    value for an artifact without substats at that level.
+
+    Args:
+        metric (ArtifactMethod[Decimal]): An additive metric, e.g.
+            :func:`artipy.analysis.calculate_artifact_crit_value`.
+        slot (artipy.types.ArtifactSlot): The slot of the artifacts.
+        mainstat (artipy.types.StatType, optional): Fix the mainstat. Defaults to the
+            weighted mainstat distribution of the slot.
+        rarity (int, optional): The rarity of the artifacts. Defaults to 5.
+        level (int, optional): The level the artifacts are upgraded to. Defaults to
+            the maximum level of the rarity.
+        resolution (Decimal, optional): The grid the contribution of each roll is
+            rounded to. Defaults to ROUND_TO.
+
+    Raises:
+        ValueError: If the mainstat or level are invalid, or the metric has negative
+            contributions.
+
+    Returns:
+        PMF: The probability of each value of the metric.
+    """
+    mainstats = _mainstat_probabilities(slot, mainstat)
+    level = max_level(rarity) if level is None else level
+    if level not in range(max_level(rarity) + 1):
+        msg = f"Invalid level '{level}' for rarity '{rarity}'"
+        raise ValueError(msg)
+
+    events = _roll_events(rarity, level)
+    max_substats = rarity - 1
+
+    size = _grid_size(metric, rarity, resolution, max_substats + events)
+    spectra = _roll_spectra(metric, rarity, resolution, size)
+    total = np.zeros(size // 2 + 1, dtype=np.complex128)
+    for stat, p_mainstat in mainstats.items():
+        for initial, p_initial in _initial_counts(rarity).items():
+            count = min(initial + events, max_substats)
+            total += (p_mainstat * p_initial) * _outcome_spectrum(
+                spectra,
+                excluded=frozenset({stat}),
+                existing=frozenset(),
+                draws=count,
+                upgrades=events - (count - initial),
+            )
+    return _to_pmf(total, size, resolution, _baseline(metric, rarity, level))
+
+
+def final_pmf(
+    artifact: Artifact,
+    metric: ArtifactMethod[Decimal],
+    *,
+    resolution: Decimal = ROUND_TO,
+) -> PMF:
+    """The exact distribution of a metric once an artifact is upgraded to its maximum
+    level.
+
+    Args:
+        artifact (artipy.artifacts.Artifact): The artifact in its current state.
+        metric (ArtifactMethod[Decimal]): An additive metric, e.g.
+            :func:`artipy.analysis.calculate_artifact_crit_value`.
+        resolution (Decimal, optional): The grid the contribution of each remaining
+            roll is rounded to. Defaults to ROUND_TO.
+
+    Returns:
+        PMF: The probability of each final value of the metric.
+    """
+    rarity, max_substats = artifact.rarity, artifact.rarity - 1
+    events = _roll_events(rarity, artifact.max_level) - _roll_events(
+        rarity,
+        artifact.level,
+    )
+    existing = frozenset(s.name for s in artifact.substats)
+    draws = min(events, max(0, max_substats - len(existing)))
+
+    size = _grid_size(metric, rarity, resolution, events)
+    spectrum = _outcome_spectrum(
+        _roll_spectra(metric, rarity, resolution, size),
+        excluded=frozenset({artifact.mainstat.name}),
+        existing=existing,
+        draws=draws,
+        upgrades=events - draws,
+    )
+    return _to_pmf(spectrum, size, resolution, metric(artifact))
+
+
+def pmf_mean(pmf: Mapping[Decimal, float]) -> float:
+    """The expected value of a distribution.
+
+    Args:
+        pmf (Mapping[Decimal, float]): The distribution.
+
+    Returns:
+        float: The expected value.
+    """
+    return sum(float(value) * probability for value, probability in pmf.items())
+
+
+def pmf_quantile(pmf: Mapping[Decimal, float], q: float) -> Decimal:
+    """The smallest value whose cumulative probability reaches ``q``.
+
+    Args:
+        pmf (Mapping[Decimal, float]): The distribution.
+        q (float): The quantile, between 0 and 1.
+
+    Returns:
+        Decimal: The value at the quantile.
+    """
+    cumulative = 0.0
+    values = sorted(pmf)
+    for value in values:
+        cumulative += pmf[value]
+        if cumulative >= q - _EPSILON:
+            return value
+    return values[-1]
+
+
+def pmf_from_counts(counts: Mapping[Decimal, int]) -> PMF:
+    """Normalise a histogram of sampled values into a distribution.
+
+    Args:
+        counts (Mapping[Decimal, int]): The amount of samples of each value.
+
+    Returns:
+        PMF: The observed probability of each value, in ascending order of value.
+    """
+    total = sum(counts.values())
+    return {value: counts[value] / total for value in sorted(counts)}
+
+
+def sampled_counts(
+    values: Iterable[Decimal],
+    resolution: Decimal = ROUND_TO,
+) -> Counter[Decimal]:
+    """Histogram sampled values on a grid of ``resolution``.
+
+    Args:
+        values (Iterable[Decimal]): The sampled values.
+        resolution (Decimal, optional): The grid to round to. Defaults to ROUND_TO.
+
+    Returns:
+        Counter[Decimal]: The amount of samples of each rounded value.
+    """
+    return Counter(value.quantize(resolution) for value in values)
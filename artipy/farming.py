@@ -0,0 +1,458 @@
+"""Vectorized simulation of farming artifact domains.
+
+The domains and the pieces each set drops come from ``ReliquarySetExcelConfigData``
+and ``ReliquaryCodexExcelConfigData``. Sets that share a ``dungeonGroup`` drop from
+the same domain. Every drop picks a set of the domain and a piece of that set
+uniformly, and its mainstat, substats and upgrades follow the same rules as
+:func:`artipy.analysis.create_random_artifact` and
+:meth:`artipy.artifacts.Artifact.upgrade`, drawn with NumPy for whole batches at once.
+"""
+
+from __future__ import annotations
+
+import math
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import cache
+from typing import TYPE_CHECKING, cast
+
+import numpy as np
+
+from artipy import MAX_RARITY, UPGRADE_STEP
+from artipy.analysis import FOUR_SUBSTAT_CHANCE
+from artipy.artifacts import substat_weights
+from artipy.batch import EMPTY, ArtifactBatch
+from artipy.data_gen import DataGen
+from artipy.leveling import max_level
+from artipy.records import MAX_SUBSTATS, SET_CODES, SLOT_CODES, STAT_CODES
+from artipy.rolls import MAX_TIERS
+from artipy.types import VALID_MAINSTATS, ArtifactSet, ArtifactSlot, StatType
+from artipy.utils import (
+    possible_mainstat_values,
+    possible_substat_values,
+    weighted_sampler,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from types import SimpleNamespace
+
+__all__ = (
+    "EXTRA_DROP_CHANCE",
+    "RESIN_PER_RUN",
+    "Domain",
+    "Target",
+    "candidate_chance",
+    "domain_of",
+    "domains",
+    "generate_drops",
+    "set_rarities",
+    "set_slots",
+    "simulate_farming",
+)
+
+# Resin spent on a single domain run.
+RESIN_PER_RUN = 20
+
+# Chance for a domain run to drop a second piece of the highest rarity.
+EXTRA_DROP_CHANCE = 0.07
+
+SET_DATA = DataGen("ReliquarySetExcelConfigData.json")
+CODEX_DATA = DataGen("ReliquaryCodexExcelConfigData.json")
+
+# The fourth digit of a piece id is its slot.
+_PIECE_SLOTS = {
+    "1": ArtifactSlot.GOBLET,
+    "2": ArtifactSlot.PLUME,
+    "3": ArtifactSlot.CIRCLET,
+    "4": ArtifactSlot.FLOWER,
+    "5": ArtifactSlot.SANDS,
+}
+
+_SUBSTATS: tuple[StatType, ...] = tuple(substat_weights)
+_WEIGHTS = np.array([substat_weights[s] for s in _SUBSTATS], dtype=np.float64)
+_SUBSTAT_CODES = np.array([STAT_CODES.index(s) for s in _SUBSTATS], dtype=np.int8)
+
+
+@cache
+def _set_rows() -> dict[ArtifactSet, SimpleNamespace]:
+    # Sets that can drop are declared in the same order as ArtifactSet.
+    rows = sorted(
+        (row for row in SET_DATA if not getattr(row, "disable_filter", 0)),
+        key=lambda row: row.set_id,
+    )
+    return dict(zip(ArtifactSet, rows, strict=True))
+
+
+@cache
+def set_slots(artifact_set: ArtifactSet) -> tuple[ArtifactSlot, ...]:
+    """The slots a set has pieces for.
+
+    Args:
+        artifact_set (artipy.types.ArtifactSet): The set.
+
+    Returns:
+        tuple[ArtifactSlot, ...]: The slots, in declaration order.
+    """
+    pieces = {
+        _PIECE_SLOTS[str(piece)[3]] for piece in _set_rows()[artifact_set].contains_list
+    }
+    return tuple(slot for slot in ArtifactSlot if slot in pieces)
+
+
+@cache
+def set_rarities() -> dict[ArtifactSet, tuple[int, ...]]:
+    """The rarities each set drops in according to the codex.
+
+    Returns:
+        dict[ArtifactSet, tuple[int, ...]]: The rarities of each set, ascending.
+    """
+    by_id: defaultdict[int, set[int]] = defaultdict(set)
+    for row in CODEX_DATA:
+        by_id[row.suit_id].add(row.level)
+    return {
+        artifact_set: tuple(sorted(by_id[row.set_id]))
+        for artifact_set, row in _set_rows().items()
+    }
+
+
+@dataclass(frozen=True, slots=True)
+class Domain:
+    """A domain and the sets it drops.
+
+    Attributes:
+        sets: The sets, each dropping with equal probability.
+        rarity: The rarity of the pieces that are simulated.
+    """
+
+    sets: tuple[ArtifactSet, ...]
+    rarity: int = 5
+
+    def __str__(self) -> str:
+        return " / ".join(str(s) for s in self.sets)
+
+
+@cache
+def domains() -> tuple[Domain, ...]:
+    """Every domain, i.e. every group of sets sharing a ``dungeonGroup``.
+
+    Returns:
+        tuple[Domain, ...]: The domains, ordered by their first set.
+    """
+    groups: defaultdict[tuple[int, ...], list[ArtifactSet]] = defaultdict(list)
+    for artifact_set, row in _set_rows().items():
+        if row.dungeon_group:
+            groups[tuple(row.dungeon_group)].append(artifact_set)
+    rarities = set_rarities()
+    return tuple(
+        Domain(tuple(sets), max(max(rarities[s]) for s in sets))
+        for sets in groups.values()
+    )
+
+
+def domain_of(artifact_set: ArtifactSet) -> Domain:
+    """The domain a set drops from.
+
+    Args:
+        artifact_set (artipy.types.ArtifactSet): The set.
+
+    Raises:
+        ValueError: If the set does not drop from a domain.
+
+    Returns:
+        Domain: The domain.
+    """
+    for domain in domains():
+        if artifact_set in domain.sets:
+            return domain
+    msg = f"'{artifact_set}' does not drop from a domain"
+    raise ValueError(msg)
+
+
+@dataclass(frozen=True, slots=True)
+class Target:
+    """The artifact a player is farming for.
+
+    Attributes:
+        artifact_set: Require this set.
+        slot: Require this slot.
+        mainstat: Require this mainstat. Requires a slot.
+        predicate: A vectorized condition on the drops once upgraded to ``level``,
+            e.g. ``lambda batch: crit_values(batch) >= 40``.
+        level: The level drops are upgraded to before the predicate is checked.
+            Defaults to the maximum level.
+    """
+
+    artifact_set: ArtifactSet | None = None
+    slot: ArtifactSlot | None = None
+    mainstat: StatType | None = None
+    predicate: Callable[[ArtifactBatch], np.ndarray] | None = None
+    level: int | None = None
+
+    def __post_init__(self) -> None:
+        if self.mainstat is not None and self.slot is None:
+            msg = "A slot is required when targeting a mainstat"
+            raise ValueError(msg)
+        if self.level is not None and self.level not in range(max_level(MAX_RARITY) + 1):
+            msg = f"Invalid level '{self.level}'"
+            raise ValueError(msg)
+
+
+@cache
+def _tier_values(rarity: int) -> np.ndarray:
+    values = np.zeros((len(_SUBSTATS), MAX_TIERS))
+    for i, stat in enumerate(_SUBSTATS):
+        tiers = possible_substat_values(stat, rarity)
+        values[i, : len(tiers)] = [float(t) for t in tiers]
+    return values
+
+
+@cache
+def _mainstat_values(rarity: int) -> np.ndarray:
+    values = np.zeros((len(STAT_CODES), max_level(rarity) + 1))
+    for code, stat in enumerate(STAT_CODES):
+        if levels := possible_mainstat_values(stat, rarity):
+            values[code, : len(levels)] = [float(v) for v in levels[: values.shape[1]]]
+    return values
+
+
+def _pick(rng: np.random.Generator, options: np.ndarray, n: int) -> np.ndarray:
+    return options[rng.integers(0, len(options), n)] if n else options[:0]
+
+
+def generate_drops(  # noqa: PLR0913, PLR0914
+    n: int,
+    domain: Domain,
+    *,
+    rng: np.random.Generator,
+    artifact_set: ArtifactSet | None = None,
+    slot: ArtifactSlot | None = None,
+    mainstat: StatType | None = None,
+    level: int | None = 0,
+) -> ArtifactBatch:
+    """Generate domain drops and upgrade them, vectorized over the whole batch.
+
+    Args:
+        n (int): The amount of drops.
+        domain (Domain): The domain dropping the pieces.
+        rng (np.random.Generator): The random number generator.
+        artifact_set (artipy.types.ArtifactSet, optional): Only generate this set.
+        slot (artipy.types.ArtifactSlot, optional): Only generate this slot.
+        mainstat (artipy.types.StatType, optional): Only generate this mainstat.
+        level (int, optional): Upgrade the drops to this level. ``None`` for the
+            maximum level. Defaults to 0.
+
+    Raises:
+        ValueError: If the set, slot or mainstat cannot drop from the domain, or the
+            level is out of range for its rarity.
+
+    Returns:
+        artipy.batch.ArtifactBatch: The drops.
+    """
+    rarity = domain.rarity
+    level = max_level(rarity) if level is None else level
+    if level not in range(max_level(rarity) + 1):
+        msg = f"Invalid level '{level}' for rarity '{rarity}'"
+        raise ValueError(msg)
+    if artifact_set is not None and artifact_set not in domain.sets:
+        msg = f"'{artifact_set}' does not drop from '{domain}'"
+        raise ValueError(msg)
+    candidates = (artifact_set,) if artifact_set else domain.sets
+    # A drop of the slot comes from each set with the chance it drops that slot.
+    weights = np.array([
+        1.0 if slot is None else (slot in set_slots(s)) / len(set_slots(s))
+        for s in candidates
+    ])
+    if not weights.any():
+        msg = f"No set of '{domain}' has a {slot}"
+        raise ValueError(msg)
+    sets = np.array([SET_CODES.index(s) for s in candidates], dtype=np.uint8)
+    set_codes = rng.choice(sets, n, p=weights / weights.sum())
+
+    slot_codes = np.empty(n, dtype=np.uint8)
+    for code in np.unique(set_codes):
+        slots = set_slots(SET_CODES[code])
+        options = (slot,) if slot is not None else slots
+        mask = set_codes == code
+        slot_codes[mask] = _pick(
+            rng,
+            np.array([SLOT_CODES.index(s) for s in options], dtype=np.uint8),
+            int(mask.sum()),
+        )
+
+    mainstats = np.empty(n, dtype=np.int8)
+    for code in np.unique(slot_codes):
+        weights = cast("dict[StatType, float]", VALID_MAINSTATS[SLOT_CODES[code]])
+        if mainstat is not None and mainstat not in weights:
+            msg = f"Invalid mainstat '{mainstat.name}' for slot '{SLOT_CODES[code]}'"
+            raise ValueError(msg)
+        stats = (mainstat,) if mainstat is not None else tuple(weights)
+        sampler = weighted_sampler(stats, tuple(weights[s] for s in stats))
+        mask = slot_codes == code
+        codes = np.array([STAT_CODES.index(s) for s in stats], dtype=np.int8)
+        mainstats[mask] = codes[sampler.draw_indices(int(mask.sum()), rng)]
+
+    substats, rolls = _roll_substats(n, rarity, level, mainstats, rng)
+    values = np.einsum("ijk,ijk->ij", rolls, _tier_values(rarity)[substats.clip(0)])
+    return ArtifactBatch(
+        slot=slot_codes,
+        set=set_codes,
+        rarity=np.full(n, rarity, dtype=np.uint8),
+        level=np.full(n, level, dtype=np.uint8),
+        mainstat=mainstats,
+        mainstat_value=_mainstat_values(rarity)[mainstats, level],
+        substats=np.where(substats == EMPTY, EMPTY, _SUBSTAT_CODES[substats.clip(0)]),
+        substat_values=np.where(substats == EMPTY, 0.0, values),
+    )
+
+
+def _roll_substats(
+    n: int,
+    rarity: int,
+    level: int,
+    mainstats: np.ndarray,
+    rng: np.random.Generator,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Draw the substats of each drop and the amount of rolls in each value tier.
+
+    Weighted draws without replacement are equivalent to ordering the substats by
+    exponential keys divided by their weight, smallest first. Substats added by
+    upgrades continue that order.
+    """
+    max_substats = rarity - 1
+    excluded = _SUBSTAT_CODES[None, :] == mainstats[:, None]
+    keys = rng.standard_exponential((n, len(_SUBSTATS)), dtype=np.float32) / _WEIGHTS
+    keys[excluded] = np.inf
+    order = np.argsort(keys, axis=1)[:, :MAX_SUBSTATS]
+    tiers = len(possible_substat_values(_SUBSTATS[0], rarity))
+
+    count = np.where(
+        rng.random(n, dtype=np.float32) < FOUR_SUBSTAT_CHANCE,
+        max_substats,
+        max(0, max_substats - 1),
+    )
+    # Roll counts per substat and tier, flattened so every roll is a single index.
+    rolls = np.zeros(n * MAX_SUBSTATS * MAX_TIERS, dtype=np.uint8)
+    base = np.arange(n) * (MAX_SUBSTATS * MAX_TIERS)
+    for position in range(max_substats):
+        initial = count > position
+        tier = rng.integers(0, tiers, n, dtype=np.int64)
+        rolls[(base + position * MAX_TIERS + tier)[initial]] += 1
+
+    events = math.ceil(level / UPGRADE_STEP) if rarity > 1 else 0
+    for _ in range(events):
+        adding = count < max_substats
+        position = np.where(
+            adding,
+            count,
+            rng.integers(0, max(1, max_substats), n, dtype=np.int64),
+        )
+        rolls[base + position * MAX_TIERS + rng.integers(0, tiers, n)] += 1
+        count += adding
+
+    present = np.arange(MAX_SUBSTATS)[None, :] < count[:, None]
+    return np.where(present, order, EMPTY), rolls.reshape(n, MAX_SUBSTATS, MAX_TIERS)
+
+
+def candidate_chance(domain: Domain, target: Target) -> float:
+    """The probability that a single drop has the target set, slot and mainstat.
+
+    Args:
+        domain (Domain): The domain dropping the pieces.
+        target (Target): The target. Its predicate is ignored.
+
+    Returns:
+        float: The probability, 0 if the target cannot drop from the domain.
+    """
+    chance = 1.0
+    if target.artifact_set is not None:
+        if target.artifact_set not in domain.sets:
+            return 0.0
+        chance /= len(domain.sets)
+    if target.slot is not None:
+        sets = (target.artifact_set,) if target.artifact_set else domain.sets
+        chance *= sum(
+            (target.slot in set_slots(s)) / len(set_slots(s)) for s in sets
+        ) / len(sets)
+    if target.mainstat is not None and target.slot is not None:
+        weights = cast("dict[StatType, float]", VALID_MAINSTATS[target.slot])
+        chance *= weights.get(target.mainstat, 0) / sum(weights.values())
+    return chance
+
+
+def simulate_farming(  # noqa: PLR0913
+    domain: Domain,
+    target: Target,
+    *,
+    players: int,
+    resin: int,
+    seed: int | None = None,
+    block: int = 64,
+) -> np.ndarray:
+    """Simulate players farming a domain until they get the target.
+
+    Each run drops one piece, or two with :data:`EXTRA_DROP_CHANCE`. A drop is a
+    candidate if it has the target set, slot and mainstat. Only candidates are
+    generated in full and checked against the predicate, so rare targets cost little
+    more than common ones.
+
+    Args:
+        domain (Domain): The domain every player farms.
+        target (Target): The artifact the players are after.
+        players (int): The amount of simulated players.
+        resin (int): The resin budget of each player.
+        seed (int, optional): Seed for reproducible results.
+        block (int, optional): Runs simulated per player at once. Defaults to 64.
+
+    Raises:
+        ValueError: If the target cannot drop from the domain, or its level is out of
+            range for the rarity of the domain.
+
+    Returns:
+        np.ndarray: The amount of runs each player needed, or -1 if the budget ran
+        out first.
+    """
+    if target.level is not None and target.level > max_level(domain.rarity):
+        msg = f"Invalid level '{target.level}' for rarity '{domain.rarity}'"
+        raise ValueError(msg)
+    rng = np.random.default_rng(seed)
+    chance = candidate_chance(domain, target)
+    if chance == 0:
+        msg = f"The target cannot drop from '{domain}'"
+        raise ValueError(msg)
+
+    # Every run drops 0, 1 or 2 candidates, drawn from a single uniform number.
+    none = (1 - EXTRA_DROP_CHANCE) * (1 - chance) + EXTRA_DROP_CHANCE * (1 - chance) ** 2
+    at_most_one = 1 - EXTRA_DROP_CHANCE * chance**2
+    max_runs = resin // RESIN_PER_RUN
+    result = np.full(players, -1, dtype=np.int64)
+    active = np.arange(players)
+    for start in range(0, max_runs, block):
+        if not len(active):
+            break
+        runs = min(block, max_runs - start)
+        draws = rng.random(len(active) * runs, dtype=np.float32)
+        candidates = (draws >= none).astype(np.int64) + (draws >= at_most_one)
+        if not candidates.any():
+            continue
+
+        owner = np.repeat(np.arange(candidates.size), candidates)
+        if target.predicate is not None:
+            batch = generate_drops(
+                len(owner),
+                domain,
+                rng=rng,
+                artifact_set=target.artifact_set,
+                slot=target.slot,
+                mainstat=target.mainstat,
+                level=target.level,
+            )
+            owner = owner[np.asarray(target.predicate(batch), dtype=bool)]
+        hits = np.zeros(candidates.size, dtype=bool)
+        hits[owner] = True
+        hits = hits.reshape(len(active), runs)
+
+        done = hits.any(axis=1)
+        result[active[done]] = start + hits[done].argmax(axis=1) + 1
+        active = active[~done]
+    return result
@@ -0,0 +1,367 @@
+"""Importance sampling and stratification for the probability of rare artifacts.
+
+Questions such as the chance that a fresh circlet reaches 50 crit value concern the
+far tail of the distribution, which plain simulation only reaches after billions of
+artifacts. The sampler here follows the rules of the generator, but with the draws
+that matter tilted towards the event: a :class:`Tilt` makes some substats more
+likely to be drawn and to be picked by upgrades, and optionally their higher value
+tiers more likely to be rolled. Every sample carries the ratio of its probability
+under the real rules to its probability under the tilted ones, so the weighted
+fraction of samples with the event is an unbiased estimate of its probability.
+
+On top of that, samples are stratified over the mainstat and the amount of initial
+substats, whose probabilities are known exactly, so no variance is spent on how
+often each of them comes up. The estimate comes with a normal confidence interval
+from the sample variance of every stratum.
+"""
+
+from __future__ import annotations
+
+import math
+from collections import defaultdict
+from dataclasses import dataclass, field
+from statistics import NormalDist
+from typing import TYPE_CHECKING, NamedTuple
+
+from artipy import UPGRADE_STEP
+from artipy.analysis import ARTIFACT_ATTRIBUTES, FOUR_SUBSTAT_CHANCE
+from artipy.artifacts import ArtifactSnapshot, StatSnapshot, substat_weights
+from artipy.leveling import max_level
+from artipy.types import VALID_MAINSTATS, ArtifactSet, ArtifactSlot, StatType
+from artipy.utils import possible_mainstat_values, possible_substat_values, rng, seed_rng
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Mapping
+    from decimal import Decimal
+
+__all__ = (
+    "Stratum",
+    "TailEstimate",
+    "Tilt",
+    "estimate_probability",
+    "metric_at_least",
+    "sample_tilted",
+)
+
+type Event = Callable[[ArtifactSnapshot], bool]
+
+
+@dataclass(frozen=True, slots=True)
+class Tilt:
+    """How the biased sampler favours the stats an event depends on.
+
+    Attributes:
+        stats: How many times more likely each stat is to be drawn as a new substat
+            and to be picked by an upgrade. Stats that are not given keep their
+            odds.
+        tiers: How many times more likely every value tier of a tilted stat is than
+            the tier below it. Defaults to 1, uniform tiers.
+    """
+
+    stats: Mapping[StatType, float] = field(default_factory=dict)
+    tiers: float = 1.0
+
+    @classmethod
+    def toward(
+        cls,
+        stats: Iterable[StatType],
+        factor: float = 4.0,
+        tiers: float = 1.0,
+    ) -> Tilt:
+        """Tilt the same amount towards every given stat.
+
+        Args:
+            stats (Iterable[artipy.types.StatType]): The stats to favour.
+            factor (float, optional): How much to favour them. Defaults to 4.
+            tiers (float, optional): See :attr:`tiers`. Defaults to 1.
+
+        Returns:
+            Tilt: The tilt.
+        """
+        return cls(dict.fromkeys(stats, factor), tiers)
+
+    def factor(self, stat: StatType) -> float:
+        """How many times more likely a stat is made."""
+        return self.stats.get(stat, 1.0)
+
+
+def _draw(weights: list[float], tilted: list[float]) -> tuple[int, float]:
+    """Draw an index proportional to the tilted weights.
+
+    Returns:
+        The index and the ratio of its real to its tilted probability.
+    """
+    total = sum(tilted)
+    x = rng().random() * total
+    index = len(tilted) - 1
+    for i, weight in enumerate(tilted):
+        if x < weight:
+            index = i
+            break
+        x -= weight
+    return index, weights[index] / sum(weights) * total / tilted[index]
+
+
+def _roll(stat: StatType, rarity: int, tilt: Tilt) -> tuple[Decimal, float]:
+    values = possible_substat_values(stat, rarity)
+    if tilt.tiers == 1 or stat not in tilt.stats:
+        return rng().choice(values), 1.0
+    index, ratio = _draw([1.0] * len(values), [tilt.tiers**i for i in range(len(values))])
+    return values[index], ratio
+
+
+def _new_substat(
+    stats: list[StatType],
+    values: list[Decimal],
+    excluded: set[StatType],
+    rarity: int,
+    tilt: Tilt,
+) -> float:
+    pool = [s for s in substat_weights if s not in excluded]
+    weights = [substat_weights[s] for s in pool]
+    index, ratio = _draw(
+        weights,
+        [w * tilt.factor(s) for s, w in zip(pool, weights, strict=True)],
+    )
+    stat = pool[index]
+    value, value_ratio = _roll(stat, rarity, tilt)
+    stats.append(stat)
+    values.append(value)
+    excluded.add(stat)
+    return ratio * value_ratio
+
+
+def sample_tilted(  # noqa: PLR0913
+    slot: ArtifactSlot,
+    mainstat: StatType,
+    initial_substats: int,
+    tilt: Tilt,
+    *,
+    rarity: int = 5,
+    level: int | None = None,
+) -> tuple[ArtifactSnapshot, float]:
+    """Generate an artifact with a given mainstat and amount of initial substats and
+    upgrade it, with the draws tilted.
+
+    Args:
+        slot (artipy.types.ArtifactSlot): The slot of the artifact.
+        mainstat (artipy.types.StatType): The mainstat of the artifact.
+        initial_substats (int): The amount of substats it starts with.
+        tilt (Tilt): How to tilt the draws.
+        rarity (int, optional): The rarity of the artifact. Defaults to 5.
+        level (int, optional): The level to upgrade to. Defaults to the maximum level
+            of the rarity.
+
+    Raises:
+        ValueError: If the level is out of range for the rarity.
+
+    Returns:
+        tuple[artipy.artifacts.ArtifactSnapshot, float]: The artifact, and the ratio
+        of its probability under the real rules to that under the tilted ones.
+    """
+    max_substats = rarity - 1
+    level = max_level(rarity) if level is None else level
+    if level not in range(max_level(rarity) + 1):
+        msg = f"Invalid level '{level}' for rarity '{rarity}'"
+        raise ValueError(msg)
+    stats: list[StatType] = []
+    values: list[Decimal] = []
+    excluded = {mainstat}
+    ratio = 1.0
+    for _ in range(initial_substats):
+        ratio *= _new_substat(stats, values, excluded, rarity, tilt)
+    for _ in range(-(-level // UPGRADE_STEP)):
+        if len(stats) < max_substats:
+            ratio *= _new_substat(stats, values, excluded, rarity, tilt)
+        elif stats:
+            factors = [tilt.factor(s) for s in stats]
+            index, pick_ratio = _draw([1.0] * len(stats), factors)
+            value, value_ratio = _roll(stats[index], rarity, tilt)
+            values[index] += value
+            ratio *= pick_ratio * value_ratio
+    snapshot = ArtifactSnapshot(
+        artifact_slot=slot,
+        artifact_set=ArtifactSet.RESOLUTION_OF_SOJOURNER,
+        rarity=rarity,
+        level=level,
+        mainstat=StatSnapshot(
+            mainstat,
+            possible_mainstat_values(mainstat, rarity)[level],
+            rarity,
+        ),
+        substats=tuple(
+            StatSnapshot(s, v, rarity) for s, v in zip(stats, values, strict=True)
+        ),
+    )
+    return snapshot, ratio
+
+
+def metric_at_least(metric: str, threshold: float) -> Event:
+    """The event that a metric of :data:`artipy.analysis.ARTIFACT_ATTRIBUTES` reaches
+    a threshold.
+
+    Args:
+        metric (str): The name of the metric.
+        threshold (float): The smallest value counted.
+
+    Raises:
+        ValueError: If the metric is unknown.
+
+    Returns:
+        Callable[[artipy.artifacts.ArtifactSnapshot], bool]: The event.
+    """
+    if metric not in ARTIFACT_ATTRIBUTES:
+        msg = f"Invalid metric: {metric}\nValid metrics: {list(ARTIFACT_ATTRIBUTES)}"
+        raise ValueError(msg)
+    method = ARTIFACT_ATTRIBUTES[metric]
+    return lambda artifact: float(method(artifact)) >= threshold
+
+
+class Stratum(NamedTuple):
+    """The estimate within a single stratum.
+
+    Attributes:
+        mainstat: The mainstat of the stratum.
+        initial_substats: The amount of initial substats of the stratum.
+        weight: The probability of the stratum.
+        samples: The amount of samples drawn in it.
+        probability: The probability of the event within the stratum.
+        std_error: The standard error of that probability.
+    """
+
+    mainstat: StatType
+    initial_substats: int
+    weight: float
+    samples: int
+    probability: float
+    std_error: float
+
+
+class TailEstimate(NamedTuple):
+    """The estimated probability of an event.
+
+    Attributes:
+        probability: The estimate.
+        std_error: Its standard error.
+        low: The lower bound of the confidence interval.
+        high: The upper bound of the confidence interval.
+        samples: The amount of samples drawn.
+        hits: The amount of samples with the event.
+        strata: The estimate of every stratum.
+    """
+
+    probability: float
+    std_error: float
+    low: float
+    high: float
+    samples: int
+    hits: int
+    strata: tuple[Stratum, ...]
+
+    @property
+    def relative_error(self) -> float:
+        """The standard error relative to the estimate."""
+        return self.std_error / self.probability if self.probability else math.inf
+
+
+def _strata(
+    slot: ArtifactSlot,
+    mainstat: StatType | None,
+    rarity: int,
+) -> dict[tuple[StatType, int], float]:
+    weights = VALID_MAINSTATS[slot]
+    if mainstat is not None:
+        if mainstat not in weights:
+            msg = f"Invalid mainstat '{mainstat.name}' for slot '{slot}'"
+            raise ValueError(msg)
+        weights = {mainstat: 1}
+    total = sum(weights.values())
+    max_substats = rarity - 1
+    counts: defaultdict[int, float] = defaultdict(float)
+    counts[max_substats] += FOUR_SUBSTAT_CHANCE
+    counts[max(0, max_substats - 1)] += 1 - FOUR_SUBSTAT_CHANCE
+    return {
+        (stat, count): weight / total * p
+        for stat, weight in weights.items()
+        for count, p in counts.items()
+    }
+
+
+def estimate_probability(  # noqa: PLR0913
+    event: Event,
+    slot: ArtifactSlot,
+    *,
+    n: int,
+    tilt: Tilt | None = None,
+    mainstat: StatType | None = None,
+    rarity: int = 5,
+    level: int | None = None,
+    confidence: float = 0.95,
+    seed: int | None = None,
+) -> TailEstimate:
+    """Estimate the probability that a freshly generated artifact, upgraded to a
+    level, has an event.
+
+    The samples are split over the strata in proportion to their probability, with
+    at least two per stratum.
+
+    Args:
+        event (Callable[[artipy.artifacts.ArtifactSnapshot], bool]): The event, e.g.
+            from :func:`metric_at_least`.
+        slot (artipy.types.ArtifactSlot): The slot of the artifacts.
+        n (int): The amount of samples.
+        tilt (Tilt, optional): How to tilt the draws. Defaults to no tilt, which only
+            stratifies.
+        mainstat (artipy.types.StatType, optional): Condition on a mainstat. Defaults
+            to the weighted mainstats of the slot.
+        rarity (int, optional): The rarity of the artifacts. Defaults to 5.
+        level (int, optional): The level to upgrade to. Defaults to the maximum level
+            of the rarity.
+        confidence (float, optional): The confidence of the interval. Defaults to
+            0.95.
+        seed (int, optional): Seed the random number generator of the current thread.
+
+    Raises:
+        ValueError: If the mainstat is invalid for the slot.
+
+    Returns:
+        TailEstimate: The estimate.
+    """
+    if seed is not None:
+        seed_rng(seed)
+    tilt = tilt or Tilt()
+    strata: list[Stratum] = []
+    hits = 0
+    for (stat, count), weight in _strata(slot, mainstat, rarity).items():
+        samples = max(2, round(n * weight))
+        total = total_sq = 0.0
+        for _ in range(samples):
+            artifact, ratio = sample_tilted(
+                slot,
+                stat,
+                count,
+                tilt,
+                rarity=rarity,
+                level=level,
+            )
+            if event(artifact):
+                hits += 1
+                total += ratio
+                total_sq += ratio * ratio
+        mean = total / samples
+        variance = max(total_sq / samples - mean * mean, 0.0) * samples / (samples - 1)
+        strata.append(
+            Stratum(stat, count, weight, samples, mean, (variance / samples) ** 0.5),
+        )
+    probability = sum(s.weight * s.probability for s in strata)
+    std_error = sum((s.weight * s.std_error) ** 2 for s in strata) ** 0.5
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    return TailEstimate(
+        probability,
+        std_error,
+        max(probability - z * std_error, 0.0),
+        probability + z * std_error,
+        sum(s.samples for s in strata),
+        hits,
+        tuple(strata),
+    )
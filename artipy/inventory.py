@@ -0,0 +1,223 @@
+"""Incremental scoring of inventories that are uploaded again and again.
+
+Every row of an inventory gets a content hash of the state it describes, computed
+from the row itself without building the artifact. An :class:`Inventory` remembers
+the hash of every piece it holds, so syncing it with a new upload only builds and
+scores the pieces that were added or changed, and drops those that were removed.
+Syncing 2,000 pieces of which 5 changed hashes 2,000 rows but builds and scores 5.
+
+Pieces are told apart by an identifier column when the rows have one, ``id`` by
+default, which lets a piece that was levelled up show as changed. Rows without an
+identifier are keyed by their hash, so a change shows as one piece removed and
+another added, and identical pieces are numbered in order of appearance.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from collections import Counter
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+import orjson
+
+from artipy.analysis import METRICS
+from artipy.records import ARTIFACT_FIELDS, artifact_from_row, artifact_to_row
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping, Sequence
+
+    from artipy.artifacts import Artifact
+
+__all__ = (
+    "Inventory",
+    "InventoryDiff",
+    "artifact_hash",
+    "content_hash",
+    "diff_inventory",
+)
+
+_INT_FIELDS = frozenset({"rarity", "level"})
+_FLOAT_FIELDS = frozenset(f for f in ARTIFACT_FIELDS if f.endswith("_value"))
+
+
+def _normalise(field: str, value: Any) -> Any:
+    """Make values read from CSV, JSON lines and :func:`artifact_to_row` agree."""
+    if field in _FLOAT_FIELDS:
+        return float(value or 0)
+    if field in _INT_FIELDS:
+        return int(value or 0)
+    return str(value or "")
+
+
+def content_hash(row: Mapping[str, Any]) -> str:
+    """Hash the artifact state described by a row.
+
+    Only the columns of :data:`artipy.records.ARTIFACT_FIELDS` are hashed, after
+    normalising numbers, so the same row read from CSV or JSON lines hashes the
+    same. Stats must be spelled the same way to hash the same.
+
+    Args:
+        row (Mapping[str, Any]): The row to hash.
+
+    Returns:
+        str: The hash as 32 hexadecimal digits.
+    """
+    state = [_normalise(field, row.get(field)) for field in ARTIFACT_FIELDS]
+    return hashlib.blake2b(orjson.dumps(state), digest_size=16).hexdigest()
+
+
+def artifact_hash(artifact: Artifact) -> str:
+    """Hash the state of an artifact, the same as its row from
+    :func:`artipy.records.artifact_to_row`.
+
+    Args:
+        artifact (artipy.artifacts.Artifact): The artifact to hash.
+
+    Returns:
+        str: The hash as 32 hexadecimal digits.
+    """
+    return content_hash(artifact_to_row(artifact))
+
+
+@dataclass(frozen=True, slots=True)
+class InventoryDiff:
+    """The difference between two states of an inventory.
+
+    Attributes:
+        added: The keys of the pieces only in the new state.
+        removed: The keys of the pieces only in the old state.
+        changed: The keys of the pieces in both states with a different hash.
+        unchanged: The amount of pieces that are the same in both states.
+    """
+
+    added: tuple[str, ...]
+    removed: tuple[str, ...]
+    changed: tuple[str, ...]
+    unchanged: int
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+
+def diff_inventory(old: Mapping[str, str], new: Mapping[str, str]) -> InventoryDiff:
+    """Compare two inventories given as hashes by key.
+
+    Args:
+        old (Mapping[str, str]): The hash of every piece before.
+        new (Mapping[str, str]): The hash of every piece after.
+
+    Returns:
+        InventoryDiff: What changed, with keys in the order of their mapping.
+    """
+    changed = tuple(k for k, h in new.items() if k in old and old[k] != h)
+    return InventoryDiff(
+        added=tuple(k for k in new if k not in old),
+        removed=tuple(k for k in old if k not in new),
+        changed=changed,
+        unchanged=sum(k in old for k in new) - len(changed),
+    )
+
+
+class Inventory:
+    """The artifacts of an inventory and their metrics, kept up to date with
+    :meth:`sync`.
+
+    Args:
+        metrics (Sequence[str], optional): Names of the metrics to keep. Defaults to
+            the roll value and crit value.
+        key (str, optional): The column identifying a piece. Rows without it are
+            keyed by their hash. Defaults to ``id``.
+    """
+
+    def __init__(
+        self,
+        metrics: Sequence[str] = ("roll_value", "crit_value"),
+        *,
+        key: str | None = "id",
+    ) -> None:
+        self.metrics = tuple(metrics)
+        self.key = key
+        self.hashes: dict[str, str] = {}
+        self.artifacts: dict[str, Artifact] = {}
+        self.scores: dict[str, dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def _keyed(
+        self,
+        rows: Iterable[Mapping[str, Any]],
+    ) -> tuple[dict[str, Mapping[str, Any]], dict[str, str]]:
+        """Key every row, returning the rows and their hashes by key.
+
+        Raises:
+            ValueError: If two rows share an identifier.
+        """
+        keyed: dict[str, Mapping[str, Any]] = {}
+        hashes: dict[str, str] = {}
+        seen: Counter[str] = Counter()
+        for row in rows:
+            digest = content_hash(row)
+            if self.key and (identifier := row.get(self.key)) not in {None, ""}:
+                key = str(identifier)
+                if key in keyed:
+                    msg = f"Duplicate {self.key} '{key}'"
+                    raise ValueError(msg)
+            else:
+                key = f"{digest}:{seen[digest]}"
+                seen[digest] += 1
+            keyed[key] = row
+            hashes[key] = digest
+        return keyed, hashes
+
+    def diff(self, rows: Iterable[Mapping[str, Any]]) -> InventoryDiff:
+        """Compare the inventory with a new upload without changing it.
+
+        Args:
+            rows (Iterable[Mapping[str, Any]]): The rows of the upload.
+
+        Raises:
+            ValueError: If two rows share an identifier.
+
+        Returns:
+            InventoryDiff: What changed.
+        """
+        _, hashes = self._keyed(rows)
+        return diff_inventory(self.hashes, hashes)
+
+    def sync(self, rows: Iterable[Mapping[str, Any]]) -> InventoryDiff:
+        """Replace the inventory with a new upload, building and scoring only the
+        pieces that were added or changed.
+
+        The inventory is left unchanged if the upload is invalid.
+
+        Args:
+            rows (Iterable[Mapping[str, Any]]): The rows of the upload.
+
+        Raises:
+            ValueError: If two rows share an identifier, or a new or changed row
+                describes an invalid artifact.
+
+        Returns:
+            InventoryDiff: What changed.
+        """
+        keyed, hashes = self._keyed(rows)
+        diff = diff_inventory(self.hashes, hashes)
+        stale = (*diff.added, *diff.changed)
+        artifacts = [artifact_from_row(keyed[k]) for k in stale]
+        scores = (
+            METRICS.calculate_batch(artifacts, self.metrics).tolist()
+            if artifacts and self.metrics
+            else [() for _ in artifacts]
+        )
+        for k in diff.removed:
+            del self.artifacts[k], self.scores[k]
+        for k, artifact, record in zip(stale, artifacts, scores, strict=True):
+            self.artifacts[k] = artifact
+            self.scores[k] = dict(zip(self.metrics, record, strict=True))
+        # Follow the order of the upload.
+        self.hashes = hashes
+        self.artifacts = {k: self.artifacts[k] for k in hashes}
+        self.scores = {k: self.scores[k] for k in hashes}
+        return diff
@@ -0,0 +1,197 @@
+"""EXP and mora costs of leveling artifacts.
+
+The EXP each level up costs comes from the ``exp`` column of
+``ReliquaryLevelExcelConfigData``, where the row of a rank and level holds the EXP
+needed to reach the next level. Every point of EXP costs one mora. Consuming an
+artifact as fodder yields the base EXP of its rarity plus 80% of the EXP that was
+invested in it.
+
+Every cost is also available as a vectorized lookup over arrays of rarities and
+levels, so the cost of a whole :class:`artipy.batch.ArtifactBatch` is a few array
+operations.
+"""
+
+from __future__ import annotations
+
+from functools import cache
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from artipy import MAX_RARITY, UPGRADE_STEP
+from artipy.utils import MAINSTAT_DATA
+
+if TYPE_CHECKING:
+    from artipy.batch import ArtifactBatch
+
+__all__ = (
+    "FODDER_BASE_EXP",
+    "FODDER_EXP_RETURN",
+    "MORA_PER_EXP",
+    "batch_exp_to_max",
+    "batch_fodder_exp",
+    "cumulative_exp",
+    "exp_between",
+    "exp_to_level",
+    "fodder_exp",
+    "max_level",
+    "mora_to_level",
+)
+
+# EXP yielded by consuming an artifact of each rarity at level 0.
+FODDER_BASE_EXP: dict[int, int] = {1: 420, 2: 840, 3: 1260, 4: 2520, 5: 3780}
+
+# Share of the EXP invested in an artifact that is returned when it is consumed.
+FODDER_EXP_RETURN = 0.8
+
+MORA_PER_EXP = 1
+
+
+def max_level(rarity: int) -> int:
+    """The maximum level of an artifact of a rarity.
+
+    Args:
+        rarity (int): The rarity.
+
+    Returns:
+        int: The maximum level.
+    """
+    return rarity * UPGRADE_STEP if rarity > 2 else UPGRADE_STEP  # noqa: PLR2004
+
+
+@cache
+def cumulative_exp() -> np.ndarray:
+    """The total EXP needed to reach every level from level 0.
+
+    Returns:
+        np.ndarray: The EXP by rarity and level, with shape
+        ``(MAX_RARITY + 1, max_level(MAX_RARITY) + 1)``. Levels beyond the maximum
+        level of a rarity are -1.
+    """
+    table = np.full((MAX_RARITY + 1, max_level(MAX_RARITY) + 1), -1, dtype=np.int64)
+    steps: dict[tuple[int, int], int] = {
+        (row.rank, row.level): row.exp
+        for row in MAINSTAT_DATA
+        if hasattr(row, "rank") and hasattr(row, "exp")
+    }
+    for rarity in range(1, MAX_RARITY + 1):
+        table[rarity, 0] = 0
+        for level in range(1, max_level(rarity) + 1):
+            # The row of a level holds the EXP needed to reach the next one.
+            table[rarity, level] = table[rarity, level - 1] + steps[rarity, level]
+    table.flags.writeable = False
+    return table
+
+
+def _check_levels(rarity: int, *levels: int) -> None:
+    if rarity not in range(1, MAX_RARITY + 1):
+        msg = f"Invalid rarity '{rarity}'"
+        raise ValueError(msg)
+    for level in levels:
+        if level not in range(max_level(rarity) + 1):
+            msg = f"Invalid level '{level}' for rarity '{rarity}'"
+            raise ValueError(msg)
+
+
+def exp_to_level(rarity: int, start: int, end: int) -> int:
+    """The EXP needed to level an artifact from one level to another.
+
+    Args:
+        rarity (int): The rarity of the artifact.
+        start (int): The current level.
+        end (int): The target level.
+
+    Raises:
+        ValueError: If a level is invalid for the rarity or the target level is
+            below the current level.
+
+    Returns:
+        int: The EXP.
+    """
+    _check_levels(rarity, start, end)
+    if end < start:
+        msg = f"Cannot level down from {start} to {end}"
+        raise ValueError(msg)
+    table = cumulative_exp()
+    return int(table[rarity, end] - table[rarity, start])
+
+
+def mora_to_level(rarity: int, start: int, end: int) -> int:
+    """The mora needed to level an artifact from one level to another.
+
+    Args:
+        rarity (int): The rarity of the artifact.
+        start (int): The current level.
+        end (int): The target level.
+
+    Returns:
+        int: The mora.
+    """
+    return exp_to_level(rarity, start, end) * MORA_PER_EXP
+
+
+def fodder_exp(rarity: int, level: int = 0, exp: int = 0) -> int:
+    """The EXP yielded by consuming an artifact.
+
+    Args:
+        rarity (int): The rarity of the fodder.
+        level (int, optional): The level of the fodder. Defaults to 0.
+        exp (int, optional): EXP invested towards its next level. Defaults to 0.
+
+    Returns:
+        int: The EXP.
+    """
+    _check_levels(rarity, level)
+    invested = int(cumulative_exp()[rarity, level]) + exp
+    return FODDER_BASE_EXP[rarity] + int(invested * FODDER_EXP_RETURN)
+
+
+def exp_between(
+    rarity: np.ndarray,
+    start: np.ndarray,
+    end: np.ndarray,
+) -> np.ndarray:
+    """The vectorized form of :func:`exp_to_level`. Levels are clipped to the
+    maximum level of each rarity and the EXP is 0 where ``end`` is below ``start``.
+
+    Args:
+        rarity (np.ndarray): The rarity of each artifact.
+        start (np.ndarray): The current level of each artifact.
+        end (np.ndarray): The target level of each artifact.
+
+    Returns:
+        np.ndarray: The EXP of each artifact.
+    """
+    table = cumulative_exp()
+    rarity = np.asarray(rarity, dtype=np.intp)
+    top = np.array([0, *(max_level(r) for r in range(1, MAX_RARITY + 1))])[rarity]
+    start = np.minimum(np.asarray(start, dtype=np.intp), top)
+    end = np.minimum(np.asarray(end, dtype=np.intp), top)
+    return np.maximum(table[rarity, end] - table[rarity, start], 0)
+
+
+def batch_exp_to_max(batch: ArtifactBatch) -> np.ndarray:
+    """The EXP needed to level every artifact of a batch to its maximum level.
+
+    Args:
+        batch (artipy.batch.ArtifactBatch): The batch.
+
+    Returns:
+        np.ndarray: The EXP of each artifact.
+    """
+    return exp_between(batch.rarity, batch.level, np.full(len(batch), max_level(5)))
+
+
+def batch_fodder_exp(batch: ArtifactBatch) -> np.ndarray:
+    """The EXP yielded by consuming every artifact of a batch.
+
+    Args:
+        batch (artipy.batch.ArtifactBatch): The batch.
+
+    Returns:
+        np.ndarray: The EXP of each artifact.
+    """
+    base = np.array([0, *(FODDER_BASE_EXP[r] for r in range(1, MAX_RARITY + 1))])
+    rarity = batch.rarity.astype(np.intp)
+    invested = cumulative_exp()[rarity, batch.level.astype(np.intp)]
+    return base[rarity] + (invested * FODDER_EXP_RETURN).astype(np.int64)
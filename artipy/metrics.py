@@ -0,0 +1,305 @@
+"""A registry of named artifact metrics.
+
+A metric has a scalar implementation and optionally a vectorized kernel over an
+:class:`artipy.batch.ArtifactBatch`. The registry picks the kernel whenever a whole
+batch is evaluated and caches scalar results per artifact state, so evaluating an
+unchanged artifact again is a dictionary lookup. This is the only cache of the
+metrics; it keys mutable artifacts and :class:`artipy.artifacts.ArtifactSnapshot`
+alike. Only evaluations through the registry are cached: the ``calculate_*``
+functions of :mod:`artipy.analysis` are the scalar implementations themselves and
+recompute on every call.
+
+The built-in metrics are registered by :mod:`artipy.analysis` in
+:data:`artipy.analysis.METRICS`.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Iterator, Mapping
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from artipy.batch import ArtifactBatch
+from artipy.records import MAX_SUBSTATS
+
+if TYPE_CHECKING:
+    from collections.abc import Hashable, Iterable, Sequence
+
+    from artipy.artifacts import Artifact, ArtifactSnapshot, StatSnapshot
+    from artipy.stats import SubStat
+    from artipy.types import StatType
+
+__all__ = ("DEFAULT_CACHE_SIZE", "Metric", "MetricRegistry", "state_key")
+
+DEFAULT_CACHE_SIZE = 65_536
+
+type Kernel = Callable[[ArtifactBatch], np.ndarray]
+
+
+@dataclass(frozen=True, slots=True)
+class Metric:
+    """A named metric of an artifact, or of each of its substats.
+
+    Attributes:
+        name: The name of the metric.
+        scalar: The reference implementation. Takes an artifact, or a substat if
+            ``per_substat`` is set.
+        kernel: An optional vectorized implementation over a batch. Per-substat
+            kernels return an array of shape ``(n, MAX_SUBSTATS)``.
+        depends_on: The only substats the metric reads. Artifacts that agree on these
+            substats share a cached value. ``None`` if the metric reads the whole
+            artifact.
+        dtype: The dtype of the metric in batch results.
+        per_substat: Whether the metric is evaluated once per substat.
+    """
+
+    name: str
+    scalar: Callable[[Any], Any]
+    kernel: Kernel | None = None
+    depends_on: frozenset[StatType] | None = None
+    dtype: np.dtype[Any] | str = "f8"
+    per_substat: bool = False
+
+
+def state_key(
+    artifact: Artifact | ArtifactSnapshot,
+    depends_on: frozenset[StatType] | None = None,
+) -> Hashable:
+    """A hashable key of everything a metric can read from an artifact.
+
+    Args:
+        artifact (artipy.artifacts.Artifact | artipy.artifacts.ArtifactSnapshot): The
+            artifact.
+        depends_on (frozenset[StatType], optional): Only key on these substats.
+
+    Returns:
+        Hashable: Equal for artifacts a metric cannot tell apart.
+    """
+    if depends_on is not None:
+        return tuple(
+            sorted((s.name, s.value) for s in artifact.substats if s.name in depends_on),
+        )
+    return (
+        artifact.artifact_slot,
+        artifact.artifact_set,
+        artifact.rarity,
+        artifact.level,
+        artifact.mainstat.name,
+        artifact.mainstat.value,
+        tuple((s.name, s.value) for s in artifact.substats),
+    )
+
+
+def _substat_key(substat: SubStat | StatSnapshot) -> Hashable:
+    return (substat.name, substat.value, substat.rarity)
+
+
+class _ScalarView(Mapping[str, Callable[[Any], Any]]):
+    """A live read-only mapping of metric names to scalar implementations."""
+
+    def __init__(self, registry: MetricRegistry, *, per_substat: bool) -> None:
+        self._registry = registry
+        self._per_substat = per_substat
+
+    def _names(self) -> list[str]:
+        return [
+            m.name for m in self._registry.values() if m.per_substat == self._per_substat
+        ]
+
+    def __getitem__(self, name: str) -> Callable[[Any], Any]:
+        metric = self._registry[name]
+        if metric.per_substat != self._per_substat:
+            raise KeyError(name)
+        return metric.scalar
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._names())
+
+    def __len__(self) -> int:
+        return len(self._names())
+
+
+class MetricRegistry(Mapping[str, Metric]):
+    """Registered metrics by name, with a bounded cache of scalar results.
+
+    Args:
+        cache_size (int, optional): The maximum amount of cached results. Least
+            recently used results are evicted first. Defaults to DEFAULT_CACHE_SIZE.
+    """
+
+    def __init__(self, cache_size: int = DEFAULT_CACHE_SIZE) -> None:
+        self._metrics: dict[str, Metric] = {}
+        self._cache: OrderedDict[Hashable, Any] = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+
+    def __getitem__(self, name: str) -> Metric:
+        return self._metrics[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._metrics)
+
+    def __len__(self) -> int:
+        return len(self._metrics)
+
+    def register(self, metric: Metric, *, replace: bool = False) -> Metric:
+        """Register a metric.
+
+        Args:
+            metric (Metric): The metric.
+            replace (bool, optional): Replace a metric of the same name instead of
+                raising. Defaults to False.
+
+        Raises:
+            ValueError: If a metric of the same name exists and ``replace`` is not set.
+
+        Returns:
+            Metric: The registered metric.
+        """
+        if metric.name in self._metrics and not replace:
+            msg = f"Metric '{metric.name}' is already registered"
+            raise ValueError(msg)
+        self._metrics[metric.name] = metric
+        self.clear_cache()
+        return metric
+
+    def unregister(self, name: str) -> None:
+        """Remove a metric.
+
+        Args:
+            name (str): The name of the metric.
+        """
+        del self._metrics[name]
+        self.clear_cache()
+
+    def artifact_metrics(self) -> Mapping[str, Callable[[Artifact], Any]]:
+        """A live mapping of the artifact metrics to their scalar implementations."""
+        return _ScalarView(self, per_substat=False)
+
+    def substat_metrics(self) -> Mapping[str, Callable[[SubStat], Any]]:
+        """A live mapping of the substat metrics to their scalar implementations."""
+        return _ScalarView(self, per_substat=True)
+
+    def clear_cache(self) -> None:
+        """Forget every cached result."""
+        with self._cache_lock:
+            self._cache.clear()
+
+    def _cached(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        # The lock only guards the bookkeeping, so threads compute concurrently and
+        # at worst compute the same value twice.
+        with self._cache_lock:
+            if key in self._cache:
+                self.hits += 1
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            self.misses += 1
+        value = compute()
+        with self._cache_lock:
+            self._cache[key] = value
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return value
+
+    def compute(self, name: str, artifact: Artifact | ArtifactSnapshot) -> Any:
+        """Evaluate a metric for an artifact, using the cache if the same state was
+        evaluated before.
+
+        Args:
+            name (str): The name of the metric.
+            artifact (artipy.artifacts.Artifact | artipy.artifacts.ArtifactSnapshot):
+                The artifact, or a snapshot of it.
+
+        Returns:
+            Any: The value of the metric, or a tuple with the value of each substat
+            for per-substat metrics.
+        """
+        metric = self[name]
+        if metric.per_substat:
+            return tuple(
+                self._cached(
+                    (name, _substat_key(s)),
+                    lambda s=s: metric.scalar(s),
+                )
+                for s in artifact.substats
+            )
+        return self._cached(
+            (name, state_key(artifact, metric.depends_on)),
+            lambda: metric.scalar(artifact),
+        )
+
+    def _evaluate_scalar(self, metric: Metric, batch: Sequence[Artifact]) -> np.ndarray:
+        if not metric.per_substat:
+            return np.array(
+                [self.compute(metric.name, a) for a in batch],
+                dtype=metric.dtype,
+            )
+        result = np.zeros((len(batch), MAX_SUBSTATS), dtype=metric.dtype)
+        for i, artifact in enumerate(batch):
+            values = self.compute(metric.name, artifact)
+            result[i, : len(values)] = values
+        return result
+
+    def calculate_batch(
+        self,
+        artifacts: ArtifactBatch | Iterable[Artifact],
+        names: Sequence[str],
+    ) -> np.ndarray:
+        """Evaluate several metrics for many artifacts.
+
+        Metrics with a kernel are evaluated on a columnar batch in a single pass.
+        Metrics without one fall back to their cached scalar implementation, which
+        requires the artifacts themselves.
+
+        Args:
+            artifacts (ArtifactBatch | Iterable[artipy.artifacts.Artifact]): The
+                artifacts, or a batch of them.
+            names (Sequence[str]): The names of the metrics.
+
+        Raises:
+            ValueError: If a metric is unknown, or has no kernel and only a batch is
+                given.
+
+        Returns:
+            np.ndarray: A structured array with one field per metric. Per-substat
+            metrics are subarray fields of shape ``(MAX_SUBSTATS,)``.
+        """
+        for name in names:
+            if name not in self:
+                msg = f"Invalid metric: {name}\nValid metrics: {list(self)}"
+                raise ValueError(msg)
+        metrics = [self[name] for name in names]
+
+        objects: list[Artifact] | None = None
+        batch: ArtifactBatch | None = None
+        if isinstance(artifacts, ArtifactBatch):
+            batch = artifacts
+        else:
+            objects = list(artifacts)
+            if any(m.kernel is not None for m in metrics):
+                batch = ArtifactBatch.from_artifacts(objects)
+
+        columns: dict[str, np.ndarray] = {}
+        for metric in metrics:
+            if metric.kernel is not None and batch is not None:
+                columns[metric.name] = metric.kernel(batch).astype(metric.dtype)
+            elif objects is not None:
+                columns[metric.name] = self._evaluate_scalar(metric, objects)
+            else:
+                msg = f"Metric '{metric.name}' has no kernel to evaluate a batch with"
+                raise ValueError(msg)
+
+        n = len(batch) if batch is not None else len(objects or ())
+        result = np.empty(
+            n,
+            dtype=[(name, c.dtype, c.shape[1:]) for name, c in columns.items()],
+        )
+        for name, column in columns.items():
+            result[name] = column
+        return result
@@ -0,0 +1,248 @@
+"""Exact amount of domain runs until a target is met.
+
+The probability that a single drop meets a :class:`Spec` follows from the candidate
+chance of :mod:`artipy.farming` and the exact metric distribution of
+:func:`artipy.distributions.exact_pmf`. Collecting several pieces is an absorbing
+Markov chain whose states are the amount of pieces collected for each spec, and its
+run-count distribution is evaluated with powers of the transition matrix. A single
+piece gives a geometric distribution, several pieces of the same spec a negative
+binomial one.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from decimal import Decimal
+from itertools import product
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from artipy.analysis import ROUND_TO
+from artipy.distributions import exact_pmf
+from artipy.farming import EXTRA_DROP_CHANCE, Domain, Target, candidate_chance
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from artipy.analysis import ArtifactMethod
+    from artipy.types import ArtifactSet, ArtifactSlot, StatType
+
+__all__ = ("RunDistribution", "Spec", "drop_probability", "run_distribution")
+
+
+@dataclass(frozen=True, slots=True)
+class Spec:
+    """The pieces a player is after.
+
+    Attributes:
+        slot: The slot of the pieces. Specs of a single calculation need distinct
+            slots, so a drop never meets more than one of them.
+        mainstat: Require this mainstat.
+        artifact_set: Require this set.
+        metric: An additive metric, e.g.
+            :func:`artipy.analysis.calculate_artifact_crit_value`.
+        minimum: The smallest accepted value of the metric.
+        level: The level the metric is evaluated at. Defaults to the maximum level.
+        count: The amount of pieces needed.
+    """
+
+    slot: ArtifactSlot
+    mainstat: StatType | None = None
+    artifact_set: ArtifactSet | None = None
+    metric: ArtifactMethod[Decimal] | None = None
+    minimum: Decimal = Decimal(0)
+    level: int | None = None
+    count: int = 1
+
+
+def drop_probability(
+    domain: Domain,
+    spec: Spec,
+    *,
+    resolution: Decimal = ROUND_TO,
+) -> float:
+    """The exact probability that a single drop of a domain meets a spec.
+
+    Args:
+        domain (artipy.farming.Domain): The domain.
+        spec (Spec): The spec.
+        resolution (Decimal, optional): The grid the metric is evaluated on. Defaults
+            to ROUND_TO.
+
+    Returns:
+        float: The probability.
+    """
+    chance = candidate_chance(
+        domain,
+        Target(spec.artifact_set, spec.slot, spec.mainstat),
+    )
+    if spec.metric is None or not chance:
+        return chance
+    pmf = exact_pmf(
+        spec.metric,
+        spec.slot,
+        mainstat=spec.mainstat,
+        rarity=domain.rarity,
+        level=spec.level,
+        resolution=resolution,
+    )
+    minimum = spec.minimum.quantize(resolution)
+    return chance * sum(p for value, p in pmf.items() if value >= minimum)
+
+
+class RunDistribution:
+    """The distribution of the amount of runs until an absorbing chain is absorbed.
+
+    Args:
+        transient (np.ndarray): The transition probabilities of a single run between
+            the transient states. The chain starts in state 0.
+    """
+
+    def __init__(self, transient: np.ndarray) -> None:
+        self._transient = transient
+        self._powers = [transient]
+
+    def _power(self, exponent: int) -> np.ndarray:
+        # The transition matrix of 2**exponent runs.
+        while len(self._powers) <= exponent:
+            self._powers.append(self._powers[-1] @ self._powers[-1])
+        return self._powers[exponent]
+
+    def _expected_runs(self) -> np.ndarray:
+        identity = np.eye(len(self._transient))
+        return np.linalg.solve(identity - self._transient, np.ones(len(identity)))
+
+    @property
+    def mean(self) -> float:
+        """The expected amount of runs."""
+        return float(self._expected_runs()[0])
+
+    @property
+    def std(self) -> float:
+        """The standard deviation of the amount of runs."""
+        identity = np.eye(len(self._transient))
+        expected = self._expected_runs()
+        second = np.linalg.solve(identity - self._transient, 2 * expected - 1)
+        return float(np.sqrt(max(0.0, second[0] - expected[0] ** 2)))
+
+    def survival(self, runs: int) -> float:
+        """The probability of needing more than ``runs`` runs.
+
+        Args:
+            runs (int): The amount of runs.
+
+        Returns:
+            float: The probability.
+        """
+        state = np.zeros(len(self._transient))
+        state[0] = 1.0
+        for exponent in range(runs.bit_length()):
+            if runs >> exponent & 1:
+                state @= self._power(exponent)
+        return float(state.sum())
+
+    def cdf(self, runs: int) -> float:
+        """The probability of needing at most ``runs`` runs.
+
+        Args:
+            runs (int): The amount of runs.
+
+        Returns:
+            float: The probability.
+        """
+        return 1 - self.survival(runs)
+
+    def pmf(self, runs: int) -> np.ndarray:
+        """The probability of needing exactly each amount of runs up to ``runs``.
+
+        Args:
+            runs (int): The largest amount of runs.
+
+        Returns:
+            np.ndarray: The probability of each amount of runs from 0 to ``runs``.
+        """
+        state = np.zeros(len(self._transient))
+        state[0] = 1.0
+        survival = np.empty(runs + 2)
+        survival[0] = 1.0
+        for run in range(runs + 1):
+            survival[run + 1] = state.sum()
+            state @= self._transient
+        return survival[:-1] - survival[1:]
+
+    def quantile(self, q: float) -> int:
+        """The smallest amount of runs that meets the target with probability ``q``.
+
+        Args:
+            q (float): The probability, between 0 and 1 exclusive.
+
+        Raises:
+            ValueError: If ``q`` is not between 0 and 1 exclusive.
+
+        Returns:
+            int: The amount of runs.
+        """
+        if not 0 < q < 1:
+            msg = f"Invalid quantile: {q}"
+            raise ValueError(msg)
+        state = np.zeros(len(self._transient))
+        state[0] = 1.0
+        exponent = 0
+        while (state @ self._power(exponent)).sum() > 1 - q:
+            exponent += 1
+        # Take the largest steps that keep the target unmet.
+        runs = 0
+        for e in reversed(range(exponent)):
+            step = state @ self._power(e)
+            if step.sum() > 1 - q:
+                state = step
+                runs += 1 << e
+        return runs + 1
+
+
+def run_distribution(
+    domain: Domain,
+    specs: Spec | Sequence[Spec],
+    *,
+    resolution: Decimal = ROUND_TO,
+) -> RunDistribution:
+    """The exact distribution of the amount of domain runs until every spec is met.
+
+    Each run drops one piece, or two with :data:`artipy.farming.EXTRA_DROP_CHANCE`.
+
+    Args:
+        domain (artipy.farming.Domain): The domain.
+        specs (Spec | Sequence[Spec]): The spec, or several specs that must all be
+            met.
+        resolution (Decimal, optional): The grid metrics are evaluated on. Defaults
+            to ROUND_TO.
+
+    Raises:
+        ValueError: If specs share a slot or a spec can never be met.
+
+    Returns:
+        RunDistribution: The distribution.
+    """
+    specs = (specs,) if isinstance(specs, Spec) else tuple(specs)
+    if len({spec.slot for spec in specs}) != len(specs):
+        msg = "Specs must have distinct slots"
+        raise ValueError(msg)
+    chances = [drop_probability(domain, spec, resolution=resolution) for spec in specs]
+    for spec, chance in zip(specs, chances, strict=True):
+        if not chance:
+            msg = f"{spec} can never drop from '{domain}'"
+            raise ValueError(msg)
+
+    # States count the pieces collected for each spec; the last state is absorbing.
+    states = list(product(*(range(spec.count + 1) for spec in specs)))
+    index = {state: i for i, state in enumerate(states)}
+    drop = np.zeros((len(states), len(states)))
+    for state, i in index.items():
+        drop[i, i] += 1 - sum(chances)
+        for position, (spec, chance) in enumerate(zip(specs, chances, strict=True)):
+            collected = list(state)
+            collected[position] = min(spec.count, collected[position] + 1)
+            drop[i, index[tuple(collected)]] += chance
+    run = (1 - EXTRA_DROP_CHANCE) * drop + EXTRA_DROP_CHANCE * drop @ drop
+    return RunDistribution(run[:-1, :-1])
@@ -0,0 +1,251 @@
+"""Encoding of an artifact's state in a single 64-bit integer.
+
+The state of an artifact is its slot, mainstat, rarity, level, up to four substats and
+the amount of rolls each substat has in each value tier. Substat values are not
+stored directly: they are decoded into roll compositions with :mod:`artipy.rolls`,
+and every composition of at most six rolls over four tiers has an 8-bit index.
+
+Fields are laid out from the most significant bit down::
+
+    slot:3 | mainstat:5 | rarity:3 | level:5 | substat ids:4x4 | compositions:4x8
+
+so sorting the packed integers groups artifacts by slot, then mainstat, and so on.
+The artifact set is not part of the encoding.
+"""
+
+from __future__ import annotations
+
+from decimal import Decimal
+from functools import cache
+from itertools import product
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from artipy.artifacts import Artifact
+from artipy.batch import EMPTY, ArtifactBatch
+from artipy.records import MAX_SUBSTATS, SLOT_CODES, STAT_CODES
+from artipy.rolls import MAX_TIERS, decode_values, max_rolls
+from artipy.stats import MainStat, SubStat
+from artipy.types import VALID_SUBSTATS
+from artipy.utils import possible_substat_values
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+__all__ = (
+    "COMPOSITIONS",
+    "FIELDS",
+    "pack",
+    "pack_artifact",
+    "pack_batch",
+    "unpack_artifact",
+    "unpack_batch",
+)
+
+_ROLLS = max_rolls(5)
+
+# Every amount of rolls per tier with at most the maximum amount of rolls in total,
+# ordered by the total amount of rolls. Index 0 is the empty substat.
+COMPOSITIONS: np.ndarray = np.array(
+    sorted(
+        (c for c in product(range(_ROLLS + 1), repeat=MAX_TIERS) if sum(c) <= _ROLLS),
+        key=lambda c: (sum(c), tuple(-x for x in c)),
+    ),
+    dtype=np.uint8,
+)
+
+_RADIX = _ROLLS + 1
+_COMPOSITION_INDEX = np.zeros(_RADIX**MAX_TIERS, dtype=np.uint8)
+_COMPOSITION_INDEX[COMPOSITIONS.astype(np.int64) @ _RADIX ** np.arange(MAX_TIERS)] = (
+    np.arange(len(COMPOSITIONS))
+)
+
+_EMPTY_SUBSTAT = 0xF
+
+FIELDS: tuple[tuple[str, int], ...] = (
+    ("slot", 3),
+    ("mainstat", 5),
+    ("rarity", 3),
+    ("level", 5),
+    *((f"substat_{i}", 4) for i in range(1, MAX_SUBSTATS + 1)),
+    *((f"rolls_{i}", 8) for i in range(1, MAX_SUBSTATS + 1)),
+)
+
+
+def _shifts() -> dict[str, tuple[np.uint64, np.uint64]]:
+    shifts: dict[str, tuple[np.uint64, np.uint64]] = {}
+    offset = 64
+    for name, width in FIELDS:
+        offset -= width
+        shifts[name] = (np.uint64(offset), np.uint64((1 << width) - 1))
+    return shifts
+
+
+_SHIFTS = _shifts()
+
+# Substats are stored as their index in VALID_SUBSTATS, which fits in four bits.
+_TO_SUBSTAT_ID = np.full(len(STAT_CODES), _EMPTY_SUBSTAT, dtype=np.uint64)
+_FROM_SUBSTAT_ID = np.full(_EMPTY_SUBSTAT + 1, EMPTY, dtype=np.int8)
+for _id, _stat in enumerate(VALID_SUBSTATS):
+    _TO_SUBSTAT_ID[STAT_CODES.index(_stat)] = _id
+    _FROM_SUBSTAT_ID[_id] = STAT_CODES.index(_stat)
+
+
+@cache
+def _tier_values() -> np.ndarray:
+    values = np.zeros((_RADIX, len(STAT_CODES), MAX_TIERS))
+    for rarity in range(1, _RADIX):
+        for stat in VALID_SUBSTATS:
+            tiers = possible_substat_values(stat, rarity)
+            values[rarity, STAT_CODES.index(stat), : len(tiers)] = [
+                float(t) for t in tiers
+            ]
+    return values
+
+
+def _compositions(batch: ArtifactBatch) -> np.ndarray:
+    result = np.zeros(batch.substats.shape, dtype=np.uint64)
+    rarity = np.broadcast_to(batch.rarity[:, None], batch.substats.shape)
+    present = batch.substats != EMPTY
+    for code, r in np.unique(
+        np.stack([batch.substats[present], rarity[present]], axis=1),
+        axis=0,
+    ):
+        mask = (batch.substats == code) & (rarity == r)
+        _, tiers = decode_values(STAT_CODES[code], int(r), batch.substat_values[mask])
+        keys = tiers.astype(np.int64) @ _RADIX ** np.arange(MAX_TIERS)
+        result[mask] = _COMPOSITION_INDEX[keys]
+    return result
+
+
+def pack_batch(batch: ArtifactBatch) -> np.ndarray:
+    """Pack every artifact of a batch.
+
+    Args:
+        batch (artipy.batch.ArtifactBatch): The batch.
+
+    Returns:
+        np.ndarray: The packed artifacts as uint64.
+    """
+    columns = {
+        "slot": batch.slot,
+        "mainstat": batch.mainstat,
+        "rarity": batch.rarity,
+        "level": batch.level,
+    }
+    substat_ids = _TO_SUBSTAT_ID[batch.substats.clip(0)]
+    substat_ids[batch.substats == EMPTY] = _EMPTY_SUBSTAT
+    compositions = _compositions(batch)
+    for i in range(MAX_SUBSTATS):
+        columns[f"substat_{i + 1}"] = substat_ids[:, i]
+        columns[f"rolls_{i + 1}"] = compositions[:, i]
+
+    packed = np.zeros(len(batch), dtype=np.uint64)
+    for name, column in columns.items():
+        shift, mask = _SHIFTS[name]
+        packed |= (column.astype(np.uint64) & mask) << shift
+    return packed
+
+
+def _field(packed: np.ndarray, name: str) -> np.ndarray:
+    shift, mask = _SHIFTS[name]
+    return (packed >> shift) & mask
+
+
+def unpack_batch(packed: np.ndarray) -> ArtifactBatch:
+    """Unpack artifacts into a batch.
+
+    Substat values are the float sum of their rolls. Mainstat values are not part of
+    the encoding and are left at 0, and every artifact gets the first set.
+
+    Args:
+        packed (np.ndarray): The packed artifacts.
+
+    Returns:
+        artipy.batch.ArtifactBatch: The batch.
+    """
+    packed = np.asarray(packed, dtype=np.uint64)
+    rarity = _field(packed, "rarity").astype(np.uint8)
+    substats = np.stack(
+        [
+            _FROM_SUBSTAT_ID[_field(packed, f"substat_{i}")]
+            for i in range(1, MAX_SUBSTATS + 1)
+        ],
+        axis=1,
+    )
+    rolls = np.stack(
+        [COMPOSITIONS[_field(packed, f"rolls_{i}")] for i in range(1, MAX_SUBSTATS + 1)],
+        axis=1,
+    )
+    tiers = _tier_values()[rarity[:, None], substats.clip(0)]
+    return ArtifactBatch(
+        slot=_field(packed, "slot").astype(np.uint8),
+        set=np.zeros(len(packed), dtype=np.uint8),
+        rarity=rarity,
+        level=_field(packed, "level").astype(np.uint8),
+        mainstat=_field(packed, "mainstat").astype(np.int8),
+        mainstat_value=np.zeros(len(packed)),
+        substats=substats,
+        substat_values=np.where(substats != EMPTY, (rolls * tiers).sum(axis=2), 0.0),
+    )
+
+
+def pack(artifacts: Iterable[Artifact]) -> np.ndarray:
+    """Pack artifacts.
+
+    Args:
+        artifacts (Iterable[artipy.artifacts.Artifact]): The artifacts.
+
+    Returns:
+        np.ndarray: The packed artifacts as uint64.
+    """
+    return pack_batch(ArtifactBatch.from_artifacts(artifacts))
+
+
+def pack_artifact(artifact: Artifact) -> int:
+    """Pack a single artifact.
+
+    Args:
+        artifact (artipy.artifacts.Artifact): The artifact.
+
+    Returns:
+        int: The packed artifact.
+    """
+    return int(pack((artifact,))[0])
+
+
+def unpack_artifact(packed: int) -> Artifact:
+    """Unpack a single artifact with exact substat and mainstat values.
+
+    Args:
+        packed (int): The packed artifact.
+
+    Returns:
+        artipy.artifacts.Artifact: A new artifact, with the default set.
+    """
+    code = np.array([packed], dtype=np.uint64)
+    artifact = Artifact()
+    artifact.rarity = int(_field(code, "rarity")[0])
+    artifact.level = int(_field(code, "level")[0])
+    artifact.artifact_slot = SLOT_CODES[int(_field(code, "slot")[0])]
+    mainstat = MainStat(STAT_CODES[int(_field(code, "mainstat")[0])])
+    mainstat.rarity = artifact.rarity
+    mainstat.set_value_by_level(artifact.level)
+    artifact.mainstat = mainstat
+
+    substats: list[SubStat] = []
+    for i in range(1, MAX_SUBSTATS + 1):
+        substat_id = int(_field(code, f"substat_{i}")[0])
+        if substat_id == _EMPTY_SUBSTAT:
+            continue
+        stat = VALID_SUBSTATS[substat_id]
+        tiers = possible_substat_values(stat, artifact.rarity)
+        counts = COMPOSITIONS[int(_field(code, f"rolls_{i}")[0])]
+        value = sum(
+            (tiers[t] * int(count) for t, count in enumerate(counts) if count),
+            Decimal(0),
+        )
+        substats.append(SubStat(stat, value, artifact.rarity))
+    artifact.substats = substats
+    return artifact
@@ -0,0 +1,264 @@
+"""Parse the text form of artifacts back into artifacts.
+
+The text is the one of :meth:`artipy.artifacts.Artifact.__str__`, which is also what
+the OCR of an artifact card produces::
+
+    plume [+20]
+    Gladiator's Finale ★★★★★
+    ATK+311
+    • CRIT Rate+3.9%
+    • HP+478
+
+A block starts with a ``<slot> [+<level>]`` header, followed by the set and one star
+per rarity, the mainstat and the substats. Stats are matched by their display name
+with or without the ``%`` of :data:`artipy.types.STAT_NAMES` (``HP%+5.8%`` and
+``HP+5.8%`` are both HP%), or by their member name, ignoring case. The separator
+between name and value may be ``+``, ``:`` or whitespace, and bullets are optional.
+
+Every lookup is compiled once when the module is imported, so parsing a block is a
+few regex matches and dictionary lookups per line. The value of the mainstat is
+checked to be a number but not used, as it follows from the level and rarity.
+
+Blocks are also checked to describe an artifact the game can drop: the mainstat must
+be valid for the slot, substats must differ from each other and from the mainstat,
+and every substat value must be reachable by rolling, up to the rounding of the text.
+"""
+
+from __future__ import annotations
+
+import re
+from decimal import Decimal
+from typing import TYPE_CHECKING, NamedTuple
+
+from artipy import MAX_RARITY
+from artipy.artifacts import Artifact, ArtifactBuilder
+from artipy.rolls import decode_substat
+from artipy.stats import SubStat
+from artipy.types import STAT_NAMES, VALID_MAINSTATS, ArtifactSet, ArtifactSlot, StatType
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+__all__ = (
+    "LineError",
+    "ParseResult",
+    "parse_artifact",
+    "parse_artifacts",
+    "parse_stat_line",
+)
+
+_HEADER = re.compile(r"\s*(?P<slot>[A-Za-z]+)\s*\[\+?(?P<level>\d+)\]\s*")
+_SET = re.compile(r"\s*(?P<set>.+?)\s*(?P<stars>[★*]+)\s*")
+_STAT = re.compile(
+    r"\s*(?:[•·*-]\s*)?(?P<label>[A-Za-z][A-Za-z_ %']*?)\s*[+:]?\s*"
+    r"(?P<value>\d[\d,]*(?:\.\d+)?)\s*(?P<pct>%)?\s*",
+)
+
+
+def _stat_labels() -> dict[str, tuple[StatType, StatType]]:
+    """Map every accepted label to the stat it names without and with a ``%``."""
+    flat: dict[str, StatType] = {}
+    pct: dict[str, StatType] = {}
+    for stat, name in STAT_NAMES.items():
+        for label in (name, name.removesuffix("%"), stat.name):
+            (pct if stat.is_pct else flat)[label.casefold()] = stat
+        # The full label already says which of the two is meant.
+        flat.setdefault(name.casefold(), stat)
+        pct.setdefault(name.casefold(), stat)
+    return {
+        label: (flat.get(label) or pct[label], pct.get(label) or flat[label])
+        for label in flat.keys() | pct.keys()
+    }
+
+
+_STAT_LABELS = _stat_labels()
+_SLOTS: dict[str, ArtifactSlot] = {slot.value: slot for slot in ArtifactSlot}
+_SETS: dict[str, ArtifactSet] = {
+    label.casefold(): artifact_set
+    for artifact_set in ArtifactSet
+    for label in (artifact_set.value, artifact_set.name)
+}
+_HUNDRED = Decimal(100)
+# Half the last digit of the text, which shows percentages to a tenth.
+_ROUNDING = {False: Decimal("0.5"), True: Decimal("0.0005")}
+
+
+class LineError(NamedTuple):
+    """An invalid line of the parsed text.
+
+    Attributes:
+        line: The line number, starting at 1.
+        text: The content of the line.
+        reason: Why it is invalid.
+    """
+
+    line: int
+    text: str
+    reason: str
+
+    def __str__(self) -> str:
+        return f"line {self.line}: {self.reason}: {self.text!r}"
+
+
+class ParseResult(NamedTuple):
+    """The artifacts parsed from a text, and the lines that could not be parsed.
+
+    A block with an invalid line is skipped as a whole.
+    """
+
+    artifacts: list[Artifact]
+    errors: list[LineError]
+
+
+def parse_stat_line(line: str) -> tuple[StatType, Decimal]:
+    """Parse a single stat, such as ``• CRIT Rate+3.9%`` or ``HP: 4,780``.
+
+    Percentages are returned as fractions, like the values of
+    :class:`artipy.stats.Stat`.
+
+    Args:
+        line (str): The line to parse.
+
+    Raises:
+        ValueError: If the line is not a known stat and value.
+
+    Returns:
+        tuple[artipy.types.StatType, Decimal]: The stat and its value.
+    """
+    if (match := _STAT.fullmatch(line)) is None:
+        msg = "Expected a stat and value"
+        raise ValueError(msg)
+    label = match["label"].casefold()
+    if (stats := _STAT_LABELS.get(label)) is None:
+        msg = f"Unknown stat {match['label']!r}"
+        raise ValueError(msg)
+    stat = stats[match["pct"] is not None]
+    value = Decimal(match["value"].replace(",", ""))
+    return stat, value / _HUNDRED if stat.is_pct else value
+
+
+def _check(
+    slot: ArtifactSlot,
+    rarity: int,
+    lines: list[tuple[int, str]],
+    stats: list[tuple[StatType, Decimal]],
+) -> LineError | None:
+    """Find the first stat line the game cannot produce, if any."""
+    (main_line, main_text), *substat_lines = lines
+    (mainstat, _), *substats = stats
+    if mainstat not in VALID_MAINSTATS[slot]:
+        return LineError(main_line, main_text, f"Invalid mainstat for {slot}")
+    seen = {mainstat}
+    for (number, text), (stat, value) in zip(substat_lines, substats, strict=True):
+        if stat == mainstat:
+            return LineError(number, text, "Substat equals the mainstat")
+        if stat in seen:
+            return LineError(number, text, "Duplicate substat")
+        seen.add(stat)
+        history = decode_substat(SubStat(stat, value, rarity))
+        if history.rolls == 0 or history.error > _ROUNDING[stat.is_pct]:
+            return LineError(number, text, "Value cannot be rolled")
+    return None
+
+
+def _build(lines: list[tuple[int, str]]) -> Artifact | LineError:  # noqa: PLR0911
+    """Build an artifact from the numbered lines of a block starting at a header."""
+    (header_line, header), *rest = lines
+    match = _HEADER.fullmatch(header)
+    if match is None or (slot := _SLOTS.get(match["slot"].casefold())) is None:
+        return LineError(header_line, header, "Expected '<slot> [+<level>]'")
+    if len(rest) < 2:  # noqa: PLR2004
+        return LineError(header_line, header, "Incomplete artifact")
+    (set_line, set_text), *stats = rest
+    if (set_match := _SET.fullmatch(set_text)) is None or (
+        artifact_set := _SETS.get(set_match["set"].casefold())
+    ) is None:
+        return LineError(set_line, set_text, "Expected '<set> <stars>'")
+    rarity = len(set_match["stars"])
+    if not 1 <= rarity <= MAX_RARITY:
+        return LineError(set_line, set_text, f"Invalid rarity {rarity}")
+    parsed: list[tuple[StatType, Decimal]] = []
+    for number, text in stats:
+        try:
+            parsed.append(parse_stat_line(text))
+        except ValueError as e:
+            return LineError(number, text, str(e))
+    if (error := _check(slot, rarity, stats, parsed)) is not None:
+        return error
+    (mainstat, _), *substats = parsed
+    try:
+        return (
+            ArtifactBuilder()
+            .with_mainstat(mainstat)
+            .with_substats(substats)
+            .with_rarity(rarity)
+            .with_level(int(match["level"]))
+            .with_slot(slot)
+            .with_set(artifact_set)
+            .build()
+        )
+    except ValueError as e:
+        return LineError(header_line, header, str(e))
+
+
+def _blocks(lines: Iterable[str]) -> Iterator[list[tuple[int, str]]]:
+    """Split numbered lines into blocks starting at every header, skipping blank
+    lines. Only the first block may not start with a header."""
+    block: list[tuple[int, str]] = []
+    for number, line in enumerate(lines, start=1):
+        text = line.rstrip("\r\n")
+        if not text.strip():
+            continue
+        if block and _HEADER.fullmatch(text):
+            yield block
+            block = []
+        block.append((number, text))
+    if block:
+        yield block
+
+
+def parse_artifacts(text: str | Iterable[str]) -> ParseResult:
+    """Parse any amount of artifacts at once.
+
+    Blocks are split at every header, so artifacts may be separated by blank lines
+    or follow each other directly.
+
+    Args:
+        text (str | Iterable[str]): The text, or its lines, such as an open file.
+
+    Returns:
+        ParseResult: The valid artifacts in order, and the invalid lines.
+    """
+    lines = text.splitlines() if isinstance(text, str) else text
+    artifacts: list[Artifact] = []
+    errors: list[LineError] = []
+    for block in _blocks(lines):
+        result = _build(block)
+        if isinstance(result, LineError):
+            errors.append(result)
+        else:
+            artifacts.append(result)
+    return ParseResult(artifacts, errors)
+
+
+def parse_artifact(text: str) -> Artifact:
+    """Parse a single artifact.
+
+    Args:
+        text (str): The text of the artifact.
+
+    Raises:
+        ValueError: If the text is not exactly one valid artifact, with the position
+            of the first invalid line.
+
+    Returns:
+        artipy.artifacts.Artifact: The artifact.
+    """
+    artifacts, errors = parse_artifacts(text)
+    if errors:
+        msg = f"Invalid artifact at {errors[0]}"
+        raise ValueError(msg)
+    if len(artifacts) != 1:
+        msg = f"Expected a single artifact, got {len(artifacts)}"
+        raise ValueError(msg)
+    return artifacts[0]
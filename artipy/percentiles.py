@@ -0,0 +1,329 @@
+"""Percentile ranks of artifacts among artifacts like them.
+
+A table holds the exact cumulative distribution of a metric for one rarity, slot,
+mainstat and level, computed with :func:`artipy.distributions.exact_pmf`. Tables are
+built on first use and can be saved to a single compressed ``.npz`` file. A saved
+file records the hash of the game data it was computed from and is rejected once
+the data changes. Looking up a rank is a binary search over the table.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from decimal import Decimal
+from functools import cache
+from typing import TYPE_CHECKING
+
+import numpy as np
+import orjson
+
+from artipy import __data__
+from artipy.analysis import METRICS, ROUND_TO
+from artipy.batch import ArtifactBatch
+from artipy.distributions import exact_pmf
+from artipy.records import SLOT_CODES, STAT_CODES
+from artipy.types import ArtifactSlot, StatType
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from pathlib import Path
+
+    from artipy.artifacts import Artifact
+
+__all__ = (
+    "TABLES",
+    "TABLE_VERSION",
+    "PercentileTable",
+    "PercentileTables",
+    "TableKey",
+    "data_hash",
+    "percentile_rank",
+    "percentile_ranks",
+)
+
+# Bumped whenever the layout or the computation of the tables changes.
+TABLE_VERSION = 2
+
+type TableKey = tuple[str, int, ArtifactSlot, StatType, int]
+
+
+@cache
+def data_hash() -> str:
+    """The SHA-256 hash of the game data tables are computed from.
+
+    Returns:
+        str: The hex digest over every excel config in the data directory.
+    """
+    digest = hashlib.sha256()
+    for path in sorted(__data__.glob("*.json")):
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+@dataclass(frozen=True, slots=True)
+class PercentileTable:
+    """The cumulative distribution of a metric.
+
+    Attributes:
+        values: Every possible value of the metric, ascending.
+        cdf: The probability of a value at most each value.
+        resolution: The grid the values are on.
+    """
+
+    values: np.ndarray
+    cdf: np.ndarray
+    resolution: float
+
+    def ranks(self, values: np.ndarray) -> np.ndarray:
+        """The percentile rank of values: the share of artifacts with a lower value,
+        plus half the share with an equal value.
+
+        Args:
+            values (np.ndarray): The values of the metric.
+
+        Returns:
+            np.ndarray: The ranks between 0 and 1.
+        """
+        cdf = np.concatenate(([0.0], self.cdf))
+        tolerance = self.resolution / 2
+        below = cdf[np.searchsorted(self.values, values - tolerance, side="left")]
+        at_most = cdf[np.searchsorted(self.values, values + tolerance, side="right")]
+        return (below + at_most) / 2
+
+
+def _build_table(key: TableKey, resolution: Decimal) -> PercentileTable:
+    metric, rarity, slot, mainstat, level = key
+    if metric not in METRICS or METRICS[metric].per_substat:
+        msg = f"Invalid metric: {metric}"
+        raise ValueError(msg)
+    pmf = exact_pmf(
+        METRICS[metric].scalar,
+        slot,
+        mainstat=mainstat,
+        rarity=rarity,
+        level=level,
+        resolution=resolution,
+    )
+    values = sorted(pmf)
+    cdf = np.cumsum([pmf[v] for v in values])
+    return PercentileTable(
+        np.array([float(v) for v in values]),
+        cdf / cdf[-1],
+        float(resolution),
+    )
+
+
+def _key_name(key: TableKey) -> str:
+    metric, rarity, slot, mainstat, level = key
+    return f"{metric}/{rarity}/{slot}/{mainstat.name}/{level}"
+
+
+def _parse_key(name: str) -> TableKey:
+    metric, rarity, slot, mainstat, level = name.split("/")
+    return metric, int(rarity), ArtifactSlot(slot), StatType[mainstat], int(level)
+
+
+class PercentileTables:
+    """Percentile tables by metric, rarity, slot, mainstat and level, built on first
+    use.
+
+    Args:
+        resolution (Decimal, optional): The grid metrics are evaluated on. Defaults
+            to ROUND_TO.
+    """
+
+    def __init__(self, resolution: Decimal = ROUND_TO) -> None:
+        self.resolution = resolution
+        self._tables: dict[TableKey, PercentileTable] = {}
+
+    def __len__(self) -> int:
+        return len(self._tables)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._tables
+
+    def table(
+        self,
+        metric: str,
+        slot: ArtifactSlot,
+        mainstat: StatType,
+        *,
+        rarity: int,
+        level: int,
+    ) -> PercentileTable:
+        """The table of a metric for artifacts of a kind.
+
+        Args:
+            metric (str): The name of an additive metric in
+                :data:`artipy.analysis.METRICS`.
+            slot (artipy.types.ArtifactSlot): The slot.
+            mainstat (artipy.types.StatType): The mainstat.
+            rarity (int): The rarity.
+            level (int): The level.
+
+        Raises:
+            ValueError: If the metric is unknown or per substat.
+
+        Returns:
+            PercentileTable: The table.
+        """
+        key = (metric, rarity, slot, mainstat, level)
+        if key not in self._tables:
+            self._tables[key] = _build_table(key, self.resolution)
+        return self._tables[key]
+
+    def percentile_rank(self, artifact: Artifact, metric: str) -> float:
+        """The percentile rank of an artifact among artifacts of its rarity, slot,
+        mainstat and level.
+
+        Args:
+            artifact (artipy.artifacts.Artifact): The artifact.
+            metric (str): The name of the metric.
+
+        Returns:
+            float: The rank between 0 and 1. One minus the rank is the share of
+            better artifacts.
+        """
+        table = self.table(
+            metric,
+            artifact.artifact_slot,
+            artifact.mainstat.name,
+            rarity=artifact.rarity,
+            level=artifact.level,
+        )
+        value = float(METRICS.compute(metric, artifact))
+        return float(table.ranks(np.array([value]))[0])
+
+    def percentile_ranks(
+        self,
+        artifacts: ArtifactBatch | Iterable[Artifact],
+        metric: str,
+    ) -> np.ndarray:
+        """The percentile rank of every artifact of an inventory.
+
+        Args:
+            artifacts (ArtifactBatch | Iterable[artipy.artifacts.Artifact]): The
+                artifacts, or a batch of them.
+            metric (str): The name of the metric.
+
+        Returns:
+            np.ndarray: The rank of each artifact.
+        """
+        if not isinstance(artifacts, ArtifactBatch):
+            artifacts = ArtifactBatch.from_artifacts(artifacts)
+        values = METRICS.calculate_batch(artifacts, [metric])[metric]
+        kinds = np.stack(
+            [artifacts.rarity, artifacts.slot, artifacts.mainstat, artifacts.level],
+            axis=1,
+        ).astype(np.int64)
+        unique, inverse = np.unique(kinds, axis=0, return_inverse=True)
+        ranks = np.empty(len(artifacts))
+        for group, (rarity, slot, mainstat, level) in enumerate(unique):
+            mask = inverse.ravel() == group
+            table = self.table(
+                metric,
+                SLOT_CODES[slot],
+                STAT_CODES[mainstat],
+                rarity=int(rarity),
+                level=int(level),
+            )
+            ranks[mask] = table.ranks(values[mask])
+        return ranks
+
+    def save(self, path: Path) -> None:
+        """Save every built table to a compressed ``.npz`` file.
+
+        Args:
+            path (Path): The file to write.
+        """
+        arrays: dict[str, np.ndarray] = {}
+        for key, table in self._tables.items():
+            arrays[f"{_key_name(key)}/values"] = table.values
+            arrays[f"{_key_name(key)}/cdf"] = table.cdf
+        header = {
+            "version": TABLE_VERSION,
+            "data_hash": data_hash(),
+            "resolution": str(self.resolution),
+        }
+        with path.open("wb") as file:
+            np.savez_compressed(
+                file,
+                header=np.frombuffer(orjson.dumps(header), dtype=np.uint8),
+                **arrays,
+            )
+
+    @classmethod
+    def load(cls, path: Path) -> PercentileTables:
+        """Load tables saved with :meth:`save`.
+
+        Args:
+            path (Path): The file to read.
+
+        Raises:
+            ValueError: If the file was written by another version of the tables or
+                from other game data.
+
+        Returns:
+            PercentileTables: The tables.
+        """
+        with np.load(path) as data:
+            header = orjson.loads(data["header"].tobytes())
+            if header["version"] != TABLE_VERSION or header["data_hash"] != data_hash():
+                msg = f"Percentile tables in '{path}' are out of date"
+                raise ValueError(msg)
+            tables = cls(Decimal(header["resolution"]))
+            for name in data.files:
+                if name.endswith("/values"):
+                    prefix = name.removesuffix("/values")
+                    tables._tables[_parse_key(prefix)] = PercentileTable(
+                        data[name],
+                        data[f"{prefix}/cdf"],
+                        float(tables.resolution),
+                    )
+        return tables
+
+
+TABLES = PercentileTables()
+
+
+def percentile_rank(
+    artifact: Artifact,
+    metric: str,
+    tables: PercentileTables = TABLES,
+) -> float:
+    """The percentile rank of an artifact among artifacts of its rarity, slot,
+    mainstat and level, see :meth:`PercentileTables.percentile_rank`.
+
+    Args:
+        artifact (artipy.artifacts.Artifact): The artifact.
+        metric (str): The name of the metric.
+        tables (PercentileTables, optional): The tables to use. Defaults to the
+            shared in-memory tables.
+
+    Returns:
+        float: The rank between 0 and 1.
+    """
+    return tables.percentile_rank(artifact, metric)
+
+
+def percentile_ranks(
+    artifacts: ArtifactBatch | Iterable[Artifact],
+    metric: str,
+    tables: PercentileTables = TABLES,
+) -> np.ndarray:
+    """The percentile rank of every artifact of an inventory, see
+    :meth:`PercentileTables.percentile_ranks`.
+
+    Args:
+        artifacts (ArtifactBatch | Iterable[artipy.artifacts.Artifact]): The
+            artifacts, or a batch of them.
+        metric (str): The name of the metric.
+        tables (PercentileTables, optional): The tables to use. Defaults to the
+            shared in-memory tables.
+
+    Returns:
+        np.ndarray: The rank of each artifact.
+    """
+    return tables.percentile_ranks(artifacts, metric)
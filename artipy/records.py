@@ -0,0 +1,276 @@
+"""Flat row representation of artifacts and streaming writers for those rows."""
+
+from __future__ import annotations
+
+import csv
+import io
+from decimal import Decimal
+from typing import IO, TYPE_CHECKING, Any, Literal, Protocol
+
+import numpy as np
+import orjson
+
+from artipy import MAX_RARITY
+from artipy.artifacts import Artifact, ArtifactBuilder
+from artipy.types import ArtifactSet, ArtifactSlot, StatType
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator, Mapping, Sequence
+
+__all__ = (
+    "ARTIFACT_FIELDS",
+    "RowWriter",
+    "artifact_from_row",
+    "artifact_to_row",
+    "open_writer",
+    "read_rows",
+    "record_dtype",
+)
+
+type Row = dict[str, Any]
+type OutputFormat = Literal["csv", "jsonl", "binary"]
+
+MAX_SUBSTATS = MAX_RARITY - 1
+
+ARTIFACT_FIELDS: tuple[str, ...] = (
+    "slot",
+    "set",
+    "rarity",
+    "level",
+    "mainstat",
+    "mainstat_value",
+    *(
+        f"substat_{i}{suffix}"
+        for i in range(1, MAX_SUBSTATS + 1)
+        for suffix in ("", "_value")
+    ),
+)
+
+SLOT_CODES: tuple[ArtifactSlot, ...] = tuple(ArtifactSlot)
+SET_CODES: tuple[ArtifactSet, ...] = tuple(ArtifactSet)
+STAT_CODES: tuple[StatType, ...] = tuple(StatType)
+
+
+def parse_stat(value: str) -> StatType:
+    """Parse a stat from either its member name (``CRIT_RATE``) or its game
+    identifier (``FIGHT_PROP_CRITICAL``).
+
+    Args:
+        value (str): The value to parse.
+
+    Raises:
+        ValueError: If the value is not a known stat.
+
+    Returns:
+        artipy.types.StatType: The parsed stat.
+    """
+    try:
+        return StatType[value.upper()]
+    except KeyError:
+        return StatType(value)
+
+
+def artifact_to_row(artifact: Artifact) -> Row:
+    """Flatten an artifact into a row.
+
+    Args:
+        artifact (artipy.artifacts.Artifact): The artifact to flatten.
+
+    Returns:
+        Row: The artifact as a flat mapping of :data:`ARTIFACT_FIELDS`.
+    """
+    row: Row = {
+        "slot": str(artifact.artifact_slot),
+        "set": artifact.artifact_set.name,
+        "rarity": artifact.rarity,
+        "level": artifact.level,
+        "mainstat": artifact.mainstat.name.name,
+        "mainstat_value": float(artifact.mainstat.value),
+    }
+    for i in range(MAX_SUBSTATS):
+        if i < len(artifact.substats):
+            substat = artifact.substats[i]
+            row[f"substat_{i + 1}"] = substat.name.name
+            row[f"substat_{i + 1}_value"] = float(substat.value)
+        else:
+            row[f"substat_{i + 1}"] = ""
+            row[f"substat_{i + 1}_value"] = 0.0
+    return row
+
+
+def artifact_from_row(row: Mapping[str, Any]) -> Artifact:
+    """Build an artifact from a row produced by :func:`artifact_to_row`.
+
+    Missing substat columns and empty substat names are skipped, so rows produced by
+    other tools only need the columns they actually use.
+
+    Args:
+        row (Mapping[str, Any]): The row to read.
+
+    Raises:
+        KeyError: If the slot or mainstat column is missing, or the set is unknown.
+        ValueError: If the row describes an invalid artifact or holds malformed
+            values.
+
+    Returns:
+        artipy.artifacts.Artifact: The artifact.
+    """
+    try:
+        substats = [
+            (parse_stat(name), Decimal(str(row.get(f"substat_{i}_value") or 0)))
+            for i in range(1, MAX_SUBSTATS + 1)
+            if (name := row.get(f"substat_{i}"))
+        ]
+        slot = ArtifactSlot(row["slot"])
+        builder = (
+            ArtifactBuilder()
+            .with_mainstat(parse_stat(row["mainstat"]))
+            .with_substats(substats)
+            .with_rarity(int(row.get("rarity") or MAX_RARITY))
+            .with_level(int(row.get("level") or 0))
+            .with_slot(slot)
+        )
+        if artifact_set := row.get("set"):
+            builder = builder.with_set(ArtifactSet[artifact_set])
+    except (ArithmeticError, AttributeError, TypeError) as e:
+        # Malformed values, such as non-numeric strings or numbers in place of
+        # names, are invalid rows like any other.
+        msg = f"Invalid artifact row: {e!r}"
+        raise ValueError(msg) from e
+    return builder.build()
+
+
+def read_rows(stream: IO[bytes], fmt: Literal["csv", "jsonl"]) -> Iterator[Row]:
+    """Lazily read rows from a CSV or JSON lines stream.
+
+    Args:
+        stream (IO[bytes]): The stream to read from.
+        fmt (Literal["csv", "jsonl"]): The format of the stream.
+
+    Yields:
+        Row: Each row in the stream.
+    """
+    if fmt == "jsonl":
+        for line in stream:
+            if line.strip():
+                yield orjson.loads(line)
+        return
+    text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    try:
+        yield from csv.DictReader(text)
+    finally:
+        text.detach()
+
+
+def record_dtype(fields: Sequence[str]) -> np.dtype[np.void]:
+    """The fixed-width record layout of the binary output format.
+
+    Enumerations are stored as their index in declaration order (``-1`` for an empty
+    substat) and every other column is stored as a little-endian float64.
+
+    Args:
+        fields (Sequence[str]): The columns of the record.
+
+    Returns:
+        np.dtype: The structured dtype of a record.
+    """
+
+    def field_type(name: str) -> str:
+        if name in {"slot", "set", "rarity", "level"}:
+            return "u1"
+        if name == "mainstat" or (name.startswith("substat_") and "value" not in name):
+            return "i1"
+        return "<f8"
+
+    return np.dtype([(name, field_type(name)) for name in fields])
+
+
+def _encode(name: str, value: Any) -> Any:
+    match name:
+        case "slot":
+            return SLOT_CODES.index(ArtifactSlot(value))
+        case "set":
+            return SET_CODES.index(ArtifactSet[value])
+        case "mainstat":
+            return STAT_CODES.index(parse_stat(value))
+        case _ if name.startswith("substat_") and not name.endswith("_value"):
+            return STAT_CODES.index(parse_stat(value)) if value else -1
+        case _:
+            return value
+
+
+class RowWriter(Protocol):
+    def write_rows(self, rows: Iterable[Row]) -> None: ...
+
+    def close(self) -> None: ...
+
+
+class _CsvWriter:
+    def __init__(self, stream: IO[bytes], fields: Sequence[str]) -> None:
+        self._text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+        self._writer = csv.DictWriter(self._text, fieldnames=fields)
+        self._writer.writeheader()
+
+    def write_rows(self, rows: Iterable[Row]) -> None:
+        self._writer.writerows(rows)
+
+    def close(self) -> None:
+        self._text.flush()
+        self._text.detach()
+
+
+class _JsonlWriter:
+    def __init__(self, stream: IO[bytes], fields: Sequence[str]) -> None:
+        self._stream = stream
+        self._fields = fields
+
+    def write_rows(self, rows: Iterable[Row]) -> None:
+        self._stream.writelines(
+            orjson.dumps(
+                {k: row[k] for k in self._fields},
+                option=orjson.OPT_APPEND_NEWLINE,
+            )
+            for row in rows
+        )
+
+    def close(self) -> None:
+        self._stream.flush()
+
+
+class _BinaryWriter:
+    def __init__(self, stream: IO[bytes], fields: Sequence[str]) -> None:
+        self._stream = stream
+        self._fields = fields
+        self._dtype = record_dtype(fields)
+
+    def write_rows(self, rows: Iterable[Row]) -> None:
+        records = [tuple(_encode(k, row[k]) for k in self._fields) for row in rows]
+        self._stream.write(np.array(records, dtype=self._dtype).tobytes())
+
+    def close(self) -> None:
+        self._stream.flush()
+
+
+def open_writer(stream: IO[bytes], fmt: OutputFormat, fields: Sequence[str]) -> RowWriter:
+    """Open a streaming writer over a binary stream.
+
+    Rows are written as soon as they are handed to the writer, so memory use does not
+    grow with the amount of rows written.
+
+    Args:
+        stream (IO[bytes]): The stream to write to.
+        fmt (OutputFormat): One of ``csv``, ``jsonl`` or ``binary``. The binary
+            format is a headerless sequence of :func:`record_dtype` records.
+        fields (Sequence[str]): The columns to write, in order.
+
+    Raises:
+        ValueError: If the format is unknown.
+
+    Returns:
+        RowWriter: The writer.
+    """
+    writers = {"csv": _CsvWriter, "jsonl": _JsonlWriter, "binary": _BinaryWriter}
+    if fmt not in writers:
+        msg = f"Unknown output format '{fmt}' (expected one of {', '.join(writers)})"
+        raise ValueError(msg)
+    return writers[fmt](stream, fields)
@@ -0,0 +1,242 @@
+"""Likelihood-ratio reweighting of simulated artifacts for alternative weight tables.
+
+Weights only enter generation through the mainstat draw and the sequential draws of
+substats, and every artifact keeps its substats in the order they were drawn, both
+in memory and in the rows written by :mod:`artipy.simulation`. The probability of a
+sample under any :class:`WeightTable` can therefore be computed from the sample
+itself, and a single simulation answers what-if questions for many tables: each
+sample is weighted by the ratio of its probability under the new table to its
+probability under the table that generated it.
+
+Reweighting is only valid for tables that give no positive weight to outcomes the
+generating table could not produce. The effective sample size of
+:class:`ReweightedStats` shows how much precision a table costs.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, NamedTuple
+
+import numpy as np
+
+from artipy.artifacts import substat_weights
+from artipy.batch import EMPTY, ArtifactBatch
+from artipy.records import MAX_SUBSTATS, SLOT_CODES, STAT_CODES
+from artipy.types import VALID_MAINSTATS
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping, Sequence
+
+    from artipy.artifacts import Artifact
+    from artipy.types import StatType
+
+__all__ = (
+    "ReweightedStats",
+    "WeightTable",
+    "likelihood_ratios",
+    "log_likelihood",
+    "reweighted_histogram",
+    "reweighted_stats",
+    "sweep",
+)
+
+
+@dataclass(frozen=True, slots=True)
+class WeightTable:
+    """The weights of the random draws of artifact generation.
+
+    Attributes:
+        substats: The weight of each substat. Defaults to
+            :data:`artipy.artifacts.substat_weights`.
+        mainstats: The weight of each mainstat per slot. Defaults to
+            :data:`artipy.types.VALID_MAINSTATS`.
+    """
+
+    substats: Mapping[StatType, float] = field(
+        default_factory=lambda: dict(substat_weights),
+    )
+    mainstats: Mapping[str, Mapping[StatType, float]] = field(
+        default_factory=lambda: dict(VALID_MAINSTATS),
+    )
+
+    def substat_array(self) -> np.ndarray:
+        """The weight of every stat by its index in :class:`artipy.types.StatType`."""
+        return np.array([float(self.substats.get(s, 0)) for s in STAT_CODES])
+
+    def mainstat_array(self) -> np.ndarray:
+        """The probability of every mainstat by slot and stat index."""
+        table = np.zeros((len(SLOT_CODES), len(STAT_CODES)))
+        for i, slot in enumerate(SLOT_CODES):
+            weights = self.mainstats.get(slot, {})
+            total = sum(weights.values())
+            for stat, weight in weights.items():
+                table[i, STAT_CODES.index(stat)] = weight / total
+        return table
+
+
+def _as_batch(artifacts: ArtifactBatch | Iterable[Artifact]) -> ArtifactBatch:
+    if isinstance(artifacts, ArtifactBatch):
+        return artifacts
+    return ArtifactBatch.from_artifacts(artifacts)
+
+
+def log_likelihood(
+    artifacts: ArtifactBatch | Iterable[Artifact],
+    table: WeightTable,
+    *,
+    fixed_mainstat: bool = False,
+) -> np.ndarray:
+    """The log-probability of the weighted draws of every artifact under a table.
+
+    Draws that do not depend on the weights, such as the amount of substats, value
+    tiers and upgrade targets, are left out since they cancel in likelihood ratios.
+
+    Args:
+        artifacts (ArtifactBatch | Iterable[artipy.artifacts.Artifact]): The
+            artifacts, with their substats in the order they were drawn.
+        table (WeightTable): The weight table.
+        fixed_mainstat (bool, optional): Whether the mainstat was fixed instead of
+            drawn. Defaults to False.
+
+    Returns:
+        np.ndarray: The log-probability of each artifact, ``-inf`` if the table
+        cannot produce it.
+    """
+    batch = _as_batch(artifacts)
+    weights = table.substat_array()
+    # Every substat is drawn from the stats that are neither the mainstat nor drawn
+    # before, so the remaining weight shrinks with every draw.
+    remaining = weights.sum() - weights[batch.mainstat]
+    result = np.zeros(len(batch))
+    with np.errstate(divide="ignore"):
+        if not fixed_mainstat:
+            result += np.log(table.mainstat_array()[batch.slot, batch.mainstat])
+        for position in range(MAX_SUBSTATS):
+            present = batch.substats[:, position] != EMPTY
+            weight = weights[batch.substats[:, position].clip(0)]
+            result += np.where(present, np.log(weight / remaining), 0.0)
+            remaining -= np.where(present, weight, 0.0)
+    return result
+
+
+def likelihood_ratios(
+    artifacts: ArtifactBatch | Iterable[Artifact],
+    table: WeightTable,
+    *,
+    base: WeightTable | None = None,
+    fixed_mainstat: bool = False,
+) -> np.ndarray:
+    """The likelihood ratio of every artifact between a new table and the one that
+    generated it.
+
+    Args:
+        artifacts (ArtifactBatch | Iterable[artipy.artifacts.Artifact]): The
+            artifacts, with their substats in the order they were drawn.
+        table (WeightTable): The new weight table.
+        base (WeightTable, optional): The table that generated the artifacts.
+            Defaults to the weights of the package.
+        fixed_mainstat (bool, optional): Whether the mainstat was fixed instead of
+            drawn. Defaults to False.
+
+    Returns:
+        np.ndarray: The weight of each artifact under the new table.
+    """
+    batch = _as_batch(artifacts)
+    base = base or WeightTable()
+    new = log_likelihood(batch, table, fixed_mainstat=fixed_mainstat)
+    old = log_likelihood(batch, base, fixed_mainstat=fixed_mainstat)
+    return np.exp(new - old)
+
+
+class ReweightedStats(NamedTuple):
+    """Statistics of a metric under a reweighted sample.
+
+    Attributes:
+        mean: The weighted mean.
+        std: The weighted standard deviation.
+        effective_sample_size: The amount of unweighted samples with the same
+            precision.
+    """
+
+    mean: float
+    std: float
+    effective_sample_size: float
+
+
+def reweighted_stats(values: np.ndarray, ratios: np.ndarray) -> ReweightedStats:
+    """The self-normalised statistics of a metric under likelihood ratios.
+
+    Args:
+        values (np.ndarray): The metric of every sample.
+        ratios (np.ndarray): The likelihood ratio of every sample.
+
+    Raises:
+        ValueError: If every ratio is zero.
+
+    Returns:
+        ReweightedStats: The statistics.
+    """
+    total = ratios.sum()
+    if not total > 0:
+        msg = "The new table gives no weight to any sample"
+        raise ValueError(msg)
+    weights = ratios / total
+    mean = float(weights @ values)
+    variance = float(weights @ (values - mean) ** 2)
+    return ReweightedStats(mean, variance**0.5, float(1 / (weights @ weights)))
+
+
+def reweighted_histogram(
+    values: np.ndarray,
+    ratios: np.ndarray,
+    bins: int | Sequence[float] | np.ndarray = 50,
+) -> tuple[np.ndarray, np.ndarray]:
+    """The histogram of a metric under likelihood ratios.
+
+    Args:
+        values (np.ndarray): The metric of every sample.
+        ratios (np.ndarray): The likelihood ratio of every sample.
+        bins (int | Sequence[float], optional): The bins of :func:`numpy.histogram`.
+            Defaults to 50.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The probability of every bin and the bin
+        edges.
+    """
+    counts, edges = np.histogram(values, bins=bins, weights=ratios)
+    return counts / ratios.sum(), edges
+
+
+def sweep(
+    artifacts: ArtifactBatch | Iterable[Artifact],
+    values: np.ndarray,
+    tables: Mapping[str, WeightTable],
+    *,
+    base: WeightTable | None = None,
+    fixed_mainstat: bool = False,
+) -> dict[str, ReweightedStats]:
+    """The statistics of a metric under each of many weight tables.
+
+    Args:
+        artifacts (ArtifactBatch | Iterable[artipy.artifacts.Artifact]): The
+            simulated artifacts.
+        values (np.ndarray): The metric of every artifact.
+        tables (Mapping[str, WeightTable]): The weight tables by name.
+        base (WeightTable, optional): The table that generated the artifacts.
+            Defaults to the weights of the package.
+        fixed_mainstat (bool, optional): Whether the mainstat was fixed instead of
+            drawn. Defaults to False.
+
+    Returns:
+        dict[str, ReweightedStats]: The statistics under each table.
+    """
+    batch = _as_batch(artifacts)
+    old = log_likelihood(batch, base or WeightTable(), fixed_mainstat=fixed_mainstat)
+    return {
+        name: reweighted_stats(
+            values,
+            np.exp(log_likelihood(batch, table, fixed_mainstat=fixed_mainstat) - old),
+        )
+        for name, table in tables.items()
+    }
@@ -0,0 +1,319 @@
+"""Exact reconstruction of substat roll histories.
+
+Every substat value is the sum of one or more rolls, each roll being one of the value
+tiers in :func:`artipy.utils.possible_substat_values`. The order of the rolls does not
+matter, so a history is fully described by how many rolls landed in each tier. For
+every stat and rarity all reachable sums are precomputed into a table sorted by value,
+which turns decoding a value into a binary search.
+
+Some sums can be reached by several histories, e.g. five HP rolls of 239 and four
+of 298.75 both sum to 1,195. The table keeps every candidate history of a sum.
+Decoding a lone substat picks the one with the fewest rolls and flags it as
+ambiguous; :func:`reconstruct_inventory` uses the level of the artifact, which fixes
+the total amount of rolls over its substats, to choose among the candidates.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from decimal import Decimal
+from functools import cache
+from itertools import combinations_with_replacement, product
+from typing import TYPE_CHECKING, NamedTuple
+
+import numpy as np
+
+from artipy import UPGRADE_STEP
+from artipy.leveling import max_level
+
+from .utils import possible_substat_values
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Sequence
+
+    from artipy.artifacts import Artifact
+    from artipy.stats import SubStat
+    from artipy.types import StatType
+
+__all__ = (
+    "MAX_TIERS",
+    "RollHistory",
+    "RollTable",
+    "decode_substat",
+    "decode_values",
+    "max_rolls",
+    "reconstruct_inventory",
+    "roll_table",
+    "total_rolls",
+)
+
+MAX_TIERS = 4
+
+
+def max_rolls(rarity: int) -> int:
+    """The most rolls a single substat can have at the maximum level of a rarity.
+
+    Args:
+        rarity (int): The rarity of the artifact.
+
+    Returns:
+        int: The initial roll plus every upgrade landing on the same substat.
+    """
+    return 1 + (math.ceil(max_level(rarity) / UPGRADE_STEP) if rarity > 1 else 0)
+
+
+class RollHistory(NamedTuple):
+    """The decoded roll history of a substat.
+
+    Attributes:
+        rolls: The total amount of rolls, including the initial one.
+        tiers: The amount of rolls in each value tier, lowest tier first.
+        value: The exact value of the decoded rolls.
+        error: The distance between the decoded and the observed value.
+        candidates: The tiers of every history that is consistent with the value,
+            and with the artifact when decoded by :func:`reconstruct_inventory`.
+    """
+
+    rolls: int
+    tiers: tuple[int, ...]
+    value: Decimal
+    error: Decimal
+    candidates: tuple[tuple[int, ...], ...] = ()
+
+    @property
+    def ambiguous(self) -> bool:
+        """Whether several histories are consistent with the value."""
+        return len(self.candidates) > 1
+
+    @property
+    def upgrades(self) -> int:
+        """The amount of upgrades that landed on the substat."""
+        return max(0, self.rolls - 1)
+
+
+@dataclass(frozen=True, slots=True)
+class RollTable:
+    """Every reachable substat value of a stat and rarity, sorted by value.
+
+    Attributes:
+        values: The exact reachable values.
+        floats: ``values`` as a float64 array for vectorized lookups.
+        tiers: The amount of rolls per tier of the history of each value with the
+            fewest rolls.
+        rolls: The total amount of rolls of that history.
+        ambiguous: Whether several histories produce each value.
+        candidates: Every history producing each value, fewest rolls first.
+    """
+
+    values: tuple[Decimal, ...]
+    floats: np.ndarray
+    tiers: np.ndarray
+    rolls: np.ndarray
+    ambiguous: np.ndarray
+    candidates: tuple[tuple[tuple[int, ...], ...], ...]
+
+    def nearest(self, values: np.ndarray) -> np.ndarray:
+        """The index of the nearest reachable value for every value.
+
+        Args:
+            values (np.ndarray): The observed values.
+
+        Returns:
+            np.ndarray: Indices into the table.
+        """
+        right = np.searchsorted(self.floats, values).clip(1, len(self.floats) - 1)
+        left = right - 1
+        closer_left = np.abs(values - self.floats[left]) <= np.abs(
+            self.floats[right] - values,
+        )
+        return np.where(closer_left, left, right)
+
+
+@cache
+def roll_table(stat: StatType, rarity: int) -> RollTable:
+    """The table of reachable values of a substat. Computed once per stat and rarity.
+
+    Args:
+        stat (artipy.types.StatType): The substat.
+        rarity (int): The rarity of the artifact.
+
+    Returns:
+        RollTable: The table, including the empty history with a value of 0.
+    """
+    tier_values = possible_substat_values(stat, rarity)
+    entries: dict[Decimal, list[tuple[int, ...]]] = {}
+    # Histories are generated by increasing amount of rolls, so the first candidate
+    # of every value has the fewest rolls.
+    for count in range(max_rolls(rarity) + 1):
+        for combination in combinations_with_replacement(range(len(tier_values)), count):
+            tiers = tuple(combination.count(t) for t in range(MAX_TIERS))
+            value = sum((tier_values[t] for t in combination), Decimal(0))
+            entries.setdefault(value, []).append(tiers)
+
+    values = tuple(sorted(entries))
+    candidates = tuple(tuple(entries[v]) for v in values)
+    tiers = np.array([c[0] for c in candidates], dtype=np.uint8).reshape(-1, MAX_TIERS)
+    return RollTable(
+        values=values,
+        floats=np.array([float(v) for v in values]),
+        tiers=tiers,
+        rolls=tiers.sum(axis=1, dtype=np.uint8),
+        ambiguous=np.array([len(c) > 1 for c in candidates], dtype=bool),
+        candidates=candidates,
+    )
+
+
+def decode_values(
+    stat: StatType,
+    rarity: int,
+    values: Sequence[float] | np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Decode many values of the same substat at once.
+
+    Args:
+        stat (artipy.types.StatType): The substat.
+        rarity (int): The rarity of the artifact.
+        values (Sequence[float] | np.ndarray): The observed values.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The total amount of rolls of each value and the
+        amount of rolls per tier of each value, with shape ``(n, MAX_TIERS)``. Values
+        with several histories get the one with the fewest rolls, see
+        :attr:`RollTable.ambiguous`.
+    """
+    table = roll_table(stat, rarity)
+    index = table.nearest(np.asarray(values, dtype=np.float64))
+    return table.rolls[index], table.tiers[index]
+
+
+def _history(
+    table: RollTable,
+    index: int,
+    observed: Decimal,
+    candidates: Sequence[tuple[int, ...]] | None = None,
+) -> RollHistory:
+    value = table.values[index]
+    candidates = tuple(table.candidates[index] if candidates is None else candidates)
+    tiers = candidates[0]
+    return RollHistory(
+        rolls=sum(tiers),
+        tiers=tiers,
+        value=value,
+        error=abs(observed - value),
+        candidates=candidates,
+    )
+
+
+def decode_substat(substat: SubStat) -> RollHistory:
+    """Decode the roll history of a substat.
+
+    The result is exact for values produced by rolling, and the nearest reachable
+    value for rounded values, e.g. values read off the game's UI. If several
+    histories produce the value, the one with the fewest rolls is returned and the
+    history is :attr:`RollHistory.ambiguous`.
+
+    Args:
+        substat (artipy.stats.SubStat): The substat to decode.
+
+    Returns:
+        RollHistory: The roll history.
+    """
+    table = roll_table(substat.name, substat.rarity)
+    index = int(table.nearest(np.array([float(substat.value)]))[0])
+    return _history(table, index, substat.value)
+
+
+def total_rolls(artifact: Artifact) -> frozenset[int]:
+    """The total amounts of rolls over all substats that the generator can give an
+    artifact of its rarity, level and amount of substats.
+
+    Every artifact starts with one or no fewer than the maximum amount of substats
+    less one, and every upgrade either adds a substat or rolls an existing one.
+
+    Args:
+        artifact (artipy.artifacts.Artifact): The artifact.
+
+    Returns:
+        frozenset[int]: The possible totals, empty if the generator cannot produce
+        the artifact.
+    """
+    max_substats = max(0, artifact.rarity - 1)
+    upgrades = -(-artifact.level // UPGRADE_STEP) if max_substats else 0
+    return frozenset(
+        initial + upgrades
+        for initial in {max(0, max_substats - 1), max_substats}
+        if min(initial + upgrades, max_substats) == len(artifact.substats)
+    )
+
+
+def _resolve(
+    options: Sequence[Sequence[tuple[int, ...]]],
+    totals: frozenset[int],
+) -> list[list[tuple[int, ...]]] | None:
+    """Keep the candidates of every substat that are part of an assignment whose
+    total amount of rolls is allowed, or None if there is no such assignment."""
+    counts = [sorted({sum(c) for c in candidates}) for candidates in options]
+    valid = [
+        combination for combination in product(*counts) if sum(combination) in totals
+    ]
+    if not valid:
+        return None
+    return [
+        [c for c in candidates if sum(c) in {combination[i] for combination in valid}]
+        for i, candidates in enumerate(options)
+    ]
+
+
+def reconstruct_inventory(artifacts: Iterable[Artifact]) -> list[tuple[RollHistory, ...]]:
+    """Decode the roll history of every substat of every artifact.
+
+    Substats are grouped by stat and rarity, and each group is decoded with a single
+    vectorized lookup. The level of an artifact fixes the total amount of rolls over
+    its substats, see :func:`total_rolls`, which settles most values that several
+    amounts of rolls can produce. Candidates that remain are kept in
+    :attr:`RollHistory.candidates`. Artifacts the generator cannot produce are
+    decoded substat by substat, like :func:`decode_substat`.
+
+    Args:
+        artifacts (Iterable[artipy.artifacts.Artifact]): The artifacts.
+
+    Returns:
+        list[tuple[RollHistory, ...]]: The histories of each artifact's substats, in
+        the order of the artifacts and their substats.
+    """
+    artifacts = list(artifacts)
+    substats = [tuple(a.substats) for a in artifacts]
+    groups: dict[tuple[StatType, int], list[tuple[int, int]]] = {}
+    for i, stats in enumerate(substats):
+        for j, substat in enumerate(stats):
+            groups.setdefault((substat.name, substat.rarity), []).append((i, j))
+
+    found: list[list[tuple[RollTable, int] | None]] = [[None] * len(s) for s in substats]
+    for (stat, rarity), positions in groups.items():
+        table = roll_table(stat, rarity)
+        observed = [substats[i][j].value for i, j in positions]
+        indices = table.nearest(np.array([float(v) for v in observed]))
+        for (i, j), index in zip(positions, indices, strict=True):
+            found[i][j] = (table, int(index))
+
+    histories: list[tuple[RollHistory, ...]] = []
+    for artifact, stats, row in zip(artifacts, substats, found, strict=True):
+        entries = [entry for entry in row if entry is not None]
+        options: Sequence[Sequence[tuple[int, ...]]] = [
+            table.candidates[index] for table, index in entries
+        ]
+        if any(len(o) > 1 for o in options):
+            options = _resolve(options, total_rolls(artifact)) or options
+        histories.append(
+            tuple(
+                _history(table, index, substat.value, candidates)
+                for (table, index), substat, candidates in zip(
+                    entries,
+                    stats,
+                    options,
+                    strict=True,
+                )
+            ),
+        )
+    return histories
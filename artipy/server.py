@@ -0,0 +1,338 @@
+"""Local scoring service speaking JSON lines over a Unix socket or TCP.
+
+Every request is a single JSON object on its own line, and every response echoes the
+``id`` of its request. Responses can arrive out of order.
+
+Requests:
+    - ``{"id": 1, "op": "ping"}``
+    - ``{"id": 2, "op": "score", "artifact": {...}, "metrics": ["crit_value"]}``
+    - ``{"id": 3, "op": "predict", "artifact": {...}, "metrics": ["crit_value"]}``
+
+Artifacts use the row format of :func:`artipy.records.artifact_to_row`. ``score``
+returns the current value of each metric and ``predict`` returns the mean and
+quantiles of each metric once the artifact is upgraded to its maximum level. Without
+``metrics``, both use the roll value and crit value.
+
+Concurrent ``score`` and ``predict`` requests are collected for a few milliseconds
+and evaluated as one batch in an executor, so the event loop is never blocked.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from collections import defaultdict
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Self
+
+import orjson
+
+from artipy import MAX_RARITY
+from artipy.analysis import ARTIFACT_ATTRIBUTES, METRICS
+from artipy.artifacts import ArtifactBuilder
+from artipy.distributions import final_pmf, pmf_mean, pmf_quantile
+from artipy.records import artifact_from_row
+from artipy.types import VALID_SUBSTATS, ArtifactSet, ArtifactSlot, StatType
+from artipy.utils import possible_mainstat_values, possible_substat_values
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from pathlib import Path
+    from types import TracebackType
+
+    from artipy.artifacts import Artifact
+
+__all__ = ("ScoringServer", "evaluate_batch", "serve", "warm_up")
+
+type Request = dict[str, Any]
+type Response = dict[str, Any]
+
+DEFAULT_BATCH_WINDOW = 0.005
+DEFAULT_MAX_BATCH = 512
+DEFAULT_METRICS = ("roll_value", "crit_value")
+PREDICT_QUANTILES = (0.1, 0.5, 0.9)
+
+
+def _warm_up_artifacts(rarity: int) -> list[Artifact]:
+    # Every substat of the rarity, spread over as few artifacts as will hold them.
+    substats = [
+        (stat, values[0])
+        for stat in VALID_SUBSTATS
+        if (values := possible_substat_values(stat, rarity))
+    ]
+    size = rarity - 1
+    groups = (
+        [substats[i : i + size] for i in range(0, len(substats), size)] if size else [[]]
+    )
+    return [
+        ArtifactBuilder()
+        .with_rarity(rarity)
+        .with_mainstat(StatType.HP, possible_mainstat_values(StatType.HP, rarity)[0])
+        .with_substats(group)
+        .with_slot(ArtifactSlot.FLOWER)
+        .with_set(ArtifactSet.GLADIATORS_FINALE)
+        .build()
+        for group in groups
+    ]
+
+
+def warm_up() -> None:
+    """Load the game data and fill the caches used to evaluate requests, by scoring
+    artifacts of every rarity holding every substat with every registered metric."""
+    for rarity in range(1, MAX_RARITY + 1):
+        for stat in StatType:
+            possible_substat_values(stat, rarity)
+            possible_mainstat_values(stat, rarity)
+        METRICS.calculate_batch(_warm_up_artifacts(rarity), tuple(METRICS))
+
+
+def _parse(request: Request) -> tuple[str, Artifact, tuple[str, ...]]:
+    op = request.get("op")
+    if op not in {"score", "predict"}:
+        msg = f"Unknown op '{op}'"
+        raise ValueError(msg)
+    metrics = tuple(request.get("metrics") or DEFAULT_METRICS)
+    for name in metrics:
+        if name not in ARTIFACT_ATTRIBUTES:
+            msg = f"Invalid metric: {name}"
+            raise ValueError(msg)
+    return op, artifact_from_row(request["artifact"]), metrics
+
+
+def _predict(artifact: Artifact, metrics: Sequence[str]) -> dict[str, Any]:
+    result: dict[str, Any] = {}
+    for name in metrics:
+        pmf = final_pmf(artifact, ARTIFACT_ATTRIBUTES[name])
+        result[name] = {
+            "mean": pmf_mean(pmf),
+            **{f"p{q * 100:.0f}": float(pmf_quantile(pmf, q)) for q in PREDICT_QUANTILES},
+        }
+    return result
+
+
+def _error(e: Exception) -> Response:
+    return {"error": f"{type(e).__name__}: {e}"}
+
+
+def evaluate_batch(requests: list[Request]) -> list[Response]:
+    """Evaluate a batch of requests in a single call.
+
+    Identical requests within a batch are only evaluated once, and invalid requests
+    produce an error response instead of failing the batch. ``score`` requests for
+    the same metrics are scored together with
+    :meth:`artipy.metrics.MetricRegistry.calculate_batch`.
+
+    Args:
+        requests (list[Request]): The requests to evaluate.
+
+    Returns:
+        list[Response]: The response to each request, in order.
+    """
+    outcomes: dict[bytes, Response] = {}
+    keys: list[bytes] = []
+    scores: defaultdict[tuple[str, ...], dict[bytes, Artifact]] = defaultdict(dict)
+    for request in requests:
+        body = {k: v for k, v in request.items() if k != "id"}
+        key = orjson.dumps(body, option=orjson.OPT_SORT_KEYS)
+        keys.append(key)
+        if key in outcomes or any(key in group for group in scores.values()):
+            continue
+        try:
+            op, artifact, metrics = _parse(body)
+            if op == "score":
+                scores[metrics][key] = artifact
+            else:
+                outcomes[key] = {"result": _predict(artifact, metrics)}
+        except (ArithmeticError, KeyError, TypeError, ValueError) as e:
+            outcomes[key] = _error(e)
+    for metrics, group in scores.items():
+        values = METRICS.calculate_batch(list(group.values()), metrics).tolist()
+        for key, record in zip(group, values, strict=True):
+            outcomes[key] = {"result": dict(zip(metrics, record, strict=True))}
+    return [
+        {"id": request.get("id"), **outcomes[key]}
+        for request, key in zip(requests, keys, strict=True)
+    ]
+
+
+class ScoringServer:
+    """Micro-batching request evaluator shared by every connection.
+
+    Use it as an async context manager to run the batching loop, then either serve
+    it over a socket with :meth:`serve_tcp`/:meth:`serve_unix` or call
+    :meth:`submit` directly. At most ``concurrency`` batches are evaluated at once;
+    requests arriving meanwhile are queued up for the next batch.
+
+    Attributes:
+        batches (int): The amount of batches evaluated so far.
+        requests (int): The amount of requests evaluated so far.
+    """
+
+    def __init__(
+        self,
+        *,
+        batch_window: float = DEFAULT_BATCH_WINDOW,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        concurrency: int = 1,
+        executor: Executor | None = None,
+    ) -> None:
+        self._batch_window = batch_window
+        self._max_batch = max_batch
+        self._own_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=1)
+        self._queue: asyncio.Queue[tuple[Request, asyncio.Future[Response]]] = (
+            asyncio.Queue()
+        )
+        self._batcher: asyncio.Task[None] | None = None
+        self._slots = asyncio.Semaphore(concurrency)
+        self._tasks: set[asyncio.Task[None]] = set()
+        self.batches = 0
+        self.requests = 0
+
+    async def __aenter__(self) -> Self:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, warm_up)
+        self._batcher = asyncio.create_task(self._run_batches())
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        for task in (self._batcher, *self._tasks):
+            if task is not None:
+                task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await task
+        if self._own_executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def submit(self, request: Request) -> Response:
+        """Evaluate a request as part of the next batch.
+
+        Args:
+            request (Request): The request.
+
+        Returns:
+            Response: The response.
+        """
+        if request.get("op") == "ping":
+            return {"id": request.get("id"), "result": "pong"}
+        future: asyncio.Future[Response] = asyncio.get_running_loop().create_future()
+        await self._queue.put((request, future))
+        return await future
+
+    async def _run_batches(self) -> None:
+        while True:
+            await self._slots.acquire()
+            pending = [await self._queue.get()]
+            # Give concurrent requests a moment to join the batch.
+            await asyncio.sleep(self._batch_window)
+            while len(pending) < self._max_batch and not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+            task = asyncio.create_task(self._evaluate(pending))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _evaluate(
+        self,
+        pending: list[tuple[Request, asyncio.Future[Response]]],
+    ) -> None:
+        requests = [request for request, _ in pending]
+        try:
+            responses = await asyncio.get_running_loop().run_in_executor(
+                self._executor,
+                evaluate_batch,
+                requests,
+            )
+        except Exception as e:  # noqa: BLE001
+            responses = [{"id": r.get("id"), "error": repr(e)} for r in requests]
+        finally:
+            self._slots.release()
+        self.batches += 1
+        self.requests += len(requests)
+        for (_, future), response in zip(pending, responses, strict=True):
+            if not future.done():
+                future.set_result(response)
+
+    async def _respond(self, line: bytes, writer: asyncio.StreamWriter) -> None:
+        try:
+            request = orjson.loads(line)
+            if not isinstance(request, dict):
+                msg = "Request must be a JSON object"
+                raise TypeError(msg)  # noqa: TRY301
+            response = await self.submit(request)
+        except (orjson.JSONDecodeError, TypeError) as e:
+            response = {"id": None, "error": f"{type(e).__name__}: {e}"}
+        writer.write(orjson.dumps(response, option=orjson.OPT_APPEND_NEWLINE))
+        await writer.drain()
+
+    async def handle_connection(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        """Serve the requests of a single connection until it is closed."""
+        tasks: set[asyncio.Task[None]] = set()
+        try:
+            while line := await reader.readline():
+                if not line.strip():
+                    continue
+                task = asyncio.create_task(self._respond(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def serve_tcp(self, host: str = "127.0.0.1", port: int = 0) -> asyncio.Server:
+        """Start serving on a TCP port. Use port 0 to pick a free port."""
+        return await asyncio.start_server(self.handle_connection, host, port, limit=2**20)
+
+    async def serve_unix(self, path: str | Path) -> asyncio.Server:
+        """Start serving on a Unix domain socket."""
+        return await asyncio.start_unix_server(self.handle_connection, path, limit=2**20)
+
+
+async def serve(  # noqa: PLR0913
+    *,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    socket: str | None = None,
+    batch_window: float = DEFAULT_BATCH_WINDOW,
+    max_batch: int = DEFAULT_MAX_BATCH,
+    threads: int = 1,
+) -> None:
+    """Run the scoring service until cancelled.
+
+    Args:
+        host (str, optional): The host to listen on. Defaults to localhost.
+        port (int, optional): The TCP port to listen on. Defaults to 8765.
+        socket (str, optional): Listen on this Unix socket instead of TCP.
+        batch_window (float, optional): Seconds to collect a batch for.
+        max_batch (int, optional): The maximum amount of requests in a batch.
+        threads (int, optional): Executor threads evaluating batches. Defaults to 1.
+    """
+    executor = ThreadPoolExecutor(max_workers=threads)
+    scorer = ScoringServer(
+        batch_window=batch_window,
+        max_batch=max_batch,
+        concurrency=threads,
+        executor=executor,
+    )
+    try:
+        async with scorer:
+            server = (
+                await scorer.serve_unix(socket)
+                if socket
+                else await scorer.serve_tcp(host, port)
+            )
+            async with server:
+                await server.serve_forever()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
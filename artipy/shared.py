@@ -0,0 +1,318 @@
+"""Zero-copy transfer of simulated batches through shared memory.
+
+Returning artifacts, or even arrays, from worker processes pickles them and copies
+them into the parent, which can cost more than generating them. A
+:class:`SharedBatch` instead lays out the columns of an
+:class:`artipy.batch.ArtifactBatch` and of a set of batch metrics back to back in a
+single :class:`multiprocessing.shared_memory.SharedMemory` segment. Workers attach
+to the segment by name and write the rows of their chunk in place, and the parent
+reads every column as a NumPy view of the segment without copying.
+
+The process that creates a segment owns it and unlinks it when the batch is closed.
+Workers only attach and detach.
+"""
+
+from __future__ import annotations
+
+import contextlib
+from dataclasses import dataclass, fields
+from functools import partial
+from multiprocessing.shared_memory import SharedMemory
+from typing import TYPE_CHECKING, Self
+
+import numpy as np
+
+from artipy.analysis import METRICS
+from artipy.batch import ArtifactBatch
+from artipy.simulation import (
+    DEFAULT_CHUNK_SIZE,
+    SimulationSpec,
+    generate_chunk,
+    imap_bounded,
+    iter_chunks,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from concurrent.futures import Executor
+    from types import TracebackType
+
+    from artipy.simulation import Chunk
+
+__all__ = (
+    "ColumnLayout",
+    "SharedBatch",
+    "batch_layout",
+    "simulate_shared",
+)
+
+# Every column starts on a cache line, so workers writing neighbouring columns never
+# share one.
+_ALIGNMENT = 64
+
+
+@dataclass(frozen=True, slots=True)
+class ColumnLayout:
+    """Where a column lives in a shared segment.
+
+    Attributes:
+        name: The name of the column.
+        offset: The offset of its first byte.
+        dtype: The type of its values.
+        shape: Its shape, starting with the amount of rows.
+    """
+
+    name: str
+    offset: int
+    dtype: np.dtype
+    shape: tuple[int, ...]
+
+    @property
+    def nbytes(self) -> int:
+        """The size of the column in bytes."""
+        return int(np.prod(self.shape)) * self.dtype.itemsize
+
+
+def _metric_columns(
+    metrics: Sequence[str],
+) -> list[tuple[str, np.dtype, tuple[int, ...]]]:
+    if not metrics:
+        return []
+    # Workers only hold a batch, so every metric needs a kernel.
+    dtype = METRICS.calculate_batch(ArtifactBatch.from_artifacts([]), metrics).dtype
+    return [(f"metric:{name}", dtype[name].base, dtype[name].shape) for name in metrics]
+
+
+def batch_layout(n: int, metrics: Sequence[str] = ()) -> list[ColumnLayout]:
+    """The columnar layout of a batch and its metrics in a shared segment.
+
+    The columns of :class:`artipy.batch.ArtifactBatch` come first, in field order,
+    followed by a ``metric:<name>`` column for every metric.
+
+    Args:
+        n (int): The amount of rows.
+        metrics (Sequence[str], optional): Names of
+            :data:`artipy.analysis.METRICS` with a kernel. Defaults to none.
+
+    Raises:
+        ValueError: If a metric is unknown or has no kernel.
+
+    Returns:
+        list[ColumnLayout]: The layout of every column.
+    """
+    empty = ArtifactBatch.from_artifacts([])
+    columns = [
+        (
+            field.name,
+            getattr(empty, field.name).dtype,
+            getattr(empty, field.name).shape[1:],
+        )
+        for field in fields(ArtifactBatch)
+    ]
+    layout: list[ColumnLayout] = []
+    offset = 0
+    for name, dtype, inner in (*columns, *_metric_columns(metrics)):
+        column = ColumnLayout(name, offset, np.dtype(dtype), (n, *inner))
+        layout.append(column)
+        offset += -(-column.nbytes // _ALIGNMENT) * _ALIGNMENT
+    return layout
+
+
+class SharedBatch:
+    """A batch and its metric columns in a shared memory segment.
+
+    Create one with :meth:`create` in the parent and :meth:`attach` to it in
+    workers. Use it as a context manager, or call :meth:`close`, to release the
+    segment; the creator also unlinks it. Views into the segment must not be used
+    after it is closed.
+
+    Args:
+        segment (SharedMemory): The segment.
+        n (int): The amount of rows.
+        metrics (Sequence[str]): The metric columns.
+        owner (bool): Whether to unlink the segment when closing.
+    """
+
+    def __init__(
+        self,
+        segment: SharedMemory,
+        n: int,
+        metrics: Sequence[str],
+        *,
+        owner: bool,
+    ) -> None:
+        self.segment = segment
+        self.n = n
+        self.metric_names = tuple(metrics)
+        self._owner = owner
+        self._columns: dict[str, np.ndarray] | None = {
+            column.name: np.ndarray(
+                column.shape,
+                dtype=column.dtype,
+                buffer=segment.buf,
+                offset=column.offset,
+            )
+            for column in batch_layout(n, metrics)
+        }
+
+    @classmethod
+    def create(cls, n: int, metrics: Sequence[str] = ()) -> SharedBatch:
+        """Allocate a zeroed segment for a batch.
+
+        Args:
+            n (int): The amount of rows.
+            metrics (Sequence[str], optional): Names of
+                :data:`artipy.analysis.METRICS` with a kernel. Defaults to none.
+
+        Returns:
+            SharedBatch: The batch, owning its segment.
+        """
+        layout = batch_layout(n, metrics)
+        size = max(layout[-1].offset + layout[-1].nbytes, 1)
+        return cls(SharedMemory(create=True, size=size), n, metrics, owner=True)
+
+    @classmethod
+    def attach(cls, name: str, n: int, metrics: Sequence[str] = ()) -> SharedBatch:
+        """Attach to a segment created by another process.
+
+        Args:
+            name (str): The name of the segment.
+            n (int): The amount of rows it was created with.
+            metrics (Sequence[str], optional): The metrics it was created with.
+
+        Returns:
+            SharedBatch: The batch, not owning its segment.
+        """
+        # Only the creator may unlink the segment, so keep the resource tracker of
+        # this process out of it.
+        return cls(SharedMemory(name=name, track=False), n, metrics, owner=False)
+
+    @property
+    def name(self) -> str:
+        """The name other processes attach to."""
+        return self.segment.name
+
+    def _views(self) -> dict[str, np.ndarray]:
+        if self._columns is None:
+            msg = "The shared batch is closed"
+            raise ValueError(msg)
+        return self._columns
+
+    @property
+    def batch(self) -> ArtifactBatch:
+        """The artifact columns as views of the segment."""
+        columns = self._views()
+        return ArtifactBatch(**{f.name: columns[f.name] for f in fields(ArtifactBatch)})
+
+    @property
+    def metrics(self) -> dict[str, np.ndarray]:
+        """The metric columns as views of the segment."""
+        columns = self._views()
+        return {name: columns[f"metric:{name}"] for name in self.metric_names}
+
+    def write(self, start: int, batch: ArtifactBatch) -> None:
+        """Write a batch and compute its metrics into the rows from ``start``.
+
+        Args:
+            start (int): The first row to write.
+            batch (artipy.batch.ArtifactBatch): The artifacts.
+        """
+        columns = self._views()
+        rows = slice(start, start + len(batch))
+        for field in fields(ArtifactBatch):
+            columns[field.name][rows] = getattr(batch, field.name)
+        if self.metric_names:
+            results = METRICS.calculate_batch(batch, self.metric_names)
+            for name in self.metric_names:
+                columns[f"metric:{name}"][rows] = results[name]
+
+    def close(self) -> None:
+        """Detach from the segment, and unlink it if this batch created it."""
+        if self._columns is None:
+            return
+        self._columns = None
+        if self._owner:
+            self.segment.unlink()
+        # Views still held elsewhere keep the mapping alive until they are
+        # collected.
+        with contextlib.suppress(BufferError):
+            self.segment.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+def _generate_shared(  # noqa: PLR0913
+    chunk: Chunk,
+    *,
+    spec: SimulationSpec,
+    name: str,
+    n: int,
+    metrics: Sequence[str],
+    chunk_size: int,
+) -> int:
+    batch = ArtifactBatch.from_artifacts(generate_chunk(chunk, spec))
+    with SharedBatch.attach(name, n, metrics) as shared:
+        shared.write(chunk.chunk_id * chunk_size, batch)
+    return len(batch)
+
+
+def simulate_shared(  # noqa: PLR0913
+    n: int,
+    spec: SimulationSpec | None = None,
+    metrics: Sequence[str] = ("roll_value", "crit_value"),
+    *,
+    seed: int,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    workers: int | None = None,
+    executor: Executor | None = None,
+) -> SharedBatch:
+    """Simulate a run in parallel, with every worker writing its chunk and metrics
+    straight into a shared segment.
+
+    Only the amount of rows written travels back from the workers. The rows are in
+    chunk order and equal to the artifacts of :func:`artipy.simulation.generate_chunk`.
+
+    Args:
+        n (int): The total amount of artifacts.
+        spec (SimulationSpec, optional): What to generate. Defaults to random
+            artifacts at their maximum level.
+        metrics (Sequence[str], optional): Names of
+            :data:`artipy.analysis.METRICS` with a kernel. Defaults to the roll
+            value and crit value.
+        seed (int): The seed of the run.
+        chunk_size (int, optional): The maximum size of a chunk. Defaults to
+            DEFAULT_CHUNK_SIZE.
+        workers (int, optional): The amount of worker processes, see
+            :func:`artipy.simulation.imap_bounded`.
+        executor (Executor, optional): Run on this executor instead of creating a
+            process pool.
+
+    Returns:
+        SharedBatch: The batch, owning its segment. Close it when done.
+    """
+    shared = SharedBatch.create(n, metrics)
+    produce = partial(
+        _generate_shared,
+        spec=spec or SimulationSpec(),
+        name=shared.name,
+        n=n,
+        metrics=tuple(metrics),
+        chunk_size=chunk_size,
+    )
+    try:
+        chunks = iter_chunks(n, seed, chunk_size)
+        for _ in imap_bounded(produce, chunks, workers=workers, executor=executor):
+            pass
+    except BaseException:
+        shared.close()
+        raise
+    return shared
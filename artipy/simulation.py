@@ -0,0 +1,315 @@
+"""Chunked, reproducible and parallel simulation of artifact populations.
+
+A simulation of ``n`` artifacts is split into fixed-size chunks. Every chunk draws from
+its own random stream derived from the run seed and the chunk id, so the result of a
+run only depends on its seed and chunk size, never on how many workers computed it,
+whether they were processes or threads, or in which order the chunks finished.
+"""
+
+from __future__ import annotations
+
+import os
+from collections import Counter, deque
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import TYPE_CHECKING, Any, Literal
+
+import numpy as np
+
+from artipy.analysis import ARTIFACT_ATTRIBUTES, METRICS, ROUND_TO, create_random_artifact
+from artipy.distributions import sampled_counts
+from artipy.records import Row, artifact_from_row, artifact_to_row, parse_stat
+from artipy.types import ArtifactSlot, StatType
+from artipy.utils import rng, seed_rng
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator, Sequence
+
+    from artipy.artifacts import Artifact
+
+__all__ = (
+    "DEFAULT_CHUNK_SIZE",
+    "Backend",
+    "Chunk",
+    "Job",
+    "SimulationSpec",
+    "chunk_seed",
+    "generate_chunk",
+    "imap_bounded",
+    "iter_chunks",
+    "run_chunk",
+    "score_rows",
+    "simulate_rows",
+)
+
+DEFAULT_CHUNK_SIZE = 10_000
+
+type Backend = Literal["process", "thread"]
+type Counts = dict[str, Counter[Decimal]]
+
+
+def chunk_seed(seed: int, chunk_id: int) -> int:
+    """Derive the seed of a chunk from the seed of the run.
+
+    Args:
+        seed (int): The seed of the run.
+        chunk_id (int): The id of the chunk.
+
+    Returns:
+        int: A 64-bit seed that is statistically independent for every chunk.
+    """
+    sequence = np.random.SeedSequence(seed, spawn_key=(chunk_id,))
+    return int(sequence.generate_state(1, np.uint64)[0])
+
+
+@dataclass(frozen=True, slots=True)
+class Chunk:
+    """A unit of simulation work."""
+
+    chunk_id: int
+    size: int
+    seed: int
+
+
+def iter_chunks(
+    n: int,
+    seed: int,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[Chunk]:
+    """Split a run of ``n`` samples into chunks.
+
+    Args:
+        n (int): The total amount of samples.
+        seed (int): The seed of the run.
+        chunk_size (int, optional): The maximum size of a chunk. Defaults to
+            DEFAULT_CHUNK_SIZE.
+
+    Raises:
+        ValueError: If ``n`` is negative or ``chunk_size`` is not positive.
+
+    Yields:
+        Chunk: The chunks of the run in order.
+    """
+    if n < 0 or chunk_size < 1:
+        msg = f"Invalid run of {n} samples in chunks of {chunk_size}"
+        raise ValueError(msg)
+    for chunk_id, start in enumerate(range(0, n, chunk_size)):
+        yield Chunk(chunk_id, min(chunk_size, n - start), chunk_seed(seed, chunk_id))
+
+
+@dataclass(frozen=True, slots=True)
+class SimulationSpec:
+    """What to generate in a simulation.
+
+    Attributes:
+        slot: The slot of every artifact. Random uniform slot if not given.
+        mainstat: The mainstat of every artifact. Weighted random if not given.
+        rarity: The rarity of every artifact.
+        level: The level to upgrade every artifact to. Max level if not given.
+    """
+
+    slot: ArtifactSlot | None = None
+    mainstat: StatType | None = None
+    rarity: int = 5
+    level: int | None = None
+
+    def __post_init__(self) -> None:
+        if self.mainstat is not None and self.slot is None:
+            msg = "A slot is required when fixing the mainstat"
+            raise ValueError(msg)
+
+
+def generate_chunk(chunk: Chunk, spec: SimulationSpec) -> list[Artifact]:
+    """Generate the artifacts of a chunk.
+
+    This reseeds the random generator of the current thread, see
+    :func:`artipy.utils.rng`, which is what every generation function in the package
+    draws from. Chunks can therefore be generated by several threads at once.
+    Substats stay in the order they were drawn, which is what
+    :mod:`artipy.reweighting` relies on.
+
+    Args:
+        chunk (Chunk): The chunk to generate.
+        spec (SimulationSpec): What to generate.
+
+    Returns:
+        list[artipy.artifacts.Artifact]: The artifacts of the chunk.
+    """
+    seed_rng(chunk.seed)
+    slots = tuple(ArtifactSlot)
+    artifacts: list[Artifact] = []
+    for _ in range(chunk.size):
+        slot = spec.slot or rng().choice(slots)
+        artifact = create_random_artifact(slot, spec.rarity, mainstat=spec.mainstat)
+        target = artifact.max_level if spec.level is None else spec.level
+        while artifact.level < min(target, artifact.max_level):
+            artifact.upgrade()
+        artifacts.append(artifact)
+    return artifacts
+
+
+@dataclass(frozen=True, slots=True)
+class Job:
+    """What every worker computes for its chunks.
+
+    Attributes:
+        spec: What to generate.
+        metrics: The names of the metrics to histogram.
+        resolution: The grid the metrics are rounded to.
+    """
+
+    spec: SimulationSpec
+    metrics: tuple[str, ...]
+    resolution: Decimal = ROUND_TO
+
+    def __post_init__(self) -> None:
+        for metric in self.metrics:
+            if metric not in ARTIFACT_ATTRIBUTES:
+                msg = f"Invalid metric: {metric}"
+                raise ValueError(msg)
+
+    def to_json(self) -> dict[str, Any]:
+        """The job as a JSON object."""
+        spec = self.spec
+        return {
+            "slot": spec.slot and spec.slot.value,
+            "mainstat": spec.mainstat and spec.mainstat.name,
+            "rarity": spec.rarity,
+            "level": spec.level,
+            "metrics": list(self.metrics),
+            "resolution": str(self.resolution),
+        }
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> Job:
+        """Parse a job written with :meth:`to_json`."""
+        spec = SimulationSpec(
+            slot=ArtifactSlot(data["slot"]) if data["slot"] else None,
+            mainstat=parse_stat(data["mainstat"]) if data["mainstat"] else None,
+            rarity=data["rarity"],
+            level=data["level"],
+        )
+        return cls(spec, tuple(data["metrics"]), Decimal(data["resolution"]))
+
+
+def run_chunk(chunk: Chunk, job: Job) -> Counts:
+    """Generate a chunk and histogram its metrics.
+
+    Args:
+        chunk (Chunk): The chunk to generate.
+        job (Job): What to compute.
+
+    Returns:
+        Counts: The histogram of each metric.
+    """
+    artifacts = generate_chunk(chunk, job.spec)
+    return {
+        metric: sampled_counts(
+            (ARTIFACT_ATTRIBUTES[metric](a) for a in artifacts),
+            job.resolution,
+        )
+        for metric in job.metrics
+    }
+
+
+def _with_metrics(artifacts: Sequence[Artifact], metrics: Sequence[str]) -> list[Row]:
+    rows = [artifact_to_row(a) for a in artifacts]
+    if metrics:
+        values = METRICS.calculate_batch(artifacts, metrics)
+        for row, record in zip(rows, values.tolist(), strict=True):
+            row.update(zip(metrics, record, strict=True))
+    return rows
+
+
+def simulate_rows(
+    chunk: Chunk,
+    spec: SimulationSpec,
+    metrics: Sequence[str],
+) -> list[Row]:
+    """Generate a chunk and flatten it into rows with the requested metrics.
+
+    Args:
+        chunk (Chunk): The chunk to generate.
+        spec (SimulationSpec): What to generate.
+        metrics (Sequence[str]): Names of the metrics to add to every row.
+
+    Returns:
+        list[Row]: The rows of the chunk.
+    """
+    return _with_metrics(generate_chunk(chunk, spec), metrics)
+
+
+def score_rows(rows: Sequence[Row], metrics: Sequence[str]) -> list[Row]:
+    """Score rows read from an inventory.
+
+    Args:
+        rows (Sequence[Row]): The rows to score.
+        metrics (Sequence[str]): Names of the metrics to add to every row.
+
+    Returns:
+        list[Row]: The normalised rows with the metrics added.
+    """
+    return _with_metrics([artifact_from_row(row) for row in rows], metrics)
+
+
+def imap_bounded[T, R](  # noqa: PLR0913
+    fn: Callable[[T], R],
+    items: Iterable[T],
+    *,
+    workers: int | None = None,
+    executor: Executor | None = None,
+    window: int | None = None,
+    backend: Backend = "process",
+) -> Iterator[R]:
+    """Lazily map a function over items in parallel, yielding results in order.
+
+    At most ``window`` items are in flight at any time, so memory use stays constant
+    no matter how many items there are or how slowly the results are consumed.
+
+    Args:
+        fn (Callable[[T], R]): The function to apply. Must be picklable when run in a
+            process pool.
+        items (Iterable[T]): The items to map over.
+        workers (int, optional): The amount of workers. ``1`` maps in the current
+            thread. Defaults to the amount of CPUs.
+        executor (Executor, optional): Run on this executor instead of creating a
+            process pool. It is not shut down afterwards.
+        window (int, optional): The maximum amount of items in flight. Defaults to
+            twice the amount of workers.
+        backend (Backend, optional): Whether the created pool runs ``process`` or
+            ``thread`` workers. Threads skip spawning and pickling, and scale on
+            free-threaded builds of Python. Defaults to ``process``.
+
+    Yields:
+        R: The results in the order of the items.
+    """
+    workers = workers or os.cpu_count() or 1
+    if executor is None and workers == 1:
+        yield from map(fn, items)
+        return
+
+    window = window or 2 * workers
+    pool = executor or (
+        ThreadPoolExecutor(max_workers=workers)
+        if backend == "thread"
+        else ProcessPoolExecutor(max_workers=workers)
+    )
+    pending: deque[Future[R]] = deque()
+    try:
+        for item in items:
+            pending.append(pool.submit(fn, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+        if executor is None:
+            pool.shutdown(cancel_futures=True)
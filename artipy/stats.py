@@ -2,13 +2,12 @@
 
 from __future__ import annotations
 
-import random
 from dataclasses import dataclass, field
 from decimal import Decimal
 
 from artipy.types import STAT_NAMES, VALID_SUBSTATS, StatType
 
-from .utils import possible_mainstat_values, possible_substat_values
+from .utils import possible_mainstat_values, possible_substat_values, rng
 
 __all__ = (
     "MainStat",
@@ -71,7 +70,7 @@ class SubStat(Stat):
         This is used when initially creating the substat and when upgrading it.
         """
         values = possible_substat_values(self.name, self.rarity)
-        return random.choice(values)
+        return rng().choice(values)
 
     def upgrade(self) -> None:
         self.value += self.roll()
@@ -96,7 +95,7 @@ def create_substat(
         SubStat: The substat object.
     """
     if name is None:
-        name = StatType(random.choice(VALID_SUBSTATS))
+        name = StatType(rng().choice(VALID_SUBSTATS))
     stat = SubStat(name, Decimal(0), rarity)
     stat.value = stat.roll()
     return stat
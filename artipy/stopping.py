@@ -0,0 +1,335 @@
+"""Optimal stopping policies for leveling artifacts.
+
+Every four levels an artifact either gains a new substat or upgrades a uniformly
+random one by a uniformly random value tier, as in
+:func:`artipy.artifacts.upgrade_artifact_new_stat` and
+:func:`artipy.artifacts.upgrade_artifact_upgrade_stat`. Before each of these upgrades
+a player either keeps leveling or trashes the artifact. The policy that maximises
+the long-run metric of the artifacts that reach the maximum level per EXP spent is
+found with Dinkelbach's method. For a rate ``λ`` a backward dynamic program
+maximises the expected final metric minus ``λ`` times the EXP spent. The rate of
+the resulting policy becomes the next ``λ``, until the rate stops improving.
+
+For an additive metric the future of an artifact only depends on its level, its
+current metric value and the contribution of each of its substats. The value of
+continuing grows with the current metric, so a policy is a table of the smallest
+metric worth leveling at each level and kind of substats.
+
+Every new artifact costs a fixed amount of EXP on top of the EXP spent leveling it,
+by default the EXP it would have yielded as fodder. Without that cost, inspecting
+artifacts would be free and the best policy would trash everything but the best
+possible drop. Trashed artifacts do not return the EXP invested in them.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import cache
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from artipy import UPGRADE_STEP
+from artipy.analysis import FOUR_SUBSTAT_CHANCE, ROUND_TO
+from artipy.artifacts import substat_weights
+from artipy.distributions import roll_contributions, substat_set_probabilities
+from artipy.leveling import FODDER_BASE_EXP, exp_to_level, max_level
+from artipy.types import VALID_MAINSTATS
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+    from decimal import Decimal
+
+    from artipy.analysis import ArtifactMethod
+    from artipy.artifacts import Artifact
+    from artipy.types import ArtifactSlot, StatType
+
+__all__ = ("StoppingPolicy", "solve_policy")
+
+# A fully rolled artifact is keyed by the sorted contributions of its substats, so
+# substats that contribute the same share a state. Artifacts still missing substats
+# are keyed by the substats themselves, since those decide what can still be drawn.
+type StateKey = tuple[tuple[int, ...], ...] | frozenset[StatType]
+
+_MAX_ITERATIONS = 100
+
+
+@dataclass(frozen=True, slots=True)
+class StoppingPolicy:
+    """The optimal policy for leveling artifacts of a slot and mainstat.
+
+    Attributes:
+        rate: The expected final metric per EXP under the policy.
+        expected_metric: The expected final metric of a new artifact, counting
+            trashed artifacts as 0.
+        expected_exp: The expected EXP spent on a new artifact, including the cost
+            of the artifact itself.
+        thresholds: The smallest metric, on the grid of ``resolution``, at which an
+            artifact of each level and state is worth leveling further.
+        metric: The metric the policy maximises.
+        units: The contribution of every roll of each substat, in ``resolution``.
+        rarity: The rarity of the artifacts.
+        resolution: The grid the metric is evaluated on.
+    """
+
+    rate: float
+    expected_metric: float
+    expected_exp: float
+    thresholds: Mapping[tuple[int, StateKey], int]
+    metric: ArtifactMethod[Decimal]
+    units: Mapping[StatType, tuple[int, ...]]
+    rarity: int
+    resolution: Decimal
+
+    def state(self, artifact: Artifact) -> StateKey:
+        """The state of an artifact in the threshold table.
+
+        Args:
+            artifact (artipy.artifacts.Artifact): The artifact.
+
+        Returns:
+            StateKey: The key of its substats.
+        """
+        names = frozenset(s.name for s in artifact.substats)
+        if len(names) < self.rarity - 1:
+            return names
+        return tuple(sorted(self.units[name] for name in names))
+
+    def should_level(self, artifact: Artifact) -> bool:
+        """Whether to level an artifact to its next upgrade.
+
+        Args:
+            artifact (artipy.artifacts.Artifact): An artifact of the policy's slot
+                and mainstat, at a multiple of four levels.
+
+        Raises:
+            ValueError: If the artifact is not at a multiple of four levels.
+
+        Returns:
+            bool: True to keep leveling, False to trash it. Always False at the
+            maximum level.
+        """
+        if artifact.level % UPGRADE_STEP:
+            msg = f"Decisions are only made every {UPGRADE_STEP} levels"
+            raise ValueError(msg)
+        if artifact.level >= max_level(self.rarity):
+            return False
+        value = int((self.metric(artifact) / self.resolution).to_integral_value())
+        threshold = self.thresholds.get(
+            (artifact.level, self.state(artifact)),
+            np.iinfo(np.int64).max,
+        )
+        return value >= threshold
+
+
+class _Solver:
+    def __init__(
+        self,
+        metric: ArtifactMethod[Decimal],
+        mainstat: StatType,
+        rarity: int,
+        resolution: Decimal,
+    ) -> None:
+        self.mainstat = mainstat
+        self.rarity = rarity
+        self.max_substats = rarity - 1
+        self.final = max_level(rarity)
+        self.units: dict[StatType, tuple[int, ...]] = {}
+        for stat in substat_weights:
+            contributions = roll_contributions(metric, stat, rarity)
+            if any(c < 0 for c in contributions):
+                msg = f"Metric has negative contributions for '{stat.name}'"
+                raise ValueError(msg)
+            self.units[stat] = tuple(
+                int((c / resolution).to_integral_value()) for c in contributions
+            )
+        events = self.max_substats + self.final // UPGRADE_STEP
+        self.widest = max(max(u) for u in self.units.values())
+        self.size = self.widest * events + 1
+        self.resolution = float(resolution)
+        self.costs = {
+            level: exp_to_level(rarity, level, level + UPGRADE_STEP)
+            for level in range(0, self.final, UPGRADE_STEP)
+        }
+        # The distribution of the metric of new artifacts, by their initial state.
+        self.initial: list[tuple[float, StateKey, frozenset[StatType], np.ndarray]] = []
+        for count, p_count in self.initial_counts().items():
+            for stats, p_stats in substat_set_probabilities(mainstat, count).items():
+                pmf = np.zeros(self.size)
+                pmf[0] = 1.0
+                for stat in stats:
+                    pmf = self.shift_forward(pmf, stat)
+                self.initial.append((p_count * p_stats, self.key(stats), stats, pmf))
+
+    def key(self, stats: frozenset[StatType]) -> StateKey:
+        if len(stats) < self.max_substats:
+            return stats
+        return tuple(sorted(self.units[s] for s in stats))
+
+    def increments(self, stats: tuple[StatType, ...]) -> dict[int, float]:
+        """The distribution of the units a roll into a uniform substat adds."""
+        result: defaultdict[int, float] = defaultdict(float)
+        for stat in stats:
+            for unit in self.units[stat]:
+                result[unit] += 1 / len(stats) / len(self.units[stat])
+        return result
+
+    def transitions(
+        self,
+        state: StateKey,
+        members: frozenset[StatType] | None,
+    ) -> list[tuple[StateKey, frozenset[StatType] | None, float, dict[int, float]]]:
+        """The next states of an upgrade with their probability and the units it
+        adds."""
+        if isinstance(state, frozenset):
+            pool = {
+                s: w
+                for s, w in substat_weights.items()
+                if s not in state and s != self.mainstat
+            }
+            total = sum(pool.values())
+            return [
+                (
+                    self.key(state | {stat}),
+                    state | {stat},
+                    weight / total,
+                    self.increments((stat,)),
+                )
+                for stat, weight in pool.items()
+            ]
+        # Every substat of a full artifact is upgraded with the same probability, so
+        # only the contributions of its substats matter.
+        unit_increments: defaultdict[int, float] = defaultdict(float)
+        for units in state:
+            for unit in units:
+                unit_increments[unit] += 1 / len(state) / len(units)
+        return [(state, members, 1.0, unit_increments)]
+
+    def shift(self, values: np.ndarray, increments: Mapping[int, float]) -> np.ndarray:
+        padded = np.concatenate((values, np.full(self.widest, values[-1])))
+        result = np.zeros(self.size)
+        for unit, probability in increments.items():
+            result += probability * padded[unit : unit + self.size]
+        return result
+
+    def solve(
+        self,
+        rate: float,
+    ) -> tuple[dict[tuple[int, StateKey], int], float, float]:
+        thresholds: dict[tuple[int, StateKey], int] = {}
+        memo: dict[tuple[int, StateKey], tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        metric = np.arange(self.size) * self.resolution
+
+        def value(
+            level: int,
+            state: StateKey,
+            members: frozenset[StatType] | None,
+        ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+            # The objective, final metric and EXP spent from each current metric.
+            if level >= self.final:
+                return metric, metric, np.zeros(self.size)
+            if (level, state) in memo:
+                return memo[level, state]
+            keep = np.full(self.size, -rate * self.costs[level], dtype=np.float64)
+            reward = np.zeros(self.size)
+            spent = np.full(self.size, float(self.costs[level]))
+            for key, new_members, probability, increments in self.transitions(
+                state,
+                members,
+            ):
+                objective, final, exp = value(level + UPGRADE_STEP, key, new_members)
+                keep += probability * self.shift(objective, increments)
+                reward += probability * self.shift(final, increments)
+                spent += probability * self.shift(exp, increments)
+            go = keep > 0
+            thresholds[level, state] = int(go.argmax()) if go.any() else self.size
+            memo[level, state] = (
+                np.where(go, keep, 0.0),
+                np.where(go, reward, 0.0),
+                np.where(go, spent, 0.0),
+            )
+            return memo[level, state]
+
+        expected_reward = expected_exp = 0.0
+        for probability, key, stats, pmf in self.initial:
+            _, final, exp = value(0, key, stats)
+            expected_reward += probability * float(pmf @ final)
+            expected_exp += probability * float(pmf @ exp)
+        return thresholds, expected_reward, expected_exp
+
+    def shift_forward(self, pmf: np.ndarray, stat: StatType) -> np.ndarray:
+        result = np.zeros(self.size)
+        for unit in self.units[stat]:
+            result[unit:] += pmf[: self.size - unit] / len(self.units[stat])
+        return result
+
+    def initial_counts(self) -> dict[int, float]:
+        counts: defaultdict[int, float] = defaultdict(float)
+        counts[self.max_substats] += FOUR_SUBSTAT_CHANCE
+        counts[max(0, self.max_substats - 1)] += 1 - FOUR_SUBSTAT_CHANCE
+        return counts
+
+
+@cache
+def solve_policy(  # noqa: PLR0913
+    metric: ArtifactMethod[Decimal],
+    slot: ArtifactSlot,
+    mainstat: StatType,
+    *,
+    rarity: int = 5,
+    resolution: Decimal = ROUND_TO,
+    artifact_cost: int | None = None,
+    tolerance: float = 1e-9,
+) -> StoppingPolicy:
+    """The leveling policy that maximises the final metric per EXP spent.
+
+    Policies are cached, so evaluating live artifacts afterwards is a table lookup
+    with :meth:`StoppingPolicy.should_level`.
+
+    Args:
+        metric (ArtifactMethod[Decimal]): An additive metric, e.g.
+            :func:`artipy.analysis.calculate_artifact_crit_value`.
+        slot (artipy.types.ArtifactSlot): The slot of the artifacts.
+        mainstat (artipy.types.StatType): The mainstat of the artifacts.
+        rarity (int, optional): The rarity of the artifacts. Defaults to 5.
+        resolution (Decimal, optional): The grid the metric is evaluated on.
+            Defaults to ROUND_TO.
+        artifact_cost (int, optional): The EXP a new artifact costs. Defaults to
+            the EXP it yields as fodder, see :data:`artipy.leveling.FODDER_BASE_EXP`.
+        tolerance (float, optional): The relative change of the rate at which the
+            iteration stops. Defaults to 1e-9.
+
+    Raises:
+        ValueError: If the mainstat is invalid for the slot or the metric has
+            negative contributions.
+
+    Returns:
+        StoppingPolicy: The policy.
+    """
+    if mainstat not in VALID_MAINSTATS[slot]:
+        msg = f"Invalid mainstat '{mainstat.name}' for slot '{slot}'"
+        raise ValueError(msg)
+    solver = _Solver(metric, mainstat, rarity, resolution)
+    if artifact_cost is None:
+        artifact_cost = FODDER_BASE_EXP[rarity]
+    rate = 0.0
+    for _ in range(_MAX_ITERATIONS):
+        thresholds, reward, exp = solver.solve(rate)
+        # The cost of the artifact itself is spent whatever the policy.
+        exp += artifact_cost
+        new_rate = reward / exp
+        if abs(new_rate - rate) <= tolerance * max(new_rate, 1e-300):
+            rate = new_rate
+            break
+        rate = new_rate
+    return StoppingPolicy(
+        rate=rate,
+        expected_metric=reward,
+        expected_exp=exp,
+        thresholds=thresholds,
+        metric=metric,
+        units=solver.units,
+        rarity=rarity,
+        resolution=resolution,
+    )
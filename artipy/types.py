@@ -117,9 +117,9 @@ def make_artifact_sets() -> Iterator[ArtifactSetData]:
         yield ArtifactSetData(**{camel_to_snake_case(k): v for k, v in data.items()})
 
 
-VALID_ARTIFACT_SETS: dict[ArtifactSet, ArtifactSetData] = {
-    ArtifactSet(key): value for value in make_artifact_sets() for key in ArtifactSet
-}
+VALID_ARTIFACT_SETS: dict[ArtifactSet, ArtifactSetData] = dict(
+    zip(ArtifactSet, make_artifact_sets(), strict=True),
+)
 
 
 class RollMagnitude(StrEnum):
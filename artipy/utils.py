@@ -1,11 +1,14 @@
 """Utility functions for the package."""
 
 import random
+import threading
 from decimal import Decimal
 from functools import lru_cache
 from operator import attrgetter
 from typing import NamedTuple, cast
 
+import numpy as np
+
 from artipy.data_gen import DataGen
 from artipy.types import StatType
 
@@ -14,19 +17,150 @@ type Seq[T] = tuple[T, ...] | list[T]
 MAINSTAT_DATA = DataGen("ReliquaryLevelExcelConfigData.json")
 SUBSTAT_DATA = DataGen("ReliquaryAffixExcelConfigData.json")
 
+# The instance behind the functions of the random module.
+_GLOBAL_RANDOM = cast("random.Random", random.random.__self__)
+_thread_state = threading.local()
+
+
+def rng() -> random.Random:
+    """The random number generator of the current thread, which every random draw
+    of the package goes through.
+
+    The main thread draws from the global state of the :mod:`random` module, so
+    ``random.seed`` keeps seeding it. Every other thread gets its own generator,
+    seeded from the operating system, so threads never share random state.
+
+    Returns:
+        random.Random: The generator.
+    """
+    try:
+        return _thread_state.rng
+    except AttributeError:
+        is_main = threading.current_thread() is threading.main_thread()
+        _thread_state.rng = _GLOBAL_RANDOM if is_main else random.Random()
+        return _thread_state.rng
+
+
+def seed_rng(seed: int) -> None:
+    """Seed the random number generator of the current thread.
+
+    Args:
+        seed (int): The seed.
+    """
+    rng().seed(seed)
+
+
+class AliasSampler[T]:
+    """Draw weighted elements of a population in constant time with Walker's alias
+    method.
+
+    Every element owns a column of equal height. Each column is split between its
+    own element and at most one alias, so a draw is a uniform column and a uniform
+    height within it.
+
+    Args:
+        population (Seq[T]): The population to choose from.
+        weights (Seq[float]): The weights of the population.
+
+    Raises:
+        ValueError: If the population is empty, the lengths differ or the weights
+            are not positive.
+    """
+
+    __slots__ = ("_alias", "_alias_array", "_threshold", "_threshold_array", "population")
+
+    def __init__(self, population: Seq[T], weights: Seq[float]) -> None:
+        if not population or len(population) != len(weights):
+            msg = "Population and weights must be non-empty and of equal length"
+            raise ValueError(msg)
+        if any(w < 0 for w in weights) or not sum(weights) > 0:
+            msg = f"Invalid weights: {weights}"
+            raise ValueError(msg)
+
+        n = len(weights)
+        total = sum(weights)
+        scaled = [w * n / total for w in weights]
+        threshold = [1.0] * n
+        alias = list(range(n))
+        small = [i for i, s in enumerate(scaled) if s < 1]
+        large = [i for i, s in enumerate(scaled) if s >= 1]
+        while small and large:
+            short, tall = small.pop(), large[-1]
+            threshold[short], alias[short] = scaled[short], tall
+            scaled[tall] -= 1 - scaled[short]
+            if scaled[tall] < 1:
+                small.append(large.pop())
+
+        self.population = tuple(population)
+        self._threshold = tuple(threshold)
+        self._alias = tuple(alias)
+        self._threshold_array = np.array(threshold)
+        self._alias_array = np.array(alias, dtype=np.intp)
+
+    def __len__(self) -> int:
+        return len(self.population)
+
+    def draw(self) -> T:
+        """Draw a single element with the generator of the current thread.
+
+        Returns:
+            T: The chosen element.
+        """
+        column = rng().random() * len(self._threshold)
+        index = int(column)
+        if column - index >= self._threshold[index]:
+            index = self._alias[index]
+        return self.population[index]
+
+    def draw_indices(self, n: int, rng: np.random.Generator) -> np.ndarray:
+        """Draw the indices of many elements at once.
+
+        Args:
+            n (int): The amount of draws.
+            rng (np.random.Generator): The random number generator.
+
+        Returns:
+            np.ndarray: The index of each drawn element in the population.
+        """
+        column = rng.random(n) * len(self._threshold)
+        index = column.astype(np.intp)
+        return np.where(
+            column - index < self._threshold_array[index],
+            index,
+            self._alias_array[index],
+        )
+
+
+@lru_cache(maxsize=256)
+def weighted_sampler[T](
+    population: tuple[T, ...],
+    weights: tuple[float, ...],
+) -> AliasSampler[T]:
+    """The sampler of a population, built once and reused for every later draw.
+
+    Args:
+        population (tuple[T, ...]): The population to choose from.
+        weights (tuple[float, ...]): The weights of the population.
+
+    Returns:
+        AliasSampler[T]: The sampler.
+    """
+    return AliasSampler(population, weights)
+
 
-def choose[T](population: Seq[T], weights: tuple[float]) -> T:
+def choose[T](population: Seq[T], weights: Seq[float]) -> T:
     """Helper function to choose a random element from a population with weights.
-    This skips having to do slicing of the result of random.choices.
+    The sampler of every distinct population and weights is cached, so repeated
+    draws take constant time.
 
     Args:
         population (Seq[T]): The population to choose from.
-        weights (tuple[float]): The weights of the population.
+        weights (Seq[float]): The weights of the population.
 
     Returns:
         T: The chosen element.
     """
-    return random.choices(population, weights)[0]
+    return weighted_sampler(tuple(population), tuple(weights)).draw()
 
 
 class StatData(NamedTuple):
@@ -42,16 +176,16 @@ class StatContainer(NamedTuple):
 
 
 @lru_cache(maxsize=1024)
-def possible_mainstat_values(stat: StatType, rarity: int) -> list[Decimal]:
+def possible_mainstat_values(stat: StatType, rarity: int) -> tuple[Decimal, ...]:
     """Get the possible values for a mainstat based on the stat type and rarity.
-    Map the values to Decimal.
+    Map the values to Decimal. The result is cached and shared, so it is immutable.
 
     Args:
         stat (StatType): The stat type to get the values for.
         rarity (int): The rarity of the artifact.
 
     Returns:
-        list[Decimal]: The possible values for the mainstat.
+        tuple[Decimal, ...]: The possible values for the mainstat.
     """
     mainstat_data = MAINSTAT_DATA.as_list()
     values = cast("list[StatContainer]", mainstat_data[1:])
@@ -62,20 +196,20 @@ def possible_mainstat_values(stat: StatType, rarity: int) -> list[Decimal]:
         for j in i.add_props
         if j.prop_type == stat
     ]
-    return sorted(Decimal(str(x)) for x in data)
+    return tuple(sorted(Decimal(str(x)) for x in data))
 
 
 @lru_cache(maxsize=1024)
-def possible_substat_values(stat: StatType, rarity: int) -> list[Decimal]:
+def possible_substat_values(stat: StatType, rarity: int) -> tuple[Decimal, ...]:
     """Get the possible values for a substat based on the stat type and rarity.
-    Map the values to Decimal.
+    Map the values to Decimal. The result is cached and shared, so it is immutable.
 
     Args:
         stat (StatType): The stat type to get the values for.
         rarity (int): The rarity of the artifact.
 
     Returns:
-        list[Decimal]: The possible values for the substat.
+        tuple[Decimal, ...]: The possible values for the substat.
     """
     substat_data = cast("list[StatData]", SUBSTAT_DATA.as_list())
     data = [
@@ -84,4 +218,4 @@ def possible_substat_values(stat: StatType, rarity: int) -> list[Decimal]:
         if d.depot_id == int(f"{rarity}01") and d.prop_type == stat
     ]
     sorted_data = sorted(data, key=attrgetter("prop_value"))
-    return sorted(Decimal(str(x.prop_value)) for x in sorted_data)
+    return tuple(sorted(Decimal(str(x.prop_value)) for x in sorted_data))
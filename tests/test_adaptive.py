@@ -0,0 +1,75 @@
+import pytest
+
+from artipy.adaptive import AdaptiveResult, simulate_adaptive
+from artipy.analysis import calculate_artifact_crit_value
+from artipy.distributions import exact_pmf, pmf_from_counts, pmf_mean, pmf_quantile
+from artipy.simulation import SimulationSpec
+from artipy.types import ArtifactSlot
+
+SPEC = SimulationSpec(slot=ArtifactSlot.CIRCLET)
+
+
+def test_stops_at_precision() -> None:
+    """This test verifies the run stops once the interval is narrow enough, that
+    the interval covers the exact mean, and that progress is reported per chunk"""
+    seen: list[AdaptiveResult] = []
+    result = simulate_adaptive(
+        spec=SPEC,
+        statistics=("mean", 0.9),
+        rel_tol=0.03,
+        seed=51,
+        chunk_size=500,
+        workers=1,
+        progress=seen.append,
+    )
+    assert result.stopped == "precision"
+    assert [r.samples for r in seen] == list(range(500, result.samples + 1, 500))
+    assert all(r.stopped is None for r in seen)
+    assert result.samples < 100_000
+
+    mean = result.estimate("crit_value")
+    assert mean.half_width <= 0.03 * mean.value
+    exact = pmf_mean(exact_pmf(calculate_artifact_crit_value, ArtifactSlot.CIRCLET))
+    assert mean.low <= exact <= mean.high
+
+    quantile = result.estimate("crit_value", 0.9)
+    pmf = pmf_from_counts(result.counts["crit_value"])
+    assert quantile.value == pytest.approx(float(pmf_quantile(pmf, 0.9)))
+    assert quantile.low <= quantile.value <= quantile.high
+
+
+def test_reproducible_across_workers() -> None:
+    """This test verifies a seeded run stops at the same point on any backend"""
+    runs = [
+        simulate_adaptive(
+            ("roll_value",),
+            SPEC,
+            rel_tol=0.02,
+            seed=3,
+            chunk_size=500,
+            workers=workers,
+            backend="thread",
+        )
+        for workers in (1, 2)
+    ]
+    assert runs[0].samples == runs[1].samples
+    assert runs[0].estimates == runs[1].estimates
+
+
+def test_budgets() -> None:
+    timed = simulate_adaptive(spec=SPEC, rel_tol=0, time_budget=0, seed=1, workers=1)
+    assert (timed.stopped, timed.samples) == ("time", 1_000)
+    capped = simulate_adaptive(spec=SPEC, rel_tol=0, max_samples=1_500, seed=1, workers=1)
+    assert (capped.stopped, capped.samples) == ("samples", 1_500)
+
+
+def test_invalid_arguments() -> None:
+    with pytest.raises(ValueError, match="Invalid statistic"):
+        simulate_adaptive(statistics=(1.5,))
+    with pytest.raises(ValueError, match="rel_tol or abs_tol"):
+        simulate_adaptive(rel_tol=None)
+    with pytest.raises(ValueError, match="Invalid metric"):
+        simulate_adaptive(("luck",))
+    result = simulate_adaptive(spec=SPEC, max_samples=10, seed=1, workers=1)
+    with pytest.raises(KeyError):
+        result.estimate("crit_value", 0.5)
@@ -0,0 +1,119 @@
+import asyncio
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import aclosing
+from typing import Any
+
+import numpy as np
+import pytest
+
+from artipy.aio import agenerate_artifacts, amap_bounded, ascore
+from artipy.analysis import METRICS
+from artipy.batch import ArtifactBatch
+from artipy.records import artifact_to_row
+from artipy.simulation import SimulationSpec, generate_chunk, iter_chunks
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    def __init__(self) -> None:
+        super().__init__(max_workers=2)
+        self.submitted = 0
+
+    def submit[T](self, fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> Future[T]:
+        self.submitted += 1
+        return super().submit(fn, *args, **kwargs)
+
+
+def test_agenerate_matches_sync_generation() -> None:
+    """This test verifies seeded async generation matches the sync chunks"""
+    spec = SimulationSpec(level=4)
+
+    async def collect() -> list[list[dict[str, object]]]:
+        return [
+            [artifact_to_row(a) for a in batch]
+            async for batch in agenerate_artifacts(25, spec, seed=46, chunk_size=10)
+        ]
+
+    batches = asyncio.run(collect())
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+    expected = [
+        artifact_to_row(a)
+        for chunk in iter_chunks(25, 46, 10)
+        for a in generate_chunk(chunk, spec)
+    ]
+    assert [row for batch in batches for row in batch] == expected
+
+
+def test_backpressure_and_early_exit() -> None:
+    """This test verifies at most a window of chunks is started ahead of the
+    consumer, and leaving early drops the chunks that did not start"""
+    executor = CountingExecutor()
+
+    async def consume() -> None:
+        generator = agenerate_artifacts(
+            100,
+            seed=1,
+            chunk_size=5,
+            executor=executor,
+            window=3,
+        )
+        async with aclosing(generator) as batches:
+            async for _ in batches:
+                await asyncio.sleep(0.05)
+                assert executor.submitted <= 3
+                break
+
+    asyncio.run(consume())
+    executor.shutdown()
+    assert executor.submitted == 3
+
+
+def test_event_loop_stays_responsive() -> None:
+    """This test verifies other tasks run while chunks are computed"""
+    release = threading.Event()
+
+    async def run() -> list[int]:
+        ticks: list[int] = []
+
+        async def tick() -> None:
+            for i in range(3):
+                ticks.append(i)
+                await asyncio.sleep(0)
+            release.set()
+
+        async def wait() -> list[int]:
+            return [r async for r in amap_bounded(lambda x: release.wait(5) and x, [7])]
+
+        results, _ = await asyncio.gather(wait(), tick())
+        return [*ticks, *results]
+
+    assert asyncio.run(run()) == [0, 1, 2, 7]
+
+
+def test_ascore_matches_sync_scoring() -> None:
+    """This test verifies chunked async scoring of artifacts and of batches matches
+    the sync registry"""
+    artifacts = generate_chunk(next(iter_chunks(30, 2, 30)), SimulationSpec())
+    metrics = ["crit_value", "rolls"]
+    expected = METRICS.calculate_batch(artifacts, metrics)
+
+    batch = ArtifactBatch.from_artifacts(artifacts)
+    chunked = asyncio.run(ascore(artifacts, metrics, chunk_size=7))
+    whole = asyncio.run(ascore(artifacts, metrics))
+    with CountingExecutor() as executor:
+        rows = asyncio.run(ascore(batch, metrics, chunk_size=7, executor=executor))
+        assert executor.submitted == 5
+    for result in (chunked, whole, rows):
+        assert result.dtype == expected.dtype
+        for name in metrics:
+            assert np.array_equal(result[name], expected[name])
+
+
+def test_invalid_window() -> None:
+    async def run() -> None:
+        async for _ in amap_bounded(str, [1], window=0):
+            pass
+
+    with pytest.raises(ValueError, match="window"):
+        asyncio.run(run())
@@ -116,3 +116,20 @@ def test_RollMagnitude() -> None:
     assert RollMagnitude.closest(0.8) == RollMagnitude.MEDIUM
     assert RollMagnitude.closest(0.9) == RollMagnitude.HIGH
     assert RollMagnitude.closest(0.94) == RollMagnitude.HIGH
+
+
+def test_snapshot_memoization(artifact: Artifact) -> None:
+    """This test verifies metrics of snapshots share the cache of the registry"""
+    snapshot = artifact.freeze()
+    analysis.METRICS.clear_cache()
+    hits = analysis.METRICS.hits
+    first = analysis.METRICS.compute("crit_value", snapshot)
+    assert first == analysis.calculate_artifact_crit_value(artifact)
+    assert analysis.METRICS.compute("crit_value", artifact.freeze()) == first
+    assert analysis.METRICS.compute("crit_value", artifact) == first
+    assert analysis.METRICS.hits == hits + 2
+    assert analysis.calculate_artifact_roll_value(snapshot) == (
+        analysis.calculate_artifact_roll_value(artifact)
+    )
+    rolls = tuple(analysis.calculate_substat_rolls(s) for s in snapshot.substats)
+    assert rolls == (1, 1, 1, 2)
@@ -149,3 +149,17 @@ def test_builder_constraint_rarity() -> None:
     # Case 2: Rarity must not be less than 1
     with pytest.raises(ValueError):
         ArtifactBuilder().with_rarity(0)
+
+
+def test_freeze_thaw(artifact: Artifact) -> None:
+    """This test verifies snapshots are hashable, structurally equal and reversible"""
+    snapshot = artifact.freeze()
+    assert snapshot == deepcopy(artifact).freeze()
+    assert hash(snapshot) == hash(artifact.freeze())
+    assert snapshot.thaw().freeze() == snapshot
+    assert str(snapshot.thaw()) == str(artifact)
+
+    artifact.upgrade()
+    assert artifact.freeze() != snapshot
+    with pytest.raises(AttributeError):
+        snapshot.level = 4  # pyright: ignore[reportAttributeAccessIssue]
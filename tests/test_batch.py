@@ -0,0 +1,66 @@
+import io
+import random
+
+import numpy as np
+import pytest
+
+from artipy import analysis
+from artipy.analysis import METRICS
+from artipy.batch import ArtifactBatch
+from artipy.records import ARTIFACT_FIELDS, artifact_to_row, open_writer, record_dtype
+from artipy.types import ArtifactSlot
+
+
+@pytest.fixture
+def artifacts() -> list[analysis.Artifact]:
+    random.seed(30)
+    result = [
+        analysis.create_random_artifact(random.choice(list(ArtifactSlot)))
+        for _ in range(100)
+    ]
+    for a in result[::2]:
+        analysis.upgrade_artifact_to_max(a)
+    return result
+
+
+def test_calculate_batch(artifacts: list[analysis.Artifact]) -> None:
+    """This test verifies the batch kernels agree with the scalar metrics"""
+    results = METRICS.calculate_batch(
+        artifacts,
+        ("roll_value", "maximum_roll_value", "crit_value", "rolls", "substat_roll_value"),
+    )
+    assert results.shape == (100,)
+    assert results["rolls"].shape == (100, 4)
+    for a, row in zip(artifacts, results, strict=True):
+        assert row["roll_value"] == pytest.approx(
+            float(analysis.calculate_artifact_roll_value(a)),
+        )
+        assert row["maximum_roll_value"] == pytest.approx(
+            float(analysis.calculate_artifact_maximum_roll_value(a)),
+        )
+        assert row["crit_value"] == pytest.approx(
+            float(analysis.calculate_artifact_crit_value(a)),
+        )
+        rolls = [analysis.calculate_substat_rolls(s) for s in a.substats]
+        assert row["rolls"].tolist() == rolls + [0] * (4 - len(rolls))
+        roll_values = [analysis.calculate_substat_roll_value(s) for s in a.substats]
+        assert row["substat_roll_value"].tolist() == pytest.approx(
+            [float(v) for v in roll_values] + [0.0] * (4 - len(roll_values)),
+        )
+
+    with pytest.raises(ValueError, match="Invalid metric"):
+        METRICS.calculate_batch(artifacts, ("luck",))
+
+
+def test_from_records(artifacts: list[analysis.Artifact]) -> None:
+    """This test verifies batches read from binary records match the artifacts"""
+    stream = io.BytesIO()
+    writer = open_writer(stream, "binary", ARTIFACT_FIELDS)
+    writer.write_rows(artifact_to_row(a) for a in artifacts)
+    records = np.frombuffer(stream.getvalue(), dtype=record_dtype(ARTIFACT_FIELDS))
+
+    metrics = ("roll_value", "crit_value")
+    from_records = METRICS.calculate_batch(ArtifactBatch.from_records(records), metrics)
+    from_artifacts = METRICS.calculate_batch(artifacts, metrics)
+    assert np.allclose(from_records["roll_value"], from_artifacts["roll_value"])
+    assert np.allclose(from_records["crit_value"], from_artifacts["crit_value"])
@@ -0,0 +1,85 @@
+import operator
+from collections import Counter
+from functools import partial
+from pathlib import Path
+
+import pytest
+
+from artipy.analysis import calculate_artifact_crit_value
+from artipy.checkpoint import Checkpoint, load_checkpoint, reduce_chunks
+from artipy.distributions import sampled_counts
+from artipy.simulation import Chunk, SimulationSpec, generate_chunk
+
+
+class Preempted(Exception):
+    pass
+
+
+def _histogram(chunk: Chunk, *, fail_at: int | None = None) -> Counter:
+    if chunk.chunk_id == fail_at:
+        raise Preempted
+    return sampled_counts(
+        calculate_artifact_crit_value(a) for a in generate_chunk(chunk, SimulationSpec())
+    )
+
+
+def _run(path: Path | None, fail_at: int | None = None) -> Counter:
+    return reduce_chunks(
+        partial(_histogram, fail_at=fail_at),
+        operator.add,
+        Counter(),
+        n=50,
+        seed=11,
+        chunk_size=5,
+        key="crit_value",
+        path=path,
+        interval=0,
+        workers=1,
+    )
+
+
+def test_resume_matches_uninterrupted_run(tmp_path: Path) -> None:
+    """This test verifies a preempted run resumes to the uninterrupted result"""
+    path = tmp_path / "run.ckpt"
+    with pytest.raises(Preempted):
+        _run(path, fail_at=6)
+
+    checkpoint = load_checkpoint(path)
+    assert isinstance(checkpoint, Checkpoint)
+    assert checkpoint.completed == 6
+    assert not checkpoint.done
+    assert sum(checkpoint.accumulator.values()) == 30
+
+    assert _run(path) == _run(None)
+    assert load_checkpoint(path).done
+
+
+def test_finished_run_is_not_recomputed(tmp_path: Path) -> None:
+    """This test verifies a finished checkpoint returns its result directly"""
+    path = tmp_path / "run.ckpt"
+    result = _run(path)
+    assert _run(path, fail_at=0) == result
+
+
+def test_checkpoint_of_another_run(tmp_path: Path) -> None:
+    """This test verifies checkpoints are only resumed by the same run"""
+    path = tmp_path / "run.ckpt"
+    _run(path)
+    with pytest.raises(ValueError, match="another run"):
+        reduce_chunks(_histogram, operator.add, Counter(), n=10, path=path, workers=1)
+    with pytest.raises(ValueError, match="seed 11"):
+        reduce_chunks(
+            _histogram,
+            operator.add,
+            Counter(),
+            n=50,
+            seed=12,
+            chunk_size=5,
+            key="crit_value",
+            path=path,
+            workers=1,
+        )
+
+
+def test_missing_checkpoint(tmp_path: Path) -> None:
+    assert load_checkpoint(tmp_path / "missing.ckpt") is None
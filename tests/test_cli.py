@@ -0,0 +1,131 @@
+"""This module contains the tests for the command line interface."""
+
+import contextlib
+import socket
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import orjson
+import pytest
+
+from artipy.cli import main
+from artipy.records import ARTIFACT_FIELDS, artifact_from_row, record_dtype
+
+
+def _read_jsonl(path: Path) -> list[dict[str, object]]:
+    return [orjson.loads(line) for line in path.read_bytes().splitlines()]
+
+
+def test_simulate_is_independent_of_workers(tmp_path: Path) -> None:
+    """The output of a seeded run only depends on the seed and chunk size, not on the
+    amount or kind of workers"""
+    serial, parallel = tmp_path / "serial.jsonl", tmp_path / "parallel.jsonl"
+    threaded = tmp_path / "threaded.jsonl"
+    args = ["simulate", "--n", "25", "--seed", "7", "--chunk-size", "4", "-f", "jsonl"]
+    main([*args, "--workers", "1", "-o", str(serial)])
+    main([*args, "--workers", "2", "-o", str(parallel)])
+    main([*args, "--workers", "3", "--backend", "thread", "-o", str(threaded)])
+
+    rows = _read_jsonl(serial)
+    assert len(rows) == 25
+    assert serial.read_bytes() == parallel.read_bytes() == threaded.read_bytes()
+    for row in rows:
+        assert row["level"] == 20
+        artifact_from_row(row)
+
+
+def test_simulate_binary(tmp_path: Path) -> None:
+    """The binary format is a headerless stream of fixed-width records"""
+    output = tmp_path / "out.bin"
+    main([
+        "simulate", "--n", "10", "--slot", "circlet", "--mainstat", "CRIT_RATE",
+        "--level", "8", "--seed", "1", "--workers", "1", "-f", "binary", "-o", str(output),
+    ])  # fmt: skip
+    records = np.fromfile(
+        output,
+        dtype=record_dtype((*ARTIFACT_FIELDS, "roll_value", "crit_value")),
+    )
+    assert len(records) == 10
+    assert (records["level"] == 8).all()
+
+
+def test_score_inventory(tmp_path: Path) -> None:
+    """Scoring an inventory reproduces the metrics of the simulation"""
+    inventory, scored = tmp_path / "inventory.csv", tmp_path / "scored.jsonl"
+    main(["simulate", "--n", "5", "--seed", "3", "--workers", "1", "-o", str(inventory)])
+    main(["score", str(inventory), "--workers", "1", "-f", "jsonl", "-o", str(scored)])
+
+    rows = _read_jsonl(scored)
+    assert len(rows) == 5
+    assert all(row["roll_value"] > 0 for row in rows)
+
+
+def test_distribution(tmp_path: Path) -> None:
+    """Both the exact and the sampled distribution sum up to one"""
+    exact, sampled = tmp_path / "exact.jsonl", tmp_path / "sampled.jsonl"
+    main([
+        "distribution",
+        "crit_value",
+        "--exact",
+        "--slot",
+        "goblet",
+        "-f",
+        "jsonl",
+        "-o",
+        str(exact),
+    ])
+    main([
+        "distribution", "crit_value", "--slot", "goblet", "--n", "200", "--seed", "1",
+        "--workers", "1", "-f", "jsonl", "-o", str(sampled),
+    ])  # fmt: skip
+    for path in (exact, sampled):
+        rows = _read_jsonl(path)
+        assert sum(row["probability"] for row in rows) == pytest.approx(1)
+
+
+def test_distribution_checkpoint(tmp_path: Path) -> None:
+    """A finished checkpoint reproduces the sampled distribution without a seed"""
+    checkpoint = tmp_path / "run.ckpt"
+    first, second = tmp_path / "first.jsonl", tmp_path / "second.jsonl"
+    args = ["distribution", "roll_value", "--n", "20", "--chunk-size", "5"]
+    args += ["--workers", "1", "-f", "jsonl", "--checkpoint", str(checkpoint)]
+    main([*args, "-o", str(first)])
+    main([*args, "-o", str(second)])
+    assert checkpoint.exists()
+    assert first.read_bytes() == second.read_bytes()
+
+
+def test_coordinate_and_work(tmp_path: Path) -> None:
+    """A coordinator merges the histograms computed by a worker"""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = str(probe.getsockname()[1])
+    output = tmp_path / "distribution.jsonl"
+    args = [
+        "coordinate", "--n", "30", "--chunk-size", "10", "--seed", "4",
+        "--metrics", "crit_value", "--port", port, "-f", "jsonl", "-o", str(output),
+    ]  # fmt: skip
+    coordinator = threading.Thread(target=main, args=(args,))
+    coordinator.start()
+    for _ in range(100):
+        with contextlib.suppress(ConnectionRefusedError):
+            main(["work", "--port", port, "--processes", "1"])
+            break
+        time.sleep(0.05)
+    coordinator.join(timeout=30)
+
+    rows = _read_jsonl(output)
+    assert {row["metric"] for row in rows} == {"crit_value"}
+    assert sum(row["probability"] for row in rows) == pytest.approx(1)
+
+
+def test_coordinate_rejects_binary() -> None:
+    with pytest.raises(SystemExit):
+        main(["coordinate", "--n", "10", "-f", "binary"])
+
+
+def test_mainstat_requires_slot() -> None:
+    with pytest.raises(SystemExit):
+        main(["simulate", "--mainstat", "CRIT_RATE"])
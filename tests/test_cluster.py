@@ -0,0 +1,98 @@
+import asyncio
+from collections import Counter
+
+import orjson
+import pytest
+
+from artipy import cluster
+from artipy.cluster import Coordinator, run_worker, work
+from artipy.simulation import Chunk, Job, SimulationSpec, iter_chunks, run_chunk
+from artipy.types import ArtifactSlot, StatType
+
+JOB = Job(
+    SimulationSpec(slot=ArtifactSlot.CIRCLET, mainstat=StatType.CRIT_DMG, level=8),
+    ("crit_value", "roll_value"),
+)
+
+
+def _expected(n: int, seed: int, chunk_size: int) -> dict[str, Counter]:
+    expected = {metric: Counter() for metric in JOB.metrics}
+    for chunk in iter_chunks(n, seed, chunk_size):
+        for metric, counts in run_chunk(chunk, JOB).items():
+            expected[metric].update(counts)
+    return expected
+
+
+async def _take_task(port: int) -> asyncio.StreamWriter:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b'{"op": "ready"}\n')
+    await writer.drain()
+    assert orjson.loads(await reader.readline())["op"] == "task"
+    return writer
+
+
+def test_job_roundtrip() -> None:
+    """This test verifies jobs survive the wire format"""
+    assert Job.from_json(orjson.loads(orjson.dumps(JOB.to_json()))) == JOB
+
+
+def test_worker_processes_with_failure() -> None:
+    """This test verifies the merged result matches a local run, even when a
+    worker disconnects while holding a chunk"""
+
+    async def run() -> tuple[dict[str, Counter], Coordinator]:
+        async with Coordinator(JOB, n=60, seed=5, chunk_size=7) as coordinator:
+            server = await coordinator.serve_tcp()
+            port = server.sockets[0].getsockname()[1]
+            (await _take_task(port)).close()
+            await asyncio.to_thread(work, "127.0.0.1", port, processes=2)
+            return await coordinator.result(), coordinator
+
+    counts, coordinator = asyncio.run(run())
+    assert counts == _expected(60, 5, 7)
+    assert coordinator.retries >= 1
+    assert coordinator.progress == (9, 9)
+
+
+def test_expired_lease_is_handed_out_again() -> None:
+    """This test verifies a chunk held by a stalled worker is retried"""
+
+    async def run() -> tuple[dict[str, Counter], int]:
+        async with Coordinator(JOB, n=10, seed=2, chunk_size=5, timeout=0.2) as c:
+            server = await c.serve_tcp()
+            port = server.sockets[0].getsockname()[1]
+            stalled = await _take_task(port)
+            computed = await run_worker("127.0.0.1", port)
+            counts = await c.result()
+            stalled.close()
+            return counts, computed
+
+    counts, computed = asyncio.run(run())
+    assert counts == _expected(10, 2, 5)
+    assert computed == 2
+
+
+def test_failing_chunk_fails_the_run(monkeypatch: pytest.MonkeyPatch) -> None:
+    """This test verifies a chunk that always fails is reported by the worker and
+    fails the run after the maximum amount of attempts instead of hanging"""
+
+    def flaky(chunk: Chunk, job: Job) -> dict[str, Counter]:
+        if chunk.chunk_id == 1:
+            msg = "Broken chunk"
+            raise ValueError(msg)
+        return run_chunk(chunk, job)
+
+    monkeypatch.setattr(cluster, "run_chunk", flaky)
+
+    async def run() -> tuple[int, Coordinator]:
+        async with Coordinator(JOB, n=10, seed=2, chunk_size=5, max_attempts=2) as c:
+            server = await c.serve_tcp()
+            port = server.sockets[0].getsockname()[1]
+            computed = await asyncio.wait_for(run_worker("127.0.0.1", port), 10)
+            with pytest.raises(RuntimeError, match="Chunk 1 failed after 2 attempts"):
+                await c.result()
+            return computed, c
+
+    computed, coordinator = asyncio.run(run())
+    assert computed == 1
+    assert coordinator.retries == 2
@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+
+from artipy import conformance
+from artipy.artifacts import Artifact, ArtifactBuilder
+from artipy.farming import domain_of, generate_drops
+from artipy.types import ArtifactSet, ArtifactSlot, StatType
+from artipy.utils import possible_substat_values
+
+N = 4_000
+ALPHA = 1e-3
+
+
+def test_chi2_sf() -> None:
+    """This test verifies the chi-square survival function at known critical values"""
+    assert conformance.chi2_sf(3.841458820694124, 1) == pytest.approx(0.05)
+    assert conformance.chi2_sf(18.307038053275146, 10) == pytest.approx(0.05)
+    assert conformance.chi2_sf(0.0, 3) == pytest.approx(1.0)
+    assert conformance.chi2_sf(float("inf"), 3) == pytest.approx(0.0)
+
+
+@pytest.mark.parametrize("slot", [ArtifactSlot.SANDS, ArtifactSlot.GOBLET])
+def test_mainstats(slot: ArtifactSlot) -> None:
+    """This test verifies generated mainstats follow the slot weights"""
+    observed = conformance.sample_mainstats(slot, N, seed=1)
+    expected = conformance.expected_mainstats(slot)
+    assert conformance.chi_square_test(observed, expected).p_value > ALPHA
+    assert conformance.g_test(observed, expected).p_value > ALPHA
+
+
+def test_substat_counts() -> None:
+    """This test verifies the four-substat chance and detects a biased engine"""
+    expected = conformance.expected_substat_counts(5)
+    observed = conformance.sample_substat_counts(5, N, seed=2)
+    assert conformance.g_test(observed, expected).p_value > ALPHA
+
+    def always_four(slot: ArtifactSlot, rarity: int = 5, **_: object) -> Artifact:
+        return (
+            ArtifactBuilder()
+            .with_rarity(rarity)
+            .with_substats(amount=rarity - 1)
+            .with_slot(slot)
+            .build()
+        )
+
+    biased = conformance.sample_substat_counts(5, 1000, seed=2, generate=always_four)
+    assert conformance.g_test(biased, expected).p_value < ALPHA
+
+
+def test_initial_substats() -> None:
+    """This test verifies the weighted draw of initial substats"""
+    observed = conformance.sample_initial_substats(
+        ArtifactSlot.CIRCLET,
+        StatType.CRIT_RATE,
+        N,
+        seed=3,
+    )
+    expected = conformance.expected_initial_substats(StatType.CRIT_RATE)
+    assert conformance.g_test(observed, expected).p_value > ALPHA
+
+
+def test_upgrade_outcomes() -> None:
+    """This test verifies upgrades pick a uniform substat and value tier"""
+    artifact = (
+        ArtifactBuilder()
+        .with_mainstat(StatType.HP)
+        .with_substats([
+            (stat, possible_substat_values(stat, 5)[tier])
+            for tier, stat in enumerate((
+                StatType.CRIT_RATE,
+                StatType.CRIT_DMG,
+                StatType.ATK_PERCENT,
+                StatType.ELEMENTAL_MASTERY,
+            ))
+        ])
+        .with_rarity(5)
+        .with_slot(ArtifactSlot.FLOWER)
+        .build()
+    )
+    observed = conformance.sample_upgrade_outcomes(artifact, N, seed=4)
+    expected = conformance.expected_upgrade_outcomes(artifact)
+    assert sum(observed.values()) == N
+    assert conformance.chi_square_test(observed, expected).p_value > ALPHA
+
+
+def test_vectorized_drops() -> None:
+    """This test verifies the vectorized domain drops against the same expected
+    probabilities, counted on their batches"""
+    domain = domain_of(ArtifactSet.EMBLEM_OF_SEVERED_FATE)
+    rng = np.random.default_rng(5)
+    sands = generate_drops(N, domain, rng=rng, slot=ArtifactSlot.SANDS)
+    observed = conformance.count_mainstats(sands)
+    expected = conformance.expected_mainstats(ArtifactSlot.SANDS)
+    assert conformance.g_test(observed, expected).p_value > ALPHA
+    assert (
+        conformance.g_test(
+            conformance.count_substat_counts(sands),
+            conformance.expected_substat_counts(5),
+        ).p_value
+        > ALPHA
+    )
+
+    circlets = generate_drops(
+        N,
+        domain,
+        rng=rng,
+        slot=ArtifactSlot.CIRCLET,
+        mainstat=StatType.CRIT_RATE,
+    )
+    assert (
+        conformance.g_test(
+            conformance.count_initial_substats(circlets),
+            conformance.expected_initial_substats(StatType.CRIT_RATE),
+        ).p_value
+        > ALPHA
+    )
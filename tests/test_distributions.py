@@ -0,0 +1,134 @@
+"""This module contains the tests for the distributions module."""
+
+import random
+from collections import Counter
+from decimal import Decimal
+
+import pytest
+
+from artipy import analysis, conformance, distributions
+from artipy.types import ArtifactSlot, StatType
+
+
+def test_substat_set_probabilities() -> None:
+    """The mainstat is never a substat and the probabilities sum up to one"""
+    sets = distributions.substat_set_probabilities(StatType.CRIT_RATE, 4)
+    assert sum(sets.values()) == pytest.approx(1)
+    assert all(StatType.CRIT_RATE not in s and len(s) == 4 for s in sets)
+
+
+def test_exact_pmf_fresh_flower() -> None:
+    """A fresh flower only has crit value if a crit substat was drawn"""
+    pmf = distributions.exact_pmf(
+        analysis.calculate_artifact_crit_value,
+        ArtifactSlot.FLOWER,
+        level=0,
+    )
+
+    def no_crit(count: int) -> float:
+        sets = distributions.substat_set_probabilities(StatType.HP, count)
+        crit = {StatType.CRIT_RATE, StatType.CRIT_DMG}
+        return sum(p for s, p in sets.items() if not s & crit)
+
+    chance = analysis.FOUR_SUBSTAT_CHANCE
+    assert sum(pmf.values()) == pytest.approx(1)
+    assert pmf[Decimal(0)] == pytest.approx(
+        chance * no_crit(4) + (1 - chance) * no_crit(3),
+    )
+    assert max(pmf) == Decimal("15.55")
+
+
+def test_exact_pmf_matches_simulation() -> None:
+    """The mean of the exact distribution matches a large seeded simulation"""
+    from artipy.simulation import SimulationSpec, generate_chunk, iter_chunks
+
+    spec = SimulationSpec(slot=ArtifactSlot.CIRCLET, mainstat=StatType.CRIT_DMG)
+    pmf = distributions.exact_pmf(
+        analysis.calculate_artifact_roll_value,
+        spec.slot,
+        mainstat=spec.mainstat,
+    )
+    exact_mean = sum(float(value) * p for value, p in pmf.items())
+    artifacts = [a for c in iter_chunks(2000, 11) for a in generate_chunk(c, spec)]
+    sampled_mean = sum(
+        float(analysis.calculate_artifact_roll_value(a)) for a in artifacts
+    ) / len(artifacts)
+    assert sampled_mean == pytest.approx(exact_mean, abs=0.05)
+
+
+def test_exact_pmf_level_dependent_metric() -> None:
+    """The maximum roll value below max level includes the rolls still to come and
+    matches a seeded simulation"""
+    from artipy.simulation import SimulationSpec, generate_chunk, iter_chunks
+
+    spec = SimulationSpec(slot=ArtifactSlot.CIRCLET, level=8)
+    pmf = distributions.exact_pmf(
+        analysis.calculate_artifact_maximum_roll_value,
+        spec.slot,
+        level=spec.level,
+    )
+    artifacts = [a for c in iter_chunks(2000, 11) for a in generate_chunk(c, spec)]
+    values = [analysis.calculate_artifact_maximum_roll_value(a) for a in artifacts]
+    assert min(pmf) == min(distributions.sampled_counts(values)) == Decimal("6.5")
+    assert distributions.pmf_mean(pmf) == pytest.approx(
+        sum(float(v) for v in values) / len(values),
+        abs=0.05,
+    )
+
+
+def test_exact_pmf_invalid_mainstat() -> None:
+    with pytest.raises(ValueError):
+        distributions.exact_pmf(
+            analysis.calculate_artifact_crit_value,
+            ArtifactSlot.FLOWER,
+            mainstat=StatType.CRIT_RATE,
+        )
+
+
+def test_initial_substat_tables() -> None:
+    """The initial substat tables are consistent with each other and sum up to one"""
+    orders = distributions.initial_substat_orders(StatType.CRIT_DMG)
+    sets = distributions.initial_substat_sets(StatType.CRIT_DMG)
+    assert sum(orders.values()) == pytest.approx(1)
+    assert sum(sets.values()) == pytest.approx(1)
+    assert all(StatType.CRIT_DMG not in order for order in orders)
+    assert len(orders) == 9 * 8 * 7 * 6 + 9 * 8 * 7
+    first = frozenset(next(iter(orders)))
+    assert sets[first] == pytest.approx(
+        sum(p for order, p in orders.items() if frozenset(order) == first),
+    )
+    for four, p in distributions.substat_set_probabilities(StatType.CRIT_DMG, 4).items():
+        assert sets[four] == pytest.approx(analysis.FOUR_SUBSTAT_CHANCE * p)
+
+    table = distributions.initial_state_table(ArtifactSlot.CIRCLET)
+    assert sum(table.values()) == pytest.approx(1)
+    tiers = distributions.initial_tier_probabilities(StatType.CRIT_RATE)
+    assert list(tiers.values()) == pytest.approx([0.25] * 4)
+
+
+def test_initial_substat_sampler() -> None:
+    """A single draw of the sampler matches the substats of generated artifacts"""
+    mainstat = StatType.ATK_PERCENT
+    sampler = distributions.initial_substat_sampler(mainstat)
+    random.seed(37)
+    drawn = Counter(frozenset(sampler.draw()) for _ in range(4_000))
+    expected = distributions.initial_substat_sets(mainstat)
+    assert conformance.g_test(drawn, expected).p_value > 1e-3
+
+
+def test_initial_probability() -> None:
+    """The prior of a new artifact is the product of its draws"""
+    random.seed(37)
+    artifact = analysis.create_random_artifact(ArtifactSlot.GOBLET)
+    order = tuple(s.name for s in artifact.substats)
+    mainstats = conformance.expected_mainstats(ArtifactSlot.GOBLET)
+    expected = (
+        mainstats[artifact.mainstat.name]
+        * distributions.initial_substat_orders(artifact.mainstat.name)[order]
+        / 4 ** len(order)
+    )
+    assert distributions.initial_probability(artifact) == pytest.approx(expected)
+
+    analysis.upgrade_artifact_to_max(artifact)
+    with pytest.raises(ValueError, match="level 0"):
+        distributions.initial_probability(artifact)
@@ -0,0 +1,132 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from artipy.batch import EMPTY, crit_values
+from artipy.conformance import expected_mainstats, g_test
+from artipy.farming import (
+    Domain,
+    Target,
+    candidate_chance,
+    domain_of,
+    domains,
+    generate_drops,
+    set_rarities,
+    set_slots,
+    simulate_farming,
+)
+from artipy.records import SET_CODES, SLOT_CODES, STAT_CODES
+from artipy.types import ArtifactSet, ArtifactSlot, StatType
+
+ALPHA = 1e-3
+CRIMSON_WITCH = ArtifactSet.CRIMSON_WITCH_OF_FLAMES
+
+
+def test_domains() -> None:
+    """This test verifies the domains and pieces read from the excel configs"""
+    assert set(domain_of(CRIMSON_WITCH).sets) == {
+        ArtifactSet.LAVAWALKER,
+        CRIMSON_WITCH,
+    }
+    assert all(len(domain.sets) == 2 and domain.rarity == 5 for domain in domains())
+    assert set_slots(ArtifactSet.PRAYERS_FOR_DESTINY) == (ArtifactSlot.CIRCLET,)
+    assert set_slots(CRIMSON_WITCH) == tuple(ArtifactSlot)
+    assert set_rarities()[ArtifactSet.ADVENTURER] == (1, 2, 3)
+    with pytest.raises(ValueError, match="does not drop from a domain"):
+        domain_of(ArtifactSet.ADVENTURER)
+
+
+def test_generate_drops() -> None:
+    """This test verifies drops follow the domain, slot and mainstat distributions"""
+    domain = domain_of(CRIMSON_WITCH)
+    drops = generate_drops(
+        8_000,
+        domain,
+        rng=np.random.default_rng(34),
+        slot=ArtifactSlot.SANDS,
+        level=None,
+    )
+    assert {SET_CODES[s] for s in np.unique(drops.set)} == set(domain.sets)
+    assert {SLOT_CODES[s] for s in np.unique(drops.slot)} == {ArtifactSlot.SANDS}
+    assert (drops.level == 20).all()
+    assert ((drops.substats != EMPTY).sum(axis=1) == 4).all()
+    assert (drops.substats != drops.mainstat[:, None]).all()
+
+    mainstats = Counter(STAT_CODES[code] for code in drops.mainstat)
+    assert g_test(mainstats, expected_mainstats(ArtifactSlot.SANDS)).p_value > ALPHA
+
+    with pytest.raises(ValueError, match="does not drop from"):
+        generate_drops(
+            1,
+            domain,
+            rng=np.random.default_rng(),
+            artifact_set=ArtifactSet.ADVENTURER,
+        )
+    with pytest.raises(ValueError, match="Invalid level"):
+        generate_drops(1, domain, rng=np.random.default_rng(), level=24)
+
+
+def test_generate_drops_of_a_slot_missing_from_a_set() -> None:
+    """This test verifies a slot is only drawn from the sets that have it, each with
+    the chance it drops that slot"""
+    domain = Domain((ArtifactSet.PRAYERS_FOR_DESTINY, CRIMSON_WITCH))
+    flowers = generate_drops(
+        100,
+        domain,
+        rng=np.random.default_rng(34),
+        slot=ArtifactSlot.FLOWER,
+    )
+    assert {SET_CODES[s] for s in np.unique(flowers.set)} == {CRIMSON_WITCH}
+    circlets = generate_drops(
+        6_000,
+        domain,
+        rng=np.random.default_rng(34),
+        slot=ArtifactSlot.CIRCLET,
+    )
+    prayers = SET_CODES.index(ArtifactSet.PRAYERS_FOR_DESTINY)
+    assert (circlets.set == prayers).mean() == pytest.approx(
+        candidate_chance(
+            domain,
+            Target(ArtifactSet.PRAYERS_FOR_DESTINY, ArtifactSlot.CIRCLET),
+        )
+        / candidate_chance(domain, Target(slot=ArtifactSlot.CIRCLET)),
+        abs=0.02,
+    )
+
+
+def test_simulate_farming() -> None:
+    """This test verifies farming results are reproducible and bounded by the budget"""
+    domain = domain_of(CRIMSON_WITCH)
+    target = Target(
+        CRIMSON_WITCH,
+        ArtifactSlot.CIRCLET,
+        StatType.CRIT_DMG,
+        predicate=lambda batch: crit_values(batch) >= 20,
+    )
+    runs = simulate_farming(domain, target, players=500, resin=20_000, seed=34)
+    assert ((runs >= 1) & (runs <= 1_000) | (runs == -1)).all()
+    assert 0 < (runs > 0).mean() < 1
+    assert np.array_equal(
+        runs,
+        simulate_farming(domain, target, players=500, resin=20_000, seed=34),
+    )
+
+    with pytest.raises(ValueError, match="cannot drop from"):
+        simulate_farming(
+            Domain((ArtifactSet.LAVAWALKER,)),
+            Target(CRIMSON_WITCH),
+            players=1,
+            resin=20,
+        )
+    with pytest.raises(ValueError, match="slot is required"):
+        Target(mainstat=StatType.CRIT_DMG)
+    with pytest.raises(ValueError, match="Invalid level"):
+        Target(level=21)
+    with pytest.raises(ValueError, match="Invalid level"):
+        simulate_farming(
+            Domain(domain.sets, rarity=2),
+            Target(CRIMSON_WITCH, level=8),
+            players=1,
+            resin=20,
+        )
@@ -0,0 +1,85 @@
+import math
+
+import pytest
+
+from artipy.analysis import calculate_artifact_crit_value
+from artipy.distributions import exact_pmf
+from artipy.importance import Tilt, estimate_probability, metric_at_least, sample_tilted
+from artipy.types import ArtifactSlot, StatType
+
+CRIT = (StatType.CRIT_RATE, StatType.CRIT_DMG)
+
+
+def _exact_tail(threshold: float) -> float:
+    pmf = exact_pmf(calculate_artifact_crit_value, ArtifactSlot.CIRCLET)
+    return sum(p for value, p in pmf.items() if value >= threshold)
+
+
+def test_untilted_samples_follow_the_rules() -> None:
+    """This test verifies untilted samples have unit weight and the stratified
+    estimate matches the exact distribution"""
+    artifact, ratio = sample_tilted(ArtifactSlot.GOBLET, StatType.PYRO_DMG, 3, Tilt())
+    assert ratio == 1
+    assert len(artifact.substats) == 4
+    assert artifact.level == 20
+    assert StatType.PYRO_DMG not in {s.name for s in artifact.substats}
+
+    estimate = estimate_probability(
+        metric_at_least("crit_value", 30),
+        ArtifactSlot.CIRCLET,
+        n=4_000,
+        seed=49,
+    )
+    assert math.isclose(sum(s.weight for s in estimate.strata), 1)
+    assert estimate.low <= _exact_tail(30) <= estimate.high
+
+
+def test_tilted_estimate_of_rare_event() -> None:
+    """This test verifies tilting reaches an event with a probability of about 2e-5
+    in a few thousand samples, without biasing the estimate"""
+    exact = _exact_tail(50)
+    estimate = estimate_probability(
+        metric_at_least("crit_value", 50),
+        ArtifactSlot.CIRCLET,
+        n=5_000,
+        tilt=Tilt.toward(CRIT, 8, tiers=1.5),
+        seed=49,
+    )
+    assert estimate.hits > 50
+    assert estimate.relative_error < 0.15
+    assert abs(estimate.probability - exact) < 4 * estimate.std_error
+
+
+def test_conditioned_on_mainstat() -> None:
+    estimate = estimate_probability(
+        metric_at_least("crit_value", 50),
+        ArtifactSlot.CIRCLET,
+        n=200,
+        tilt=Tilt.toward(CRIT),
+        mainstat=StatType.CRIT_DMG,
+        seed=1,
+    )
+    assert {s.mainstat for s in estimate.strata} == {StatType.CRIT_DMG}
+    assert estimate.probability == estimate.hits == 0
+    assert estimate.relative_error == math.inf
+
+
+def test_invalid_inputs() -> None:
+    with pytest.raises(ValueError, match="Invalid mainstat"):
+        estimate_probability(
+            bool,
+            ArtifactSlot.FLOWER,
+            n=10,
+            mainstat=StatType.ATK,
+        )
+    with pytest.raises(ValueError, match="Invalid metric"):
+        metric_at_least("luck", 1)
+
+
+def test_level_follows_the_rarity() -> None:
+    """This test verifies low rarity samples stop at their own maximum level and
+    levels past it are rejected"""
+    snapshot, _ = sample_tilted(ArtifactSlot.FLOWER, StatType.HP, 1, Tilt(), rarity=2)
+    assert snapshot.level == snapshot.max_level == 4
+    with pytest.raises(ValueError, match="Invalid level"):
+        sample_tilted(ArtifactSlot.FLOWER, StatType.HP, 3, Tilt(), level=24)
@@ -0,0 +1,107 @@
+import csv
+import io
+
+import orjson
+import pytest
+
+from artipy import inventory
+from artipy.inventory import Inventory, artifact_hash, content_hash, diff_inventory
+from artipy.records import ARTIFACT_FIELDS, artifact_from_row, artifact_to_row
+from artipy.simulation import SimulationSpec, generate_chunk, iter_chunks
+
+
+def _rows(n: int) -> list[dict[str, object]]:
+    artifacts = generate_chunk(next(iter_chunks(n, 48, n)), SimulationSpec(level=8))
+    return [{"id": str(i), **artifact_to_row(a)} for i, a in enumerate(artifacts)]
+
+
+def test_hash_is_format_independent() -> None:
+    """This test verifies a row hashes the same as its artifact, and as the same
+    row written to CSV and JSON lines and read back"""
+    row = _rows(1)[0]
+    stream = io.StringIO()
+    writer = csv.DictWriter(stream, ARTIFACT_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    writer.writerow(row)
+    from_csv = next(csv.DictReader(io.StringIO(stream.getvalue())))
+    from_json = orjson.loads(orjson.dumps(row))
+    assert (
+        content_hash(row)
+        == content_hash(from_csv)
+        == content_hash(from_json)
+        == artifact_hash(artifact_from_row(row))
+    )
+    assert content_hash({**row, "level": 12}) != content_hash(row)
+
+
+def test_diff_inventory() -> None:
+    diff = diff_inventory({"a": "1", "b": "2", "c": "3"}, {"b": "2", "c": "4", "d": "5"})
+    assert (diff.added, diff.removed, diff.changed, diff.unchanged) == (
+        ("d",),
+        ("a",),
+        ("c",),
+        1,
+    )
+    assert not diff_inventory({"a": "1"}, {"a": "1"})
+
+
+def test_sync_only_rebuilds_changes(monkeypatch: pytest.MonkeyPatch) -> None:
+    """This test verifies re-syncing an inventory only builds the pieces that
+    changed, and ends up with the same scores as a fresh inventory"""
+    rows = _rows(200)
+    current = Inventory()
+    assert len(current.sync(rows).added) == len(current) == 200
+
+    built = []
+
+    def spy(row: dict[str, object]) -> object:
+        built.append(row["id"])
+        return artifact_from_row(row)
+
+    monkeypatch.setattr(inventory, "artifact_from_row", spy)
+    upload = [*rows[:3], {**rows[3], "id": "new"}, *rows[5:]]
+    upload[10] = {**upload[10], "level": 12}
+    diff = current.sync(upload)
+    assert (diff.added, diff.removed, diff.changed) == (("new",), ("3", "4"), ("11",))
+    assert diff.unchanged == 197
+    assert sorted(built) == ["11", "new"]
+
+    fresh = Inventory()
+    fresh.sync(upload)
+    assert current.scores == fresh.scores
+    assert list(current.artifacts) == list(current.hashes) == list(fresh.hashes)
+
+
+def test_rows_without_identifier() -> None:
+    """This test verifies rows without an identifier are keyed by content, with
+    identical pieces kept apart"""
+    first, second = ({k: v for k, v in r.items() if k != "id"} for r in _rows(2))
+    current = Inventory(metrics=())
+    current.sync([first, first, second])
+    assert len(current) == 3
+    diff = current.diff([first, second])
+    assert len(diff.removed) == 1
+    assert diff.unchanged == 2
+
+
+def test_invalid_row_leaves_inventory() -> None:
+    rows = _rows(3)
+    current = Inventory()
+    current.sync(rows)
+    with pytest.raises(ValueError, match="'nope'"):
+        current.sync([*rows, {**rows[0], "id": "x", "slot": "nope"}])
+    assert list(current.hashes) == ["0", "1", "2"]
+
+
+def test_duplicate_identifier_is_rejected() -> None:
+    """This test verifies two rows with the same identifier do not overwrite each
+    other"""
+    rows = _rows(3)
+    current = Inventory()
+    current.sync(rows)
+    duplicate = [*rows, {**rows[2], "id": "1"}]
+    with pytest.raises(ValueError, match="Duplicate id '1'"):
+        current.sync(duplicate)
+    with pytest.raises(ValueError, match="Duplicate id '1'"):
+        current.diff(duplicate)
+    assert list(current.hashes) == ["0", "1", "2"]
@@ -0,0 +1,62 @@
+import random
+
+import numpy as np
+import pytest
+
+from artipy import leveling
+from artipy.analysis import create_random_artifact, upgrade_artifact_to_max
+from artipy.batch import ArtifactBatch
+from artipy.types import ArtifactSlot
+
+
+def test_exp_to_level() -> None:
+    """This test verifies the EXP curve read from the level excel config"""
+    assert leveling.exp_to_level(5, 0, 20) == 270_475
+    assert leveling.exp_to_level(5, 0, 1) == 3_000
+    assert leveling.exp_to_level(4, 0, 16) == leveling.cumulative_exp()[4, 16]
+    assert leveling.exp_to_level(5, 8, 8) == 0
+    assert leveling.mora_to_level(5, 0, 20) == 270_475 * leveling.MORA_PER_EXP
+
+    with pytest.raises(ValueError, match="Invalid level"):
+        leveling.exp_to_level(4, 0, 20)
+    with pytest.raises(ValueError, match="level down"):
+        leveling.exp_to_level(5, 8, 4)
+
+
+def test_fodder_exp() -> None:
+    """This test verifies fodder yields its base EXP plus 80% of invested EXP"""
+    assert leveling.fodder_exp(3) == 1_260
+    assert leveling.fodder_exp(5, 20) == 3_780 + 216_380
+    assert leveling.fodder_exp(4, 0, exp=1_000) == 2_520 + 800
+
+
+def test_artifact_costs() -> None:
+    """This test verifies the costs on an artifact"""
+    artifact = create_random_artifact(ArtifactSlot.FLOWER)
+    assert artifact.exp_to_level() == 270_475
+    assert artifact.mora_to_level(4) == leveling.cumulative_exp()[5, 4]
+    assert artifact.fodder_exp == 3_780
+
+
+def test_vectorized_costs() -> None:
+    """This test verifies the vectorized costs match the scalar ones"""
+    random.seed(40)
+    artifacts = [
+        create_random_artifact(ArtifactSlot.PLUME, random.randint(3, 5))
+        for _ in range(50)
+    ]
+    for artifact in artifacts[::3]:
+        upgrade_artifact_to_max(artifact)
+    for artifact in artifacts[1::3]:
+        artifact.upgrade()
+
+    batch = ArtifactBatch.from_artifacts(artifacts)
+    assert leveling.batch_exp_to_max(batch).tolist() == [
+        a.exp_to_level() for a in artifacts
+    ]
+    assert leveling.batch_fodder_exp(batch).tolist() == [a.fodder_exp for a in artifacts]
+    assert leveling.exp_between(
+        np.array([5, 5]),
+        np.array([0, 12]),
+        np.array([20, 4]),
+    ).tolist() == [270_475, 0]
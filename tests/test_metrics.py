@@ -0,0 +1,93 @@
+import pytest
+
+from artipy import analysis
+from artipy.artifacts import Artifact, ArtifactBuilder
+from artipy.batch import ArtifactBatch
+from artipy.metrics import Metric, MetricRegistry
+from artipy.stats import SubStat
+from artipy.types import ArtifactSlot, StatType
+
+
+@pytest.fixture
+def artifact() -> Artifact:
+    return (
+        ArtifactBuilder()
+        .with_mainstat(StatType.ATK_PERCENT, 0.228)
+        .with_substats([
+            (StatType.ATK, 19),
+            (StatType.CRIT_RATE, 0.039),
+            (StatType.HP_PERCENT, 0.053),
+            (StatType.HP, 568),
+        ])
+        .with_level(8)
+        .with_rarity(5)
+        .with_slot(ArtifactSlot.SANDS)
+        .build()
+    )
+
+
+def test_builtin_metrics(artifact: Artifact) -> None:
+    """This test verifies the built-in metrics are registered and exposed as views"""
+    assert set(analysis.ARTIFACT_ATTRIBUTES) == {
+        "roll_value",
+        "maximum_roll_value",
+        "crit_value",
+    }
+    assert set(analysis.SUBSTAT_ATTRIBUTES) == {"rolls", "substat_roll_value"}
+    assert all(metric.kernel is not None for metric in analysis.METRICS.values())
+    assert analysis.METRICS.compute("crit_value", artifact) == (
+        analysis.calculate_artifact_crit_value(artifact)
+    )
+    assert analysis.METRICS.compute("rolls", artifact) == (1, 1, 1, 2)
+
+
+def test_register_and_cache(artifact: Artifact) -> None:
+    """This test verifies custom metrics, caching and eviction"""
+    calls: list[Artifact] = []
+
+    def substat_count(a: Artifact) -> int:
+        calls.append(a)
+        return len(a.substats)
+
+    registry = MetricRegistry(cache_size=2)
+    registry.register(Metric("count", substat_count, dtype="u1"))
+    view = registry.artifact_metrics()
+    assert list(view) == ["count"]
+    with pytest.raises(ValueError, match="already registered"):
+        registry.register(Metric("count", substat_count))
+
+    assert registry.compute("count", artifact) == 4
+    assert registry.compute("count", artifact) == 4
+    assert len(calls) == 1
+    artifact.level += 4
+    registry.compute("count", artifact)
+    assert len(calls) == 2
+    assert (registry.hits, registry.misses) == (1, 2)
+
+    results = registry.calculate_batch([artifact], ["count"])
+    assert results["count"].tolist() == [4]
+    with pytest.raises(ValueError, match="no kernel"):
+        registry.calculate_batch(ArtifactBatch.from_artifacts([artifact]), ["count"])
+
+
+def test_depends_on_shares_cache(artifact: Artifact) -> None:
+    """This test verifies artifacts with the same crit substats share a result"""
+    registry = MetricRegistry()
+    registry.register(analysis.METRICS["crit_value"])
+    registry.compute("crit_value", artifact)
+    artifact.substats = [
+        s if s.name in {StatType.CRIT_RATE, StatType.CRIT_DMG} else SubStat(s.name, 0)
+        for s in artifact.substats
+    ]
+    artifact.level = 0
+    registry.compute("crit_value", artifact)
+    assert registry.hits == 1
+
+
+def test_calculate_batch_prefers_kernels(artifact: Artifact) -> None:
+    """This test verifies batch evaluation uses kernels and matches scalars"""
+    results = analysis.METRICS.calculate_batch([artifact], ["roll_value", "rolls"])
+    assert results["roll_value"][0] == pytest.approx(
+        float(analysis.calculate_artifact_roll_value(artifact)),
+    )
+    assert results["rolls"][0].tolist() == [1, 1, 1, 2]
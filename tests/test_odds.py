@@ -0,0 +1,67 @@
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from artipy.analysis import calculate_artifact_crit_value
+from artipy.batch import crit_values
+from artipy.farming import EXTRA_DROP_CHANCE, Target, domain_of, simulate_farming
+from artipy.odds import Spec, drop_probability, run_distribution
+from artipy.types import ArtifactSet, ArtifactSlot, StatType
+
+CRIMSON_WITCH = ArtifactSet.CRIMSON_WITCH_OF_FLAMES
+DOMAIN = domain_of(CRIMSON_WITCH)
+CIRCLET = Spec(
+    ArtifactSlot.CIRCLET,
+    StatType.CRIT_DMG,
+    CRIMSON_WITCH,
+    calculate_artifact_crit_value,
+    Decimal(20),
+)
+
+
+def test_geometric() -> None:
+    """This test verifies a single piece gives a geometric amount of runs"""
+    p = drop_probability(DOMAIN, CIRCLET)
+    per_run = 1 - (1 - EXTRA_DROP_CHANCE) * (1 - p) - EXTRA_DROP_CHANCE * (1 - p) ** 2
+    distribution = run_distribution(DOMAIN, CIRCLET)
+    assert distribution.mean == pytest.approx(1 / per_run)
+    assert distribution.std == pytest.approx(np.sqrt(1 - per_run) / per_run)
+    assert distribution.survival(100) == pytest.approx((1 - per_run) ** 100)
+
+    q90 = distribution.quantile(0.9)
+    assert distribution.cdf(q90) >= 0.9 > distribution.cdf(q90 - 1)
+    pmf = distribution.pmf(50)
+    assert pmf[0] == 0
+    assert pmf.sum() == pytest.approx(distribution.cdf(50))
+
+
+def test_matches_simulation() -> None:
+    """This test verifies the exact distribution agrees with the farming simulator"""
+    target = Target(
+        CRIMSON_WITCH,
+        ArtifactSlot.CIRCLET,
+        StatType.CRIT_DMG,
+        predicate=lambda batch: crit_values(batch) >= 20 - 1e-9,
+    )
+    runs = simulate_farming(DOMAIN, target, players=2_000, resin=10**6, seed=35)
+    distribution = run_distribution(DOMAIN, CIRCLET)
+    assert (runs > 0).all()
+    assert runs.mean() == pytest.approx(distribution.mean, rel=0.1)
+    assert np.quantile(runs, 0.9) == pytest.approx(distribution.quantile(0.9), rel=0.1)
+
+
+def test_multiple_pieces() -> None:
+    """This test verifies multi-piece targets take longer than each of their pieces"""
+    goblet = Spec(ArtifactSlot.GOBLET, StatType.PYRO_DMG, CRIMSON_WITCH, count=2)
+    both = run_distribution(DOMAIN, [CIRCLET, goblet])
+    assert both.mean > run_distribution(DOMAIN, CIRCLET).mean
+    assert both.mean > run_distribution(DOMAIN, goblet).mean
+    assert both.quantile(0.5) <= both.quantile(0.9)
+
+    with pytest.raises(ValueError, match="distinct slots"):
+        run_distribution(DOMAIN, [goblet, goblet])
+    with pytest.raises(ValueError, match="can never drop"):
+        run_distribution(DOMAIN, Spec(ArtifactSlot.FLOWER, StatType.PYRO_DMG))
+    with pytest.raises(ValueError, match="Invalid quantile"):
+        both.quantile(1)
@@ -0,0 +1,61 @@
+import random
+
+import numpy as np
+
+from artipy.analysis import create_random_artifact, upgrade_artifact_to_max
+from artipy.batch import ArtifactBatch
+from artipy.packing import (
+    COMPOSITIONS,
+    pack,
+    pack_artifact,
+    pack_batch,
+    unpack_artifact,
+    unpack_batch,
+)
+from artipy.types import ArtifactSlot
+
+
+def _artifacts(n: int, rarities: tuple[int, ...] = (5,)) -> list:
+    random.seed(33)
+    artifacts = [
+        create_random_artifact(random.choice(list(ArtifactSlot)), random.choice(rarities))
+        for _ in range(n)
+    ]
+    for artifact in artifacts[::2]:
+        upgrade_artifact_to_max(artifact)
+    return artifacts
+
+
+def test_compositions() -> None:
+    """This test verifies every composition of up to six rolls has an 8-bit index"""
+    assert len(COMPOSITIONS) == 210
+    assert COMPOSITIONS[0].tolist() == [0, 0, 0, 0]
+    assert (COMPOSITIONS.sum(axis=1) <= 6).all()
+    assert len({tuple(c) for c in COMPOSITIONS.tolist()}) == 210
+
+
+def test_pack_artifact_roundtrip() -> None:
+    """This test verifies single artifacts survive packing exactly"""
+    for artifact in _artifacts(200):
+        unpacked = unpack_artifact(pack_artifact(artifact))
+        assert unpacked.artifact_slot == artifact.artifact_slot
+        assert unpacked.level == artifact.level
+        assert unpacked.mainstat == artifact.mainstat
+        assert [s.name for s in unpacked.substats] == [s.name for s in artifact.substats]
+        for a, b in zip(unpacked.substats, artifact.substats, strict=True):
+            assert abs(a.value - b.value) < 1e-9
+        assert pack_artifact(unpacked) == pack_artifact(artifact)
+
+
+def test_pack_batch_roundtrip() -> None:
+    """This test verifies vectorized packing and unpacking agree"""
+    artifacts = _artifacts(500, rarities=(3, 4, 5))
+    packed = pack(artifacts)
+    assert packed.dtype == np.uint64
+    batch = unpack_batch(packed)
+    assert np.array_equal(pack_batch(batch), packed)
+    assert np.allclose(
+        batch.substat_values,
+        ArtifactBatch.from_artifacts(artifacts).substat_values,
+    )
+    assert [pack_artifact(a) for a in artifacts[:20]] == packed[:20].tolist()
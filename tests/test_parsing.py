@@ -0,0 +1,120 @@
+from decimal import Decimal
+
+import pytest
+
+from artipy.parsing import LineError, parse_artifact, parse_artifacts, parse_stat_line
+from artipy.simulation import SimulationSpec, generate_chunk, iter_chunks
+from artipy.types import ArtifactSet, ArtifactSlot, StatType
+
+SANDS = """sands [+8]
+Gladiator's Finale ★★★★★
+ATK+21.3%
+• CRIT Rate+3.9%
+• HP+478
+• Energy Recharge%: 6.5%
+• elemental mastery 23
+"""
+
+
+def test_parse_artifact() -> None:
+    artifact = parse_artifact(SANDS)
+    assert artifact.artifact_slot == ArtifactSlot.SANDS
+    assert artifact.artifact_set == ArtifactSet.GLADIATORS_FINALE
+    assert (artifact.rarity, artifact.level) == (5, 8)
+    assert artifact.mainstat.name == StatType.ATK_PERCENT
+    assert [(s.name, s.value) for s in artifact.substats] == [
+        (StatType.CRIT_RATE, Decimal("0.039")),
+        (StatType.HP, Decimal(478)),
+        (StatType.ENERGY_RECHARGE, Decimal("0.065")),
+        (StatType.ELEMENTAL_MASTERY, Decimal(23)),
+    ]
+
+
+@pytest.mark.parametrize(
+    ("line", "expected"),
+    [
+        ("HP+5.8%", (StatType.HP_PERCENT, Decimal("0.058"))),
+        ("HP%: 5.8", (StatType.HP_PERCENT, Decimal("0.058"))),
+        ("- DEF 19", (StatType.DEF, Decimal(19))),
+        ("CRIT_DMG+7.8%", (StatType.CRIT_DMG, Decimal("0.078"))),
+        ("Pyro DMG Bonus+46.6%", (StatType.PYRO_DMG, Decimal("0.466"))),
+    ],
+)
+def test_parse_stat_line(line: str, expected: tuple[StatType, Decimal]) -> None:
+    assert parse_stat_line(line) == expected
+
+
+def test_roundtrip_many() -> None:
+    """This test verifies the text of generated artifacts parses back to the same
+    text, whether or not blocks are separated by blank lines"""
+    artifacts = generate_chunk(next(iter_chunks(200, 47, 200)), SimulationSpec())
+    texts = [str(a) for a in artifacts]
+    for separator in ("\n", "\n\n"):
+        parsed, errors = parse_artifacts(separator.join(texts))
+        assert not errors
+        assert [str(a) for a in parsed] == texts
+        for artifact, result in zip(artifacts, parsed, strict=True):
+            assert result.artifact_set == artifact.artifact_set
+            assert result.artifact_slot == artifact.artifact_slot
+            assert (result.rarity, result.level) == (artifact.rarity, artifact.level)
+            assert result.mainstat.name == artifact.mainstat.name
+            assert [s.name for s in result.substats] == [
+                s.name for s in artifact.substats
+            ]
+
+
+def test_invalid_lines_are_reported() -> None:
+    """This test verifies invalid lines are reported with their positions and only
+    their blocks are skipped"""
+    lines = [
+        "noise",
+        "flower [+4]",
+        "Gladiator's Finale ★★★★",
+        "HP+1,893",
+        "• Luck+3",
+        "",
+        *SANDS.splitlines(),
+        "circlet [+24]",
+        "Gladiator's Finale ★★★★★",
+        "CRIT DMG+62.2%",
+    ]
+    artifacts, errors = parse_artifacts(line + "\n" for line in lines)
+    assert len(artifacts) == 1
+    assert [(e.line, e.text) for e in errors] == [
+        (1, "noise"),
+        (5, "• Luck+3"),
+        (14, "circlet [+24]"),
+    ]
+    assert errors[1].reason == "Unknown stat 'Luck'"
+
+
+@pytest.mark.parametrize(
+    ("line", "replacement", "reason"),
+    [
+        (3, "CRIT Rate+31.1%", "Invalid mainstat for sands"),
+        (5, "• CRIT Rate+3.9%", "Duplicate substat"),
+        (5, "• ATK+5.8%", "Substat equals the mainstat"),
+        (5, "• HP+99,999", "Value cannot be rolled"),
+        (5, "• HP+300", "Value cannot be rolled"),
+    ],
+)
+def test_impossible_artifacts_are_reported(
+    line: int,
+    replacement: str,
+    reason: str,
+) -> None:
+    """This test verifies artifacts the game cannot drop are reported on the
+    offending line"""
+    lines = SANDS.splitlines()
+    lines[line - 1] = replacement
+    artifacts, errors = parse_artifacts(lines)
+    assert not artifacts
+    assert [(e.line, e.text, e.reason) for e in errors] == [(line, replacement, reason)]
+
+
+def test_parse_artifact_errors() -> None:
+    with pytest.raises(ValueError, match="line 2: Expected '<set> <stars>'"):
+        parse_artifact("goblet [+0]\nNo Such Set ★★★★★\nHP+7.0%")
+    with pytest.raises(ValueError, match="single artifact, got 2"):
+        parse_artifact(SANDS + SANDS)
+    assert str(LineError(3, "x", "Bad")) == "line 3: Bad: 'x'"
@@ -0,0 +1,81 @@
+import random
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from artipy import percentiles
+from artipy.analysis import create_random_artifact, upgrade_artifact_to_max
+from artipy.percentiles import PercentileTables
+from artipy.types import ArtifactSlot, StatType
+
+
+@pytest.fixture(scope="module")
+def inventory() -> list:
+    random.seed(39)
+    return [
+        upgrade_artifact_to_max(create_random_artifact(slot))
+        for slot in (ArtifactSlot.FLOWER, ArtifactSlot.CIRCLET) * 300
+    ]
+
+
+def test_table() -> None:
+    """This test verifies a table is a cumulative distribution over the metric"""
+    tables = PercentileTables()
+    table = tables.table(
+        "crit_value",
+        ArtifactSlot.CIRCLET,
+        StatType.CRIT_RATE,
+        rarity=5,
+        level=20,
+    )
+    assert (np.diff(table.values) > 0).all()
+    assert (np.diff(table.cdf) >= 0).all()
+    assert table.cdf[-1] == pytest.approx(1)
+    assert table.ranks(np.array([-1.0, table.values[-1] + 1])).tolist() == [0, 1]
+    assert len(tables) == 1
+
+    with pytest.raises(ValueError, match="Invalid metric"):
+        tables.table("rolls", ArtifactSlot.FLOWER, StatType.HP, rarity=5, level=0)
+
+
+def test_percentile_ranks(inventory: list) -> None:
+    """This test verifies batch ranks match single ranks and are roughly uniform"""
+    ranks = percentiles.percentile_ranks(inventory, "roll_value")
+    assert ranks[:20] == pytest.approx(
+        [percentiles.percentile_rank(a, "roll_value") for a in inventory[:20]],
+    )
+    assert ((ranks >= 0) & (ranks <= 1)).all()
+    assert ranks.mean() == pytest.approx(0.5, abs=0.05)
+
+
+def test_percentile_ranks_below_max_level() -> None:
+    """This test verifies ranks on a level-dependent metric are spread out for
+    artifacts below max level"""
+    from artipy.simulation import SimulationSpec, generate_chunk, iter_chunks
+
+    spec = SimulationSpec(slot=ArtifactSlot.CIRCLET, mainstat=StatType.CRIT_RATE, level=8)
+    artifacts = [a for c in iter_chunks(600, 39) for a in generate_chunk(c, spec)]
+    ranks = percentiles.percentile_ranks(artifacts, "maximum_roll_value")
+    assert (ranks < 1).mean() > 0.9
+    assert ranks.mean() == pytest.approx(0.5, abs=0.05)
+
+
+def test_save_load(
+    inventory: list,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """This test verifies saved tables give the same ranks and expire with the data"""
+    tables = PercentileTables()
+    ranks = tables.percentile_ranks(inventory, "crit_value")
+    path = tmp_path / "tables.npz"
+    tables.save(path)
+
+    loaded = PercentileTables.load(path)
+    assert len(loaded) == len(tables)
+    assert np.array_equal(loaded.percentile_ranks(inventory, "crit_value"), ranks)
+
+    monkeypatch.setattr(percentiles, "data_hash", lambda: "changed")
+    with pytest.raises(ValueError, match="out of date"):
+        PercentileTables.load(path)
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from artipy.artifacts import substat_weights
+from artipy.batch import ArtifactBatch, crit_values
+from artipy.conformance import expected_mainstats
+from artipy.records import STAT_CODES
+from artipy.reweighting import (
+    WeightTable,
+    likelihood_ratios,
+    reweighted_histogram,
+    reweighted_stats,
+    sweep,
+)
+from artipy.simulation import Chunk, SimulationSpec, generate_chunk
+from artipy.types import VALID_MAINSTATS, ArtifactSlot, StatType
+
+
+@pytest.fixture(scope="module")
+def sands() -> ArtifactBatch:
+    chunk = Chunk(0, 4_000, 38)
+    return ArtifactBatch.from_artifacts(
+        generate_chunk(chunk, SimulationSpec(slot=ArtifactSlot.SANDS, level=0)),
+    )
+
+
+def test_unchanged_weights(sands: ArtifactBatch) -> None:
+    """This test verifies scaling every weight leaves the sample unchanged"""
+    table = WeightTable(substats={s: w * 3 for s, w in substat_weights.items()})
+    assert likelihood_ratios(sands, table) == pytest.approx(1)
+    assert likelihood_ratios(sands, WeightTable()) == pytest.approx(1)
+
+
+def test_removed_substat(sands: ArtifactBatch) -> None:
+    """This test verifies a substat without weight disappears from the sample"""
+    table = WeightTable(substats={**substat_weights, StatType.CRIT_RATE: 0})
+    ratios = likelihood_ratios(sands, table)
+    has_crit_rate = (sands.substats == STAT_CODES.index(StatType.CRIT_RATE)).any(axis=1)
+    assert (ratios[has_crit_rate] == 0).all()
+    assert (ratios[~has_crit_rate] > 1).all()
+
+    stats = reweighted_stats(has_crit_rate.astype(float), ratios)
+    assert stats.mean == 0
+    assert stats.effective_sample_size < len(sands)
+
+
+def test_mainstat_weights(sands: ArtifactBatch) -> None:
+    """This test verifies reweighted mainstat frequencies follow the new weights"""
+    weights = dict(VALID_MAINSTATS[ArtifactSlot.SANDS])
+    weights[StatType.ELEMENTAL_MASTERY] *= 3
+    table = WeightTable(mainstats={**VALID_MAINSTATS, ArtifactSlot.SANDS: weights})
+    ratios = likelihood_ratios(sands, table)
+    expected = expected_mainstats(ArtifactSlot.SANDS)
+    expected_em = 3 * expected[StatType.ELEMENTAL_MASTERY]
+    expected_em /= 1 + 2 * expected[StatType.ELEMENTAL_MASTERY]
+    is_em = (sands.mainstat == STAT_CODES.index(StatType.ELEMENTAL_MASTERY)).astype(float)
+    assert reweighted_stats(is_em, ratios).mean == pytest.approx(expected_em, abs=0.02)
+
+    probabilities, edges = reweighted_histogram(is_em, ratios, bins=2)
+    assert probabilities.sum() == pytest.approx(1)
+    assert len(edges) == 3
+
+
+def test_sweep(sands: ArtifactBatch) -> None:
+    """This test verifies a sweep favours crit when crit substats weigh more"""
+    crit = {**substat_weights, StatType.CRIT_RATE: 6, StatType.CRIT_DMG: 6}
+    results = sweep(
+        sands,
+        crit_values(sands),
+        {"base": WeightTable(), "crit": WeightTable(substats=crit)},
+    )
+    assert results["base"].mean == pytest.approx(np.mean(crit_values(sands)))
+    assert results["crit"].mean > results["base"].mean
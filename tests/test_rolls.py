@@ -0,0 +1,100 @@
+import random
+from decimal import Decimal
+
+import numpy as np
+
+from artipy.analysis import create_random_artifact, upgrade_artifact_to_max
+from artipy.artifacts import ArtifactBuilder
+from artipy.rolls import (
+    decode_substat,
+    decode_values,
+    max_rolls,
+    reconstruct_inventory,
+    roll_table,
+    total_rolls,
+)
+from artipy.stats import SubStat
+from artipy.types import ArtifactSlot, StatType
+from artipy.utils import possible_substat_values
+
+
+def test_roll_table() -> None:
+    """This test verifies the table holds every composition of up to six rolls"""
+    assert max_rolls(5) == 6
+    assert max_rolls(1) == 1
+    table = roll_table(StatType.CRIT_RATE, 5)
+    assert table.values[0] == 0
+    assert list(table.values) == sorted(table.values)
+    assert len(table.values) == 210
+    assert (table.rolls == table.tiers.sum(axis=1)).all()
+
+
+def test_decode_substat() -> None:
+    """This test verifies decoding exact and rounded values"""
+    tiers = possible_substat_values(StatType.CRIT_RATE, 5)
+    exact = SubStat(StatType.CRIT_RATE, tiers[0] + tiers[3] * 2, 5)
+    history = decode_substat(exact)
+    assert history.rolls == 3
+    assert history.upgrades == 2
+    assert history.tiers == (1, 0, 0, 2)
+    assert history.error == 0
+
+    rounded = decode_substat(SubStat(StatType.CRIT_RATE, Decimal("0.039"), 5))
+    assert rounded.tiers == (0, 0, 0, 1)
+    assert rounded.error < Decimal("0.001")
+
+
+def test_reconstruct_inventory() -> None:
+    """This test verifies batch reconstruction recovers every generated history"""
+    random.seed(28)
+    artifacts = [
+        upgrade_artifact_to_max(create_random_artifact(random.choice(list(ArtifactSlot))))
+        for _ in range(200)
+    ]
+    histories = reconstruct_inventory(artifacts)
+    for artifact, artifact_histories in zip(artifacts, histories, strict=True):
+        assert len(artifact_histories) == len(artifact.substats)
+        # Three or four initial substats plus five upgrades.
+        assert sum(h.rolls for h in artifact_histories) in total_rolls(artifact)
+        assert total_rolls(artifact) <= {8, 9}
+        for substat, history in zip(artifact.substats, artifact_histories, strict=True):
+            assert history.error < Decimal("1E-9")
+            assert history.value == decode_substat(substat).value
+
+    rolls, tiers = decode_values(StatType.HP, 5, np.array([0.0, 209.13, 568.0]))
+    assert rolls.tolist() == [0, 1, 2]
+    assert tiers.sum(axis=1).tolist() == [0, 1, 2]
+
+
+def test_ambiguous_value() -> None:
+    """This test verifies values with several histories are flagged and settled by
+    the level of the artifact"""
+    hp = possible_substat_values(StatType.HP, 5)
+    substat = SubStat(StatType.HP, hp[1] * 5, 5)
+    history = decode_substat(substat)
+    # Five rolls of 239 sum to the same as four of 298.75.
+    assert history.ambiguous
+    assert history.rolls == 4
+    assert (0, 5, 0, 0) in history.candidates
+    assert roll_table(StatType.HP, 5).ambiguous.sum() > 0
+
+    artifact = (
+        ArtifactBuilder()
+        .with_mainstat(StatType.ATK)
+        .with_substats([
+            (StatType.HP, substat.value),
+            (StatType.DEF, possible_substat_values(StatType.DEF, 5)[0]),
+            (StatType.CRIT_RATE, possible_substat_values(StatType.CRIT_RATE, 5)[0]),
+            (StatType.CRIT_DMG, possible_substat_values(StatType.CRIT_DMG, 5)[0]),
+        ])
+        .with_rarity(5)
+        .with_level(20)
+        .with_slot(ArtifactSlot.PLUME)
+        .build()
+    )
+    (histories,) = reconstruct_inventory([artifact])
+    assert total_rolls(artifact) == {8, 9}
+    assert histories[0].rolls == 5
+    assert histories[0].tiers == (0, 5, 0, 0)
+    assert not histories[0].ambiguous
+    assert sum(h.rolls for h in histories) == 8
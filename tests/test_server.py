@@ -0,0 +1,104 @@
+"""This module contains the tests for the scoring service."""
+
+import asyncio
+
+import orjson
+
+from artipy import MAX_RARITY
+from artipy.artifacts import ArtifactBuilder
+from artipy.records import artifact_to_row
+from artipy.rolls import roll_table
+from artipy.server import ScoringServer, evaluate_batch, warm_up
+from artipy.types import VALID_SUBSTATS, ArtifactSet, ArtifactSlot, StatType
+
+ARTIFACT = artifact_to_row(
+    ArtifactBuilder()
+    .with_mainstat(StatType.ATK_PERCENT)
+    .with_substats([
+        (StatType.ATK, 19),
+        (StatType.CRIT_RATE, 0.039),
+        (StatType.HP_PERCENT, 0.053),
+        (StatType.HP, 568),
+    ])
+    .with_level(8)
+    .with_rarity(5)
+    .with_slot(ArtifactSlot.SANDS)
+    .with_set(ArtifactSet.GLADIATORS_FINALE)
+    .build(),
+)
+
+
+def test_warm_up_builds_metric_tables() -> None:
+    """Warming up builds the value table of every substat of every rarity that has
+    substats, which the metric kernels look up"""
+    roll_table.cache_clear()
+    warm_up()
+    assert roll_table.cache_info().currsize == len(VALID_SUBSTATS) * (MAX_RARITY - 1)
+
+
+def test_evaluate_batch() -> None:
+    """Every request gets a response, and errors stay local to their request"""
+    responses = evaluate_batch([
+        {"id": 1, "op": "score", "artifact": ARTIFACT, "metrics": ["crit_value"]},
+        {"id": 2, "op": "predict", "artifact": ARTIFACT, "metrics": ["crit_value"]},
+        {"id": 3, "op": "explode", "artifact": ARTIFACT},
+        {"id": 4, "op": "score"},
+    ])
+    assert [r["id"] for r in responses] == [1, 2, 3, 4]
+    assert abs(responses[0]["result"]["crit_value"] - 7.8) < 0.01
+    prediction = responses[1]["result"]["crit_value"]
+    assert 7.8 <= prediction["p10"] <= prediction["p50"] <= prediction["p90"]
+    assert prediction["mean"] > 7.8
+    assert "error" in responses[2]
+    assert "error" in responses[3]
+
+
+def test_malformed_request_stays_local() -> None:
+    """This test verifies malformed values only fail their own request, and batched
+    scores match single ones"""
+    single = evaluate_batch([{"id": 0, "op": "score", "artifact": ARTIFACT}])
+    responses = evaluate_batch([
+        {"id": 1, "op": "score", "artifact": ARTIFACT},
+        {"id": 2, "op": "score", "artifact": {**ARTIFACT, "substat_1_value": "abc"}},
+        {"id": 3, "op": "score", "artifact": {**ARTIFACT, "mainstat": 123}},
+        {"id": 4, "op": "score", "artifact": ARTIFACT, "metrics": ["luck"]},
+        {"id": 5, "op": "score", "artifact": {**ARTIFACT, "level": 4}},
+        {"id": 6, "op": "score", "artifact": ARTIFACT},
+    ])
+    assert [r["id"] for r in responses] == [1, 2, 3, 4, 5, 6]
+    assert [("error" in r) for r in responses] == [False, True, True, True, False, False]
+    assert responses[0]["result"] == responses[5]["result"] == single[0]["result"]
+    assert responses[4]["result"]["crit_value"] == responses[0]["result"]["crit_value"]
+
+
+async def _roundtrip(amount: int) -> tuple[list[dict[str, object]], ScoringServer]:
+    async with ScoringServer(batch_window=0.01) as scorer:
+        server = await scorer.serve_tcp()
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.writelines(
+            orjson.dumps(
+                {"id": i, "op": "score", "artifact": ARTIFACT},
+                option=orjson.OPT_APPEND_NEWLINE,
+            )
+            for i in range(amount)
+        )
+        writer.write(b'{"id": "p", "op": "ping"}\nnot json\n')
+        await writer.drain()
+        responses = [orjson.loads(await reader.readline()) for _ in range(amount + 2)]
+        writer.close()
+        server.close()
+        await server.wait_closed()
+    return responses, scorer
+
+
+def test_server_batches_concurrent_requests() -> None:
+    """Pipelined requests over one connection are evaluated in a few batches"""
+    responses, scorer = asyncio.run(_roundtrip(200))
+    scored = [r for r in responses if isinstance(r["id"], int)]
+    assert sorted(r["id"] for r in scored) == list(range(200))
+    assert all("result" in r for r in scored)
+    assert {"id": "p", "result": "pong"} in responses
+    assert any(r["id"] is None and "error" in r for r in responses)
+    assert scorer.requests == 200
+    assert scorer.batches < 20
@@ -0,0 +1,53 @@
+from itertools import pairwise
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from artipy.analysis import METRICS
+from artipy.batch import ArtifactBatch
+from artipy.shared import SharedBatch, batch_layout, simulate_shared
+from artipy.simulation import SimulationSpec, generate_chunk, iter_chunks
+
+
+def test_layout_is_aligned() -> None:
+    """This test verifies columns do not overlap and start on cache lines"""
+    layout = batch_layout(10, ["crit_value", "rolls"])
+    assert [c.name for c in layout][-2:] == ["metric:crit_value", "metric:rolls"]
+    assert layout[-1].shape == (10, 4)
+    for column, following in pairwise(layout):
+        assert column.offset % 64 == 0
+        assert column.offset + column.nbytes <= following.offset
+    with pytest.raises(ValueError, match="Invalid metric"):
+        batch_layout(10, ["luck"])
+
+
+def test_simulate_shared_matches_generation() -> None:
+    """This test verifies workers write the same artifacts and metrics in place"""
+    spec = SimulationSpec(level=8)
+    artifacts = [a for c in iter_chunks(50, 9, 12) for a in generate_chunk(c, spec)]
+    expected = ArtifactBatch.from_artifacts(artifacts)
+
+    with simulate_shared(50, spec, ["crit_value"], seed=9, chunk_size=12, workers=2) as s:
+        batch = s.batch
+        for name in ("slot", "level", "mainstat", "substats", "substat_values"):
+            assert np.array_equal(getattr(batch, name), getattr(expected, name))
+        assert np.allclose(
+            s.metrics["crit_value"],
+            METRICS.calculate_batch(expected, ["crit_value"])["crit_value"],
+        )
+        assert not batch.substat_values.flags.owndata
+        del batch
+
+
+def test_segment_is_unlinked() -> None:
+    """This test verifies closing the owner removes the segment"""
+    shared = SharedBatch.create(5, ["roll_value"])
+    attached = SharedBatch.attach(shared.name, 5, ["roll_value"])
+    attached.metrics["roll_value"][:] = 1.5
+    assert shared.metrics["roll_value"].sum() == pytest.approx(7.5)
+    attached.close()
+    shared.close()
+    assert not Path("/dev/shm", shared.name).exists()
+    with pytest.raises(ValueError, match="closed"):
+        _ = shared.batch
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from artipy.analysis import (
+    calculate_artifact_crit_value,
+    create_random_artifact,
+    upgrade_artifact_to_max,
+)
+from artipy.distributions import exact_pmf
+from artipy.leveling import FODDER_BASE_EXP, exp_to_level
+from artipy.stopping import StoppingPolicy, solve_policy
+from artipy.types import ArtifactSlot, StatType
+from artipy.utils import seed_rng
+
+
+def _policy() -> StoppingPolicy:
+    return solve_policy(
+        calculate_artifact_crit_value,
+        ArtifactSlot.CIRCLET,
+        StatType.HP_PERCENT,
+    )
+
+
+def test_policy_is_cached() -> None:
+    """This test verifies policies are solved once per slot, mainstat and metric"""
+    assert _policy() is _policy()
+
+
+def test_policy_beats_leveling_everything() -> None:
+    """This test verifies the policy is at least as good as never trashing"""
+    policy = _policy()
+    pmf = exact_pmf(
+        calculate_artifact_crit_value,
+        ArtifactSlot.CIRCLET,
+        mainstat=StatType.HP_PERCENT,
+        level=20,
+    )
+    mean = sum(float(value) * p for value, p in pmf.items())
+    cost = exp_to_level(5, 0, 20) + FODDER_BASE_EXP[5]
+    assert policy.rate > mean / cost
+    assert policy.rate == pytest.approx(policy.expected_metric / policy.expected_exp)
+
+
+def test_should_level() -> None:
+    """This test verifies decisions are only made at upgrades and never at the
+    maximum level"""
+    policy = _policy()
+    artifact = create_random_artifact(ArtifactSlot.CIRCLET, mainstat=StatType.HP_PERCENT)
+    assert isinstance(policy.should_level(artifact), bool)
+
+    artifact.upgrade()
+    with pytest.raises(ValueError, match="every 4 levels"):
+        policy.should_level(artifact)
+
+    upgrade_artifact_to_max(artifact)
+    assert not policy.should_level(artifact)
+
+
+def test_policy_rate_matches_simulation() -> None:
+    """This test verifies following the policy reaches its expected rate"""
+    policy = _policy()
+    seed_rng(41)
+    metric = spent = 0.0
+    for _ in range(2_000):
+        artifact = create_random_artifact(
+            ArtifactSlot.CIRCLET,
+            mainstat=StatType.HP_PERCENT,
+        )
+        spent += FODDER_BASE_EXP[5]
+        while artifact.level < artifact.max_level and policy.should_level(artifact):
+            start = artifact.level
+            while artifact.level < start + 4:
+                artifact.upgrade()
+            spent += exp_to_level(5, start, artifact.level)
+        if artifact.level == artifact.max_level:
+            metric += float(calculate_artifact_crit_value(artifact))
+    assert np.isclose(metric / spent, policy.rate, rtol=0.15)
+
+
+def test_invalid_mainstat() -> None:
+    """This test verifies policies are only solved for valid mainstats"""
+    with pytest.raises(ValueError, match="Invalid mainstat"):
+        solve_policy(
+            calculate_artifact_crit_value,
+            ArtifactSlot.FLOWER,
+            StatType.ATK,
+        )
@@ -0,0 +1,108 @@
+import random
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from artipy.artifacts import substat_sampler, substat_weights
+from artipy.conformance import chi_square_test
+from artipy.data_gen import DataGen
+from artipy.types import StatType
+from artipy.utils import (
+    AliasSampler,
+    choose,
+    possible_mainstat_values,
+    possible_substat_values,
+    rng,
+    seed_rng,
+    weighted_sampler,
+)
+
+N = 20_000
+ALPHA = 1e-3
+
+
+def test_alias_sampler_draw() -> None:
+    """This test verifies scalar draws follow the weights"""
+    sampler = AliasSampler(("a", "b", "c", "d"), (1, 2, 3, 0))
+    random.seed(36)
+    observed = Counter(sampler.draw() for _ in range(N))
+    assert "d" not in observed
+    expected = {"a": 1 / 6, "b": 2 / 6, "c": 3 / 6, "d": 0.0}
+    assert chi_square_test(observed, expected).p_value > ALPHA
+
+
+def test_alias_sampler_draw_indices() -> None:
+    """This test verifies vectorized draws follow the weights"""
+    weights = tuple(substat_weights.values())
+    sampler = AliasSampler(tuple(substat_weights), weights)
+    indices = sampler.draw_indices(N, np.random.default_rng(36))
+    observed = Counter(indices.tolist())
+    expected = {i: w / sum(weights) for i, w in enumerate(weights)}
+    assert chi_square_test(observed, expected).p_value > ALPHA
+
+    with pytest.raises(ValueError, match="equal length"):
+        AliasSampler(("a",), (1, 2))
+    with pytest.raises(ValueError, match="Invalid weights"):
+        AliasSampler(("a",), (0,))
+
+
+def test_samplers_are_cached() -> None:
+    """This test verifies samplers are built once per population and exclusion set"""
+    assert weighted_sampler(("a", "b"), (1, 1)) is weighted_sampler(("a", "b"), (1, 1))
+    assert choose(["a"], [1]) == "a"
+
+    excluded = frozenset({StatType.CRIT_RATE, StatType.CRIT_DMG})
+    sampler = substat_sampler(excluded)
+    assert sampler is substat_sampler(excluded)
+    assert set(sampler.population) == substat_weights.keys() - excluded
+    with pytest.raises(ValueError, match="No valid stats"):
+        substat_sampler(frozenset(substat_weights))
+
+
+def test_threads_have_their_own_rng() -> None:
+    """This test verifies the main thread keeps the global random state and other
+    threads draw from their own reproducible generators"""
+    random.seed(45)
+    first = rng().random()
+    random.seed(45)
+    assert rng().random() == first
+
+    def draw(seed: int) -> tuple[int, list[float]]:
+        seed_rng(seed)
+        return id(rng()), [rng().random() for _ in range(5)]
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(draw, [1, 1, 2, 2] * 4))
+    assert id(rng()) not in {generator for generator, _ in results}
+    assert {tuple(draws) for _, draws in results} == {
+        tuple(draw(1)[1]),
+        tuple(draw(2)[1]),
+    }
+
+
+def test_data_gen_is_created_once_across_threads() -> None:
+    """This test verifies concurrent construction yields a single loaded instance"""
+    name = "ReliquaryAffixExcelConfigData.json"
+    original = DataGen._instances.pop(name)
+    barrier = threading.Barrier(8)
+
+    def create(_: int) -> DataGen:
+        barrier.wait()
+        return DataGen(name)
+
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            instances = list(pool.map(create, range(8)))
+        assert len({id(instance) for instance in instances}) == 1
+        assert len(instances[0].as_list()) == len(original.as_list())
+    finally:
+        DataGen._instances[name] = original
+
+
+def test_possible_values_are_immutable() -> None:
+    """This test verifies cached values cannot be mutated by callers"""
+    assert isinstance(possible_substat_values(StatType.CRIT_RATE, 5), tuple)
+    assert isinstance(possible_mainstat_values(StatType.CRIT_RATE, 5), tuple)